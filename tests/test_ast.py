@@ -1,5 +1,10 @@
-from lsprotocol.types import Position
+from lsprotocol.types import Position, Range, TextDocumentContentChangeEvent_Type2
+from pygls.workspace import Document
+from vyper.ast import nodes
+from vyper.compiler.phases import DEFAULT_CONTRACT_PATH
+
 from vyper_lsp.ast import AST
+from vyper_lsp.index import content_hash
 
 
 def test_get_constants(ast):
@@ -449,3 +454,100 @@ def test_ast_no_data_returns_empty_and_none(ast: AST):
     assert ast.find_type_declaration_node_for_name("Foo") is None
     assert ast.find_top_level_node_at_pos(Position(line=0, character=0)) is None
     assert ast.find_node_declaring_symbol("x") is None
+
+
+INCREMENTAL_SRC = """
+x: uint256
+
+@internal
+def foo() -> uint256:
+    y: uint256 = self.x
+    return y
+
+@external
+def bar():
+    self.foo()
+"""
+
+
+def test_function_body_edit_is_reanalyzed_alone(ast, monkeypatch):
+    ast.build_ast(INCREMENTAL_SRC)
+
+    def analyze_module(doc):
+        raise AssertionError("analyzed the whole module")
+
+    monkeypatch.setattr(ast, "_analyze_module", analyze_module)
+    src = INCREMENTAL_SRC.replace(
+        "    return y", "    z: uint256 = y + 1\n    return z"
+    )
+    assert ast.build_ast(src, incremental=True) == []
+
+    foo = ast.find_function_declaration_node_for_name("foo")
+    assert "z" in [n.id for n in foo.get_descendants(nodes.Name)]
+    # the declarations after the edit have moved down
+    assert ast.find_function_declaration_node_for_name("bar").lineno == 11
+    assert ast.symbols.content_hash == content_hash(src)
+
+    # errors in the edited body are reported, the last analysis is kept
+    broken = src.replace("y + 1", "self.nope")
+    diagnostics = ast.build_ast(broken, incremental=True)
+    assert "nope" in diagnostics[0].message
+    assert ast.source == src
+
+
+def test_signature_edit_reanalyzes_module(ast, monkeypatch):
+    ast.build_ast(INCREMENTAL_SRC)
+
+    analyzed = []
+    analyze_module = ast._analyze_module
+    monkeypatch.setattr(
+        ast, "_analyze_module", lambda doc: analyzed.append(analyze_module(doc))
+    )
+    src = INCREMENTAL_SRC.replace("def foo()", "def foo(a: uint256)")
+    src = src.replace("self.foo()", "self.foo(1)")
+    assert ast.build_ast(src, incremental=True) == []
+    assert len(analyzed) == 1
+
+
+def test_edit_during_analysis_is_checked_next(ast, monkeypatch):
+    doc = Document(uri=str(DEFAULT_CONTRACT_PATH), source=INCREMENTAL_SRC, version=1)
+    broken = INCREMENTAL_SRC.replace("self.x", "self.nope")
+
+    analyze_module = ast._analyze_module
+
+    def edited_while_analyzing(analyzed):
+        analyze_module(analyzed)
+        # a keystroke applied by the server while the compile runs
+        doc.apply_change(TextDocumentContentChangeEvent_Type2(text=broken))
+        doc.version = 2
+
+    monkeypatch.setattr(ast, "_analyze_module", edited_while_analyzing)
+    assert ast.build_ast(doc) == []
+    assert ast.source == INCREMENTAL_SRC
+    monkeypatch.setattr(ast, "_analyze_module", analyze_module)
+
+    diagnostics = ast.build_ast(doc, incremental=True)
+    assert diagnostics and "nope" in diagnostics[0].message
+
+
+def test_edits_during_analysis_keep_being_mapped(ast, monkeypatch):
+    doc = Document(uri=str(DEFAULT_CONTRACT_PATH), source=INCREMENTAL_SRC, version=1)
+    analyze_module = ast._analyze_module
+
+    def edited_while_analyzing(analyzed):
+        analyze_module(analyzed)
+        # a line inserted at the top, recorded as the server applies it
+        edit = Range(
+            start=Position(line=0, character=0), end=Position(line=0, character=0)
+        )
+        ast.positions.record(2, edit, "\n")
+        doc.apply_change(
+            TextDocumentContentChangeEvent_Type2(text="\n" + INCREMENTAL_SRC)
+        )
+        doc.version = 2
+
+    monkeypatch.setattr(ast, "_analyze_module", edited_while_analyzing)
+    assert ast.build_ast(doc) == []
+
+    foo = ast.find_function_declaration_node_for_name("foo")
+    assert ast.node_range(foo).start.line == foo.lineno
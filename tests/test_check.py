@@ -0,0 +1,53 @@
+from vyper_lsp.check import check_files, collect_files, to_sarif
+
+GOOD = """
+@external
+def foo() -> uint256:
+    return 1
+"""
+
+BAD = """
+@external
+def foo() -> uint256:
+    return self.nope
+"""
+
+
+def _tree(tmp_path):
+    (tmp_path / "contracts").mkdir()
+    (tmp_path / "contracts" / "Good.vy").write_text(GOOD)
+    (tmp_path / "contracts" / "Bad.vy").write_text(BAD)
+    (tmp_path / "contracts" / "notes.txt").write_text("not a contract")
+    return tmp_path / "contracts"
+
+
+def test_collect_files(tmp_path):
+    contracts = _tree(tmp_path)
+    files = collect_files([contracts, contracts / "Good.vy"])
+    assert [f.name for f in files] == ["Bad.vy", "Good.vy"]
+
+
+def test_check_files(tmp_path):
+    files = collect_files([_tree(tmp_path)])
+    results = dict(check_files(files, roots=[tmp_path]))
+
+    assert results[str(tmp_path / "contracts" / "Good.vy")] == []
+    (diagnostic,) = results[str(tmp_path / "contracts" / "Bad.vy")]
+    assert diagnostic["severity"] == "error"
+    assert "nope" in diagnostic["message"]
+    assert diagnostic["range"]["start"] == {"line": 3, "character": 11}
+
+    # the same results from a process pool
+    assert dict(check_files(files, jobs=2, roots=[tmp_path])) == results
+
+
+def test_sarif(tmp_path):
+    files = collect_files([_tree(tmp_path)])
+    sarif = to_sarif(check_files(files, roots=[tmp_path]), tmp_path)
+
+    (result,) = sarif["runs"][0]["results"]
+    assert result["level"] == "error"
+    location = result["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"] == "contracts/Bad.vy"
+    assert location["region"]["startLine"] == 4
+    assert location["region"]["startColumn"] == 12
@@ -0,0 +1,113 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from packaging.version import Version
+
+from vyper_lsp import compilers
+from vyper_lsp.ast import AST
+from vyper_lsp.compilers import (
+    CompilerPool,
+    CompilerWorker,
+    pragma_version,
+    version_spec,
+)
+from vyper_lsp.utils import get_installed_vyper_version
+
+
+def test_pragma_version():
+    assert pragma_version("# pragma version ^0.3.10\nx: uint256") == "^0.3.10"
+    assert pragma_version("x: uint256\n# @version 0.3.7\n") == "0.3.7"
+    assert pragma_version("x: uint256\n") is None
+
+    assert version_spec("^0.3.10").contains("0.3.10")
+    assert not version_spec("^0.3.10").contains("0.4.0")
+    assert version_spec("0.3.7").contains("0.3.7")
+    assert version_spec(">=0.4.0").contains("0.4.3")
+    assert version_spec("latest") is None
+
+
+def test_files_are_routed_by_pragma():
+    pool = CompilerPool()
+    for version in ["0.3.9", "0.3.10", "0.2.16"]:
+        pool.workers[Version(version)] = CompilerWorker(
+            Path("python"), Version(version)
+        )
+
+    assert pool.worker_for("# pragma version ^0.3.0\n").version == Version("0.3.10")
+    assert pool.worker_for("# @version 0.2.16\n").version == Version("0.2.16")
+    assert pool.worker_for("# pragma version 0.1.0\n") is None
+    # the server's own vyper checks everything it can
+    installed = get_installed_vyper_version()
+    assert pool.worker_for(f"# pragma version {installed}\n") is None
+    assert pool.worker_for("x: uint256\n") is None
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # pretend the server's vyper is too old for the file, and that the
+    # test interpreter's vyper is another installation
+    monkeypatch.setattr(
+        compilers, "get_installed_vyper_version", lambda: Version("0.3.10")
+    )
+    pool = CompilerPool()
+    version = get_installed_vyper_version()
+    pool.workers[version] = CompilerWorker(Path(sys.executable), version)
+    yield pool
+    pool.close()
+
+
+def test_pinned_file_is_checked_by_worker(pool):
+    ast = AST()
+    ast.compiler_pool = pool
+    src = """# pragma version ^0.4.0
+
+@external
+def foo():
+    x: uint256 = self.nope
+"""
+    diagnostics = ast.build_ast(src)
+    messages = [d.message for d in diagnostics]
+    assert any("nope" in m for m in messages)
+    assert diagnostics[0].range.start.line == 4
+    # the worker process stays around for the next check
+    process = next(iter(pool.workers.values()))._process
+    assert process is not None and process.poll() is None
+
+    diagnostics = ast.build_ast(src.replace("self.nope", "1"))
+    assert diagnostics == []
+    # the pinned file has no analysis of its own
+    assert ast.ast_data is None
+
+
+def test_hung_worker_is_replaced(pool):
+    worker = next(iter(pool.workers.values()))
+    start = worker._start
+    # a worker that never answers
+    worker._start = lambda: subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(60)"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    worker.timeout = 0.5
+    assert pool.check(worker, "Foo.vy", "x: uint256\n", []) == ([], [])
+    assert worker._process is None
+
+    worker._start = start
+    worker.timeout = compilers.CHECK_TIMEOUT
+    errors, _ = pool.check(worker, "Foo.vy", "x: uint256 = self.nope\n", [])
+    assert errors
+
+
+def test_diagnostic_without_end_column():
+    error = {
+        "lineno": 3,
+        "col_offset": 4,
+        "end_lineno": 3,
+        "end_col_offset": None,
+        "message": "nope",
+    }
+    diagnostic = compilers._diagnostic(error)
+    assert diagnostic.range.end == diagnostic.range.start
@@ -148,3 +148,77 @@ def bar():
     assert "view" in labels
     assert "pure" in labels
     assert "deploy" in labels
+
+
+def test_completion_items_cached_per_analysis(ast):
+    src = """
+struct Foo:
+    bar: uint256
+
+x: uint256
+"""
+    ast.build_ast(src)
+
+    doc = Document(uri="<inline source code>", source=src + "\ny:\n")
+    pos = Position(line=6, character=2)
+    context = CompletionContext(
+        trigger_character=":", trigger_kind=CompletionTriggerKind.TriggerCharacter
+    )
+    params = CompletionParams(
+        text_document=TextDocumentIdentifier(uri=doc.uri), position=pos, context=context
+    )
+
+    analyzer = CompletionHandler(ast)
+    first = analyzer._get_completions_in_doc(doc, params).items
+    assert "Foo" in [c.label for c in first]
+    assert analyzer._get_completions_in_doc(doc, params).items[0] is first[0]
+
+    # a new analysis invalidates the cached items
+    ast.build_ast(src.replace("Foo", "Baz"))
+    labels = [c.label for c in analyzer._get_completions_in_doc(doc, params).items]
+    assert "Baz" in labels
+    assert "Foo" not in labels
+
+
+def test_completions_filtered_by_prefix(ast):
+    src = """
+struct Uint256Pair:
+    a: uint256
+    b: uint256
+"""
+    ast.build_ast(src)
+    analyzer = CompletionHandler(ast)
+
+    def complete(line, trigger_kind, trigger_character=None):
+        doc = Document(uri="<inline source code>", source=src + line + "\n")
+        context = CompletionContext(
+            trigger_kind=trigger_kind, trigger_character=trigger_character
+        )
+        params = CompletionParams(
+            text_document=TextDocumentIdentifier(uri=doc.uri),
+            position=Position(line=4, character=len(line)),
+            context=context,
+        )
+        return analyzer._get_completions_in_doc(doc, params)
+
+    # nothing typed yet: a bounded list, user types and common types first
+    completions = complete("x:", CompletionTriggerKind.TriggerCharacter, ":")
+    assert completions.is_incomplete
+    assert len(completions.items) == 50
+    assert [c.label for c in completions.items[:3]] == [
+        "Uint256Pair",
+        "uint256",
+        "address",
+    ]
+
+    # the client asks again as the user types
+    incomplete = CompletionTriggerKind.TriggerForIncompleteCompletions
+    completions = complete("x: uint25", incomplete)
+    assert not completions.is_incomplete
+    assert [c.label for c in completions.items] == ["uint256", "Uint256Pair"]
+
+    completions = complete("x: Uint", incomplete)
+    assert completions.items[0].label == "Uint256Pair"
+    assert len(completions.items) == 33
+
+    assert complete("x = Uint", incomplete).items == []
@@ -1,5 +1,7 @@
 import time
-from vyper_lsp.debounce import Debouncer  # Import Debouncer from your module
+import pytest
+
+from vyper_lsp.debounce import AdaptiveDelay, Debouncer
 
 
 def test_debounce():
@@ -19,3 +21,56 @@ def test_debounce():
     )  # Sleep for more than the debounce period to allow the function to execute
 
     assert result == ["second call"]
+
+
+def test_debounce_by_key():
+    result = []
+
+    def test_function(key, arg):
+        result.append(arg)
+
+    debouncer = Debouncer(wait=0.3, key=lambda key, arg: key)
+    debounced_func = debouncer.debounce(test_function)
+
+    debounced_func("a", "first a")
+    debounced_func("b", "first b")
+    debounced_func("a", "second a")
+    debounced_func("c", "first c")
+    debouncer.cancel("c")
+    time.sleep(0.5)
+
+    assert sorted(result) == ["first b", "second a"]
+
+
+def test_adaptive_delay():
+    delays = AdaptiveDelay(minimum=0.05, maximum=2.0, default=0.5)
+    assert delays.delay("new") == 0.5
+
+    # cheap checks start right away
+    delays.checked("small", 0.01)
+    assert delays.delay("small") == 0.05
+
+    # expensive ones wait for a pause in typing, and for longer the more
+    # they cost
+    for i in range(5):
+        delays.typed("large", now=i * 0.2)
+    delays.checked("large", 0.8)
+    assert delays.delay("large") == pytest.approx(0.4)
+    delays.checked("large", 100.0)
+    assert delays.delay("large") == 2.0
+
+    delays.forget("large")
+    assert delays.delay("large") == 0.5
+
+
+def test_debounce_with_adaptive_wait():
+    result = []
+    delays = {"fast": 0.05, "slow": 0.5}
+    debouncer = Debouncer(wait=delays.get, key=lambda key: key)
+    debounced_func = debouncer.debounce(result.append)
+
+    debounced_func("slow")
+    debounced_func("fast")
+    time.sleep(0.2)
+    assert result == ["fast"]
+    debouncer.cancel("slow")
@@ -0,0 +1,60 @@
+from lsprotocol.types import (
+    RelatedFullDocumentDiagnosticReport,
+    RelatedUnchangedDocumentDiagnosticReport,
+    WorkspaceUnchangedDocumentDiagnosticReport,
+)
+
+from vyper_lsp.ast import AST
+from vyper_lsp.diagnostics import DiagnosticStore, document_report, workspace_report
+
+URI = "file:///contract.vy"
+
+
+def test_unchanged_diagnostics_are_not_reported_again():
+    store = DiagnosticStore()
+    broken = AST().build_ast("x: uint256 = 1\n")
+    assert broken
+
+    assert store.update(URI, broken)
+    # e.g. a whitespace edit, which the same errors are reported for
+    assert not store.update(URI, AST().build_ast("x: uint256 = 1\n\n"))
+    assert store.update(URI, [])
+    assert not store.update(URI, [])
+
+    store.remove(URI)
+    assert store.get(URI) is None
+    assert store.update(URI, [])
+
+
+def test_pull_reports():
+    store = DiagnosticStore()
+    store.update(URI, AST().build_ast("x: uint256 = 1\n"))
+    report = store.get(URI)
+
+    full = document_report(report, None)
+    assert isinstance(full, RelatedFullDocumentDiagnosticReport)
+    assert full.items and full.result_id == report[0]
+
+    unchanged = document_report(report, full.result_id)
+    assert isinstance(unchanged, RelatedUnchangedDocumentDiagnosticReport)
+
+    assert isinstance(
+        workspace_report(URI, 3, report, full.result_id),
+        WorkspaceUnchangedDocumentDiagnosticReport,
+    )
+
+
+def test_reports_know_their_version():
+    store = DiagnosticStore()
+    assert not store.covers(URI, 1)
+
+    store.update(URI, [], 1)
+    assert store.covers(URI, 1)
+    assert not store.covers(URI, 2)
+    # documents without versions are never known to be checked
+    store.update(URI, [])
+    assert not store.covers(URI, None)
+
+    store.update(URI, [], 2)
+    store.remove(URI)
+    assert not store.covers(URI, 2)
@@ -1,7 +1,13 @@
 from lsprotocol.types import Position
 from pygls.workspace import Document
+from vyper.exceptions import StructureException
 
 from vyper_lsp.ast import AST
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import SymbolIndex
+from vyper_lsp.memory import retained_size
+from vyper_lsp.session import DocumentSession
+from vyper_lsp.utils import uri_from_path
 
 
 def test_document_fixture(vyper_document, struct_code):
@@ -85,3 +91,61 @@ def test_find_top_level_node_with_position(vyper_document, function_code):
     assert external_node is not None
     assert hasattr(external_node, "name")
     assert external_node.name == "calculate"
+
+
+def test_session_retained_size(vyper_document, function_code):
+    """An analyzed document holds its trees, the shared caches aren't counted."""
+    doc, file_path = vyper_document
+    doc = Document(uri=str(file_path), source=function_code)
+
+    imports = ImportCache(SymbolIndex())
+    empty = DocumentSession(doc.uri, imports).retained_size()
+    session = DocumentSession(doc.uri, imports)
+    session.ast.build_ast(doc)
+
+    assert session.retained_size() > 10 * empty
+    assert retained_size(session.ast.ast_data) < session.retained_size()
+
+
+def test_release_and_restore(vyper_document, function_code):
+    """Released documents keep their index entry and get their trees back."""
+    doc, file_path = vyper_document
+    doc = Document(uri=uri_from_path(file_path), source=function_code)
+
+    session = DocumentSession(doc.uri, ImportCache(SymbolIndex()))
+    session.ast.build_ast(doc)
+    analyzed = session.retained_size()
+    symbols = session.ast.symbols
+
+    session.release()
+    assert session.ast.released
+    assert session.ast.get_internal_functions() == []
+    assert session.ast.symbols is symbols
+    assert session.retained_size() * 10 < analyzed
+
+    session.ast.restore()
+    assert not session.ast.released
+    assert session.ast.get_internal_functions() == ["_calculate"]
+    assert session.navigator.find_declaration(doc, Position(line=10, character=17))
+
+
+def test_failed_restore_is_not_retried(vyper_document, function_code, monkeypatch):
+    """A document whose last analysis no longer restores waits for a check."""
+    doc, file_path = vyper_document
+    doc = Document(uri=uri_from_path(file_path), source=function_code)
+
+    session = DocumentSession(doc.uri, ImportCache(SymbolIndex()))
+    session.ast.build_ast(doc)
+    session.release()
+
+    analyzed = []
+
+    def analyze_module(doc):
+        analyzed.append(doc)
+        raise StructureException("an imported module changed")
+
+    monkeypatch.setattr(session.ast, "_analyze_module", analyze_module)
+    assert not session.ast.restore()
+    assert not session.ast.released
+    assert session.ast.restore()
+    assert len(analyzed) == 1
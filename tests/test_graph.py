@@ -0,0 +1,32 @@
+from vyper_lsp.graph import ImportGraph
+
+
+def test_dependents_in_import_order():
+    graph = ImportGraph()
+    graph.update("/main.vy", ["/lib.vy", "/token.vy"])
+    graph.update("/token.vy", ["/lib.vy"])
+    graph.update("/lib.vy", ["/math.vy"])
+    graph.update("/other.vy", [])
+
+    assert graph.dependents("/math.vy") == ["/lib.vy", "/token.vy", "/main.vy"]
+    assert graph.dependents("/token.vy") == ["/main.vy"]
+    assert graph.dependents("/other.vy") == []
+    # a batch of changes, each dependent only once
+    assert graph.dependents("/math.vy", "/token.vy") == [
+        "/lib.vy",
+        "/token.vy",
+        "/main.vy",
+    ]
+
+
+def test_update_replaces_edges():
+    graph = ImportGraph()
+    graph.update("/main.vy", ["/lib.vy"])
+    graph.update("/main.vy", ["/token.vy"])
+
+    assert graph.dependents("/lib.vy") == []
+    assert graph.dependents("/token.vy") == ["/main.vy"]
+
+    graph.remove("/main.vy")
+    assert graph.dependents("/token.vy") == []
+    assert graph.imported_by == {}
@@ -0,0 +1,100 @@
+import pytest
+
+from vyper_lsp import index as index_module
+from vyper_lsp.index import SymbolIndex, symbols_from_source
+from vyper_lsp.store import IndexStore
+
+
+LIB = """
+counter: uint256
+FEE: constant(uint256) = 10
+
+struct Point:
+    x: uint256
+    y: uint256
+
+@internal
+def increment_counter(by: uint256 = 1):
+    self.counter += by
+"""
+
+MAIN = """
+import lib
+
+initializes: lib
+
+@external
+def increment():
+    lib.increment_counter()
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "lib.vy").write_text(LIB)
+    (tmp_path / "main.vy").write_text(MAIN)
+    (tmp_path / ".venv").mkdir()
+    (tmp_path / ".venv" / "ignored.vy").write_text(LIB)
+    return tmp_path
+
+
+def test_symbols_from_source():
+    file_symbols = symbols_from_source(LIB, "/tmp/lib.vy")
+    by_name = {s.name: s for s in file_symbols.symbols}
+
+    assert by_name["counter"].kind == "variable"
+    assert by_name["FEE"].kind == "constant"
+    assert by_name["Point"].kind == "struct"
+    assert by_name["x"].container == "Point"
+
+    fn = by_name["increment_counter"]
+    assert fn.kind == "function"
+    assert fn.detail == "@internal nonpayable"
+    assert fn.signature == "increment_counter(by: uint256 = 1)"
+    assert fn.selection == (9, 4, 9, 21)
+
+    refs = [(r.name, r.qualifier) for r in file_symbols.references]
+    assert ("counter", "self") in refs
+    # builtin types are not recorded as references
+    assert ("uint256", None) not in refs
+
+
+def test_index_folder_resolves_imports(workspace):
+    idx = SymbolIndex()
+    assert idx.index_folder(workspace) == 2
+
+    main = idx.get(str(workspace / "main.vy"))
+    assert [(i.alias, i.path) for i in main.imports] == [
+        ("lib", str(workspace / "lib.vy"))
+    ]
+    assert ("increment_counter", "lib") in [
+        (r.name, r.qualifier) for r in main.references
+    ]
+
+
+def test_warm_restart_only_reindexes_changed_files(workspace, monkeypatch):
+    store = IndexStore()
+    SymbolIndex(store, vyper_version="0.4.1").index_folder(workspace)
+
+    parsed = []
+    original = index_module.symbols_from_source
+
+    def tracking_symbols_from_source(source, path, search_paths=None):
+        parsed.append(path)
+        return original(source, path, search_paths)
+
+    monkeypatch.setattr(
+        index_module, "symbols_from_source", tracking_symbols_from_source
+    )
+
+    (workspace / "main.vy").write_text(MAIN + "\nx: uint256\n")
+    idx = SymbolIndex(store, vyper_version="0.4.1")
+    idx.index_folder(workspace)
+
+    assert parsed == [str(workspace / "main.vy")]
+    assert "counter" in [s.name for s in idx.get(str(workspace / "lib.vy")).symbols]
+
+    # a different compiler version invalidates every entry
+    parsed.clear()
+    SymbolIndex(store, vyper_version="0.4.2").index_folder(workspace)
+    assert len(parsed) == 2
@@ -35,7 +35,8 @@ def foobar():
     sig_help = analyzer.signature_help(doc, params)
     assert sig_help is None
 
-    pos = Position(line=7, character=13)
+    # after the comma in `self.foo(1, 2)`
+    pos = Position(line=7, character=16)
     params = SignatureHelpParams(
         text_document=TextDocumentIdentifier(doc.uri), position=pos
     )
@@ -53,10 +54,53 @@ def foobar():
     sig_help = analyzer.signature_help(doc, params)
     assert sig_help
     assert sig_help.active_signature == 0
-    assert sig_help.signatures[0].active_parameter == 1
+    # the innermost call, `self.baz(1)`, has only one argument
+    assert sig_help.signatures[0].active_parameter == 0
     assert sig_help.signatures[0].label == "baz(x: int128) -> int128"
 
 
+def test_signature_help_multiline(ast: AST):
+    src = """
+@internal
+def foo(x: int128, y: DynArray[int128, 3] = [1, 2]) -> int128:
+    return x
+
+@external
+def bar():
+    self.foo(
+        1,
+        [3, 4],
+    )
+"""
+    ast.build_ast(src)
+    analyzer = SignatureHandler(ast)
+    doc = Document(uri="<inline source code>", source=src)
+
+    def sig_help_at(line, character):
+        params = SignatureHelpParams(
+            text_document=TextDocumentIdentifier(doc.uri),
+            position=Position(line=line, character=character),
+        )
+        return analyzer.signature_help(doc, params)
+
+    sig_help = sig_help_at(8, 9)
+    label = sig_help.signatures[0].label
+    assert label == "foo(x: int128, y: DynArray[int128, 3] = [1, 2]) -> int128"
+    assert sig_help.signatures[0].active_parameter == 0
+    start, end = sig_help.signatures[0].parameters[1].label
+    assert label[start:end] == "y: DynArray[int128, 3] = [1, 2]"
+
+    # the comma inside the list literal doesn't count
+    assert sig_help_at(9, 11).signatures[0].active_parameter == 1
+
+    # outside of any call
+    assert sig_help_at(6, 10) is None
+
+    # unknown functions have no signature
+    doc = Document(uri="<inline source code>", source=src + "    self.nope(1)\n")
+    assert sig_help_at(11, 14) is None
+
+
 def test_hover(ast: AST):
     src = """
 @internal
@@ -99,3 +143,38 @@ def baz():
     hover = handler.hover_info(doc, pos)
     assert hover
     assert hover == "(Internal Function) def noreturn(x: uint256):"
+
+
+def test_hover_cached_per_analysis(ast: AST, monkeypatch):
+    src = """
+@internal
+def foo(x: int128) -> int128:
+    return x
+
+@external
+def bar():
+    self.foo(1)
+"""
+    ast.build_ast(src)
+    doc = Document(uri="<inline source code>", source=src)
+    handler = HoverHandler(ast)
+
+    pos = Position(line=7, character=10)
+    hover = handler.hover_info(doc, pos)
+    assert hover == "(Internal Function) def foo(x: int128) -> int128:"
+
+    # repeated hovers don't walk the tree again
+    def fail(*args):
+        raise AssertionError("hover was recomputed")
+
+    with monkeypatch.context() as m:
+        m.setattr(ast, "find_function_declaration_node_for_name", fail)
+        assert handler.hover_info(doc, pos) == hover
+
+    # until there is a new analysis
+    src = src.replace("x: int128) -> int128", "x: uint256) -> uint256")
+    ast.build_ast(src)
+    doc = Document(uri="<inline source code>", source=src)
+    assert handler.hover_info(doc, pos) == (
+        "(Internal Function) def foo(x: uint256) -> uint256:"
+    )
@@ -0,0 +1,78 @@
+from lsprotocol.types import InlayHintKind, Position, Range
+
+from vyper_lsp.ast import AST
+from vyper_lsp.handlers.inlay_hints import BLOCK_LINES, InlayHintHandler
+
+SRC = """event Transfer:
+    sender: address
+    amount: uint256
+
+N: constant(uint256) = 2
+M: constant(uint256) = N**N * 100
+
+@internal
+def _add(a: uint256, b: uint256) -> uint256:
+    return a + b
+
+@external
+def f(b: uint256):
+    x: uint256 = self._add(1, b)
+    log Transfer(msg.sender, x)
+"""
+
+
+def full_range(lines: int = 100) -> Range:
+    return Range(
+        start=Position(line=0, character=0), end=Position(line=lines, character=0)
+    )
+
+
+def hints(handler, range_):
+    return [
+        (h.position.line, h.position.character, h.label, h.kind)
+        for h in handler.inlay_hints(range_)
+    ]
+
+
+def test_inlay_hints():
+    ast = AST()
+    ast.build_ast(SRC)
+    handler = InlayHintHandler(ast)
+
+    assert hints(handler, full_range()) == [
+        (5, 33, "= 400", None),
+        # `b` and `msg.sender` are named like their parameters, no hint
+        (13, 27, "a:", InlayHintKind.Parameter),
+        (14, 29, "amount:", InlayHintKind.Parameter),
+    ]
+
+    # only those in the range
+    visible = Range(
+        start=Position(line=14, character=0), end=Position(line=15, character=0)
+    )
+    assert [h[2] for h in hints(handler, visible)] == ["amount:"]
+
+
+def test_inlay_hints_follow_edits():
+    ast = AST()
+    ast.build_ast(SRC)
+    handler = InlayHintHandler(ast)
+    hints(handler, full_range())
+
+    # two lines inserted at the top, not analyzed yet
+    ast.positions.record(
+        None,
+        Range(start=Position(line=0, character=0), end=Position(line=0, character=0)),
+        "\n\n",
+    )
+    assert hints(handler, full_range())[1] == (15, 27, "a:", InlayHintKind.Parameter)
+
+
+def test_inlay_hints_only_for_requested_blocks():
+    source = "@external\ndef f():\n    pass\n" + "\n" * (3 * BLOCK_LINES)
+    ast = AST()
+    ast.build_ast(source)
+    handler = InlayHintHandler(ast)
+    start = Position(line=2 * BLOCK_LINES, character=0)
+    handler.inlay_hints(Range(start=start, end=start))
+    assert list(handler._blocks) == [2]
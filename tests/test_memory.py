@@ -0,0 +1,39 @@
+import tracemalloc
+
+from pygls.workspace import Document
+
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import SymbolIndex
+from vyper_lsp.memory import memory_report
+from vyper_lsp.session import DocumentSession
+from vyper_lsp.utils import uri_from_path
+
+
+def test_memory_report(tmp_path, function_code):
+    path = tmp_path / "contract.vy"
+    doc = Document(uri=uri_from_path(path), source=function_code)
+    index = SymbolIndex()
+    session = DocumentSession(doc.uri, ImportCache(index))
+    session.ast.build_ast(doc)
+    index.update(session.ast.symbols)
+
+    usage = session.memory_usage()
+    assert set(usage) == {"trees", "index entry", "caches", "total"}
+    assert usage["trees"] > usage["index entry"] > 0
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        report = memory_report(
+            {doc.uri: usage}, {"workspace index": index}, tmp_path / "report.txt"
+        )
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    text = report.read_text()
+    assert report == tmp_path / "report.txt"
+    assert doc.uri in text
+    assert "workspace index:" in text
+    assert "traced:" in text
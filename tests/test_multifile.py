@@ -5,6 +5,10 @@ from pygls.workspace import Document
 from vyper.compiler.input_bundle import FilesystemInputBundle
 from vyper_lsp.handlers.completion import CompletionHandler
 from vyper.ast import nodes
+from lsprotocol.types import Position
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import SymbolIndex
+from vyper_lsp.navigation import ASTNavigator
 
 
 @pytest.fixture
@@ -109,4 +113,93 @@ def test_multifile_completions(multifile_setup):
     
     assert "get_count" in completion_labels  # external function
     assert "counter" in completion_labels  # variable
-    assert "increment_counter" not in completion_labels  # internal function not shown in exports
\ No newline at end of file
+    assert "increment_counter" not in completion_labels  # internal function not shown in exports
+
+def test_multifile_imported_declaration(multifile_setup):
+    """Test that module members resolve to a location in the imported file"""
+    tmp_path, main_content = multifile_setup
+
+    doc = Document(
+        uri=f"file://{tmp_path.absolute()}/main.vy",
+        source=main_content
+    )
+    ast = AST()
+    ast.build_ast(doc)
+
+    index = SymbolIndex()
+    navigator = ASTNavigator(ast, ImportCache(index))
+    lib_uri = f"file://{tmp_path.absolute()}/lib.vy"
+
+    # lib.increment_counter() on line 7
+    location = navigator.find_imported_declaration(doc, Position(line=7, character=10))
+    assert location.uri == lib_uri
+    assert location.range.start.line == 4
+
+    # lib.counter on line 11
+    location = navigator.find_imported_declaration(doc, Position(line=11, character=16))
+    assert location.uri == lib_uri
+    assert location.range.start.line == 1
+
+    # the module name itself goes to the top of the module
+    location = navigator.find_imported_declaration(doc, Position(line=7, character=5))
+    assert location.uri == lib_uri
+    assert location.range.start.line == 0
+
+    # local names are not handled here
+    assert navigator.find_imported_declaration(doc, Position(line=6, character=5)) is None
+
+
+def test_multifile_unsaved_import(multifile_setup):
+    """Test that importers are checked against open, unsaved modules"""
+    tmp_path, main_content = multifile_setup
+    lib_path = tmp_path / "lib.vy"
+
+    main_content = main_content + """
+@external
+def reset():
+    lib.reset_counter()
+"""
+    doc = Document(
+        uri=f"file://{tmp_path.absolute()}/main.vy",
+        source=main_content
+    )
+
+    ast = AST()
+    diagnostics = ast.build_ast(doc)
+    assert len(diagnostics) > 0
+
+    # reset_counter only exists in the editor
+    ast.overlay = {
+        str(lib_path): lib_path.read_text() + """
+@internal
+def reset_counter():
+    self.counter = 0
+"""
+    }
+    assert ast.build_ast(doc) == []
+    assert [i.path for i in ast.symbols.imports] == [str(lib_path)]
+
+
+def test_multifile_completion_resolve(multifile_setup):
+    """Test that module function details are only computed on resolve"""
+    tmp_path, main_content = multifile_setup
+
+    doc = Document(
+        uri=f"file://{tmp_path.absolute()}/main.vy",
+        source=main_content
+    )
+    ast = AST()
+    ast.build_ast(doc)
+
+    handler = CompletionHandler(ast, doc.uri)
+    function_node = nodes.FunctionDef()
+    completions = handler._dot_completions_for_module("lib", top_level_node=function_node)
+    item = next(c for c in completions if c.label == "increment_counter")
+    assert item.documentation is None
+    assert item.data == {"uri": doc.uri, "module": "lib", "name": "increment_counter"}
+
+    resolved = handler.resolve_completion(item)
+    assert "increment\\_counter" in resolved.label_details.detail
+    assert resolved.documentation.startswith(resolved.label_details.detail)
+    # the cached item is left as is
+    assert item.documentation is None
@@ -1,4 +1,4 @@
-from lsprotocol.types import Position
+from lsprotocol.types import Position, Range
 from pygls.workspace import Document
 
 from vyper_lsp.ast import AST
@@ -150,3 +150,47 @@ def test_find_implementation_variable_returns_none(doc, navigator: ASTNavigator)
     pos = Position(line=26, character=13)
     implementation = navigator.find_implementation(doc, pos)
     assert implementation is None
+
+
+def test_find_declaration_after_failed_edit(doc, ast, navigator: ASTNavigator):
+    # a half-typed line above `foo`, the document no longer compiles
+    edit = Range(
+        start=Position(line=29, character=0), end=Position(line=29, character=0)
+    )
+    text = "    q: uint256 = self.\n"
+    references = navigator.find_references(doc, Position(line=29, character=5))
+    lines = doc.lines
+    edited = Document(uri=doc.uri, source="".join(lines[:29] + [text] + lines[29:]))
+    ast.positions.record(None, edit, text)
+    assert ast.build_ast(edited)
+
+    # answered from the last good analysis, at the edited positions
+    pos = Position(line=36, character=17)
+    declaration = navigator.find_declaration(edited, pos)
+    assert declaration and declaration.start.line == 41
+
+    pos = Position(line=30, character=5)
+    assert [r.start.line for r in navigator.find_references(edited, pos)] == [
+        r.start.line + (r.start.line >= 29) for r in references
+    ]
+
+    node = ast.find_top_level_node_at_pos(Position(line=29, character=22))
+    assert node.name == "__init__"
+
+
+def test_find_declaration_after_edit_in_its_body(doc, ast, navigator: ASTNavigator):
+    # typing inside `bar`, whose whole definition is the declaration
+    edit = Range(
+        start=Position(line=41, character=4), end=Position(line=41, character=4)
+    )
+    text = "x = \n    "
+    lines = doc.lines
+    edited_line = lines[41][:4] + text + lines[41][4:]
+    edited = Document(
+        uri=doc.uri, source="".join(lines[:41] + [edited_line] + lines[42:])
+    )
+    ast.positions.record(None, edit, text)
+    assert ast.build_ast(edited)
+
+    declaration = navigator.find_declaration(edited, Position(line=35, character=17))
+    assert declaration and (declaration.start.line, declaration.end.line) == (40, 42)
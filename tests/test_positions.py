@@ -0,0 +1,79 @@
+from lsprotocol.types import Position, Range
+
+from vyper_lsp.positions import PositionMap
+
+
+def _range(start_line, start_char, end_line, end_char):
+    return Range(
+        start=Position(line=start_line, character=start_char),
+        end=Position(line=end_line, character=end_char),
+    )
+
+
+def test_unchanged_map_is_identity():
+    positions = PositionMap()
+    assert positions.to_analysis(Position(line=3, character=4)) == Position(
+        line=3, character=4
+    )
+    assert positions.from_analysis(_range(1, 2, 3, 4)) == _range(1, 2, 3, 4)
+
+
+def test_inserted_lines_shift_positions():
+    positions = PositionMap()
+    positions.record(1, _range(2, 0, 2, 0), "a\nb\n")
+
+    assert positions.to_analysis(Position(line=1, character=3)) == Position(
+        line=1, character=3
+    )
+    assert positions.to_analysis(Position(line=5, character=3)) == Position(
+        line=3, character=3
+    )
+    # positions in inserted text map to where it was inserted
+    assert positions.to_analysis(Position(line=3, character=1)) == Position(
+        line=2, character=0
+    )
+    assert positions.from_analysis(_range(3, 0, 3, 4)) == _range(5, 0, 5, 4)
+
+
+def test_edits_within_a_line():
+    positions = PositionMap()
+    # "foo = bar" -> "foo = self.bar"
+    positions.record(1, _range(0, 6, 0, 6), "self.")
+    # "foo = self.bar" -> "fo = self.bar"
+    positions.record(2, _range(0, 2, 0, 3), "")
+
+    assert positions.from_analysis(_range(0, 6, 0, 9)) == _range(0, 10, 0, 13)
+    assert positions.to_analysis(Position(line=0, character=11)) == Position(
+        line=0, character=7
+    )
+    # ranges containing edited text shrink or grow with it
+    assert positions.from_analysis(_range(0, 0, 0, 3)) == _range(0, 0, 0, 2)
+
+
+def test_reset_keeps_later_edits():
+    positions = PositionMap()
+    positions.record(1, _range(0, 0, 0, 0), "\n")
+    positions.record(2, _range(0, 0, 0, 0), "\n")
+    positions.reset(1)
+    assert positions.from_analysis(_range(3, 0, 3, 1)) == _range(4, 0, 4, 1)
+
+    positions.reset()
+    assert not positions
+
+
+def test_edit_inside_a_function_body():
+    positions = PositionMap()
+    # a line typed at the start of the body of a function on lines 1-2
+    positions.record(1, _range(2, 4, 2, 4), "x = \n    ")
+
+    assert positions.from_analysis(_range(1, 0, 2, 12)) == _range(1, 0, 3, 12)
+
+
+def test_ranges_with_an_end_in_edited_text_are_gone():
+    positions = PositionMap()
+    # "self.total" -> "self.count"
+    positions.record(1, _range(0, 5, 0, 10), "count")
+
+    assert positions.from_analysis(_range(0, 7, 0, 10)) is None
+    assert positions.from_analysis(_range(0, 0, 0, 7)) is None
+    assert positions.from_analysis(_range(0, 0, 0, 4)) == _range(0, 0, 0, 4)
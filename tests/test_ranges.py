@@ -0,0 +1,63 @@
+from lsprotocol.types import Position
+from pygls.workspace import Document
+
+from vyper_lsp.ast import AST
+from vyper_lsp.handlers.ranges import RangeHandler
+
+SRC = """x: uint256
+
+struct Point:
+    x: uint256
+    y: uint256
+
+@external
+def foo(a: uint256) -> uint256:
+    if a > 1:
+        self.x = a
+        return a + 1
+    return self.x
+"""
+
+
+def folds(handler, doc):
+    return [(f.start_line, f.end_line) for f in handler.folding_ranges(doc)]
+
+
+def chain(selection):
+    ranges = []
+    while selection is not None:
+        r = selection.range
+        ranges.append((r.start.line, r.start.character, r.end.line, r.end.character))
+        selection = selection.parent
+    return ranges
+
+
+def test_folding_ranges():
+    ast = AST()
+    ast.build_ast(SRC)
+    handler = RangeHandler(ast)
+    doc = Document("", SRC)
+    assert folds(handler, doc) == [(2, 4), (7, 11), (8, 10)]
+
+    # while the code doesn't compile, from the grammar
+    broken = Document("", SRC.replace("return self.x", "return self.x +"))
+    assert folds(handler, broken) == [(2, 4), (6, 11)]
+
+
+def test_selection_ranges():
+    ast = AST()
+    ast.build_ast(SRC)
+    handler = RangeHandler(ast)
+    doc = Document("", SRC)
+
+    # `a` in `return a + 1`: the name, the sum, the return, the if, the function
+    (selection,) = handler.selection_ranges(doc, [Position(line=10, character=15)])
+    ranges = chain(selection)
+    assert ranges[0] == (10, 15, 10, 16)
+    assert ranges[1] == (10, 15, 10, 20)
+    assert ranges[2] == (10, 8, 10, 20)
+    assert ranges[-1][0] == 6
+
+    # outside of any statement
+    (selection,) = handler.selection_ranges(doc, [Position(line=1, character=0)])
+    assert chain(selection) == [(1, 0, 1, 0)]
@@ -0,0 +1,81 @@
+from lsprotocol.types import Position
+from pygls.workspace import Document
+
+from vyper_lsp.handlers.references import ReferenceHandler
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import SymbolIndex
+
+LIB = """
+counter: uint256
+FEE: constant(uint256) = 10
+
+@internal
+def increment_counter():
+    self.counter += FEE
+"""
+
+MAIN = """
+import lib
+
+initializes: lib
+
+@external
+def increment():
+    lib.increment_counter()
+    lib.increment_counter()
+"""
+
+OTHER = """
+import lib as counter_lib
+
+initializes: counter_lib
+
+@external
+def fee() -> uint256:
+    return counter_lib.FEE
+"""
+
+
+def _handler(tmp_path):
+    for name, source in [("lib.vy", LIB), ("main.vy", MAIN), ("other.vy", OTHER)]:
+        (tmp_path / name).write_text(source)
+    index = SymbolIndex()
+    index.index_folder(tmp_path, [])
+    return ReferenceHandler(index, ImportCache(index))
+
+
+def _locations(handler, path, source, line, character, include_declaration=True):
+    doc = Document(uri=f"file://{path}", source=source)
+    locations = handler.find_references(
+        doc, Position(line=line, character=character), include_declaration
+    )
+    if locations is None:
+        return None
+    return [(loc.uri.rsplit("/", 1)[-1], loc.range.start.line) for loc in locations]
+
+
+def test_references_across_files(tmp_path):
+    handler = _handler(tmp_path)
+
+    # from a call site in an importing module
+    assert _locations(handler, tmp_path / "main.vy", MAIN, 7, 10) == [
+        ("lib.vy", 5),
+        ("main.vy", 7),
+        ("main.vy", 8),
+    ]
+
+    # from the declaration, through a renamed import
+    assert _locations(handler, tmp_path / "lib.vy", LIB, 2, 0, False) == [
+        ("lib.vy", 6),
+        ("other.vy", 7),
+    ]
+
+
+def test_references_not_module_level(tmp_path):
+    handler = _handler(tmp_path)
+
+    # `increment_counter` without `self.` is not the function
+    source = LIB + "\n# increment_counter\n"
+    assert _locations(handler, tmp_path / "lib.vy", source, 8, 4) is None
+    # the module alias itself
+    assert _locations(handler, tmp_path / "main.vy", MAIN, 7, 5) is None
@@ -0,0 +1,77 @@
+import time
+
+from vyper_lsp.index import SymbolRecord
+from vyper_lsp.search import SymbolSearch
+
+
+def _records(*names):
+    return [
+        SymbolRecord(name, "function", (0, 0, 0, 1), (0, 0, 0, 1)) for name in names
+    ]
+
+
+def _names(results):
+    return [record.name for _, record in results]
+
+
+def test_prefix_and_exact_rank_first():
+    search = SymbolSearch()
+    search.replace("a.vy", _records("get_count", "count", "counter", "account"))
+
+    assert _names(search.search("count")) == [
+        "count",
+        "counter",
+        "get_count",
+        "account",
+    ]
+
+
+def test_fuzzy_subsequence():
+    search = SymbolSearch()
+    search.replace("a.vy", _records("get_count", "getBalance", "transfer"))
+
+    assert _names(search.search("gcnt")) == ["get_count"]
+    assert _names(search.search("gb")) == ["getBalance"]
+    assert _names(search.search("xyz")) == []
+
+
+def test_short_queries_match_mid_name():
+    search = SymbolSearch()
+    search.replace("a.vy", _records("transfer", "balanceOf", "owner"))
+
+    assert _names(search.search("ns")) == ["transfer"]
+    assert _names(search.search("ce")) == ["balanceOf"]
+    assert _names(search.search("w")) == ["owner"]
+
+
+def test_replace_and_remove_file():
+    search = SymbolSearch()
+    search.replace("a.vy", _records("foo", "bar"))
+    search.replace("b.vy", _records("foobar"))
+    search.replace("a.vy", _records("baz"))
+
+    assert [path for path, _ in search.search("foo")] == ["b.vy"]
+    # "bar" went with the replaced symbols of a.vy
+    assert _names(search.search("ba")) == ["baz", "foobar"]
+
+    search.remove("b.vy")
+    assert search.search("foo") == []
+    assert len(search) == 1
+
+
+def test_search_is_fast_on_large_index():
+    search = SymbolSearch()
+    for i in range(2000):
+        search.replace(
+            f"file_{i}.vy",
+            _records(*[f"fn_{i}_{j}" for j in range(20)], f"get_total_supply_{i}"),
+        )
+    search.search("warmup")
+
+    start = time.perf_counter()
+    results = search.search("gtsup", limit=50)
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 50
+    assert all(record.name.startswith("get_total_supply") for _, record in results)
+    assert elapsed < 0.5
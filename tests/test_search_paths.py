@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from vyper_lsp import search_paths as search_paths_module
+from vyper_lsp.search_paths import SearchPaths
+
+
+def test_search_paths_are_cached_per_directory(tmp_path, monkeypatch):
+    resolved = []
+    get_search_paths = search_paths_module.get_search_paths
+    monkeypatch.setattr(
+        search_paths_module,
+        "get_search_paths",
+        lambda paths=None: resolved.append(paths) or get_search_paths(paths),
+    )
+    (tmp_path / "contracts").mkdir()
+    search_paths = SearchPaths()
+    search_paths.configure(roots=[tmp_path])
+
+    first = search_paths.for_file(tmp_path / "contracts" / "A.vy")
+    assert search_paths.for_file(tmp_path / "contracts" / "B.vy") is first
+    assert resolved == [[str(tmp_path), str(tmp_path / "contracts")]]
+    # the document's directory takes precedence over the workspace folder
+    assert first[-2:] == [tmp_path, tmp_path / "contracts"]
+
+
+def test_configured_search_paths(tmp_path):
+    (tmp_path / "lib").mkdir()
+    site_packages = tmp_path / ".venv" / "lib" / "python3.12" / "site-packages"
+    site_packages.mkdir(parents=True)
+    search_paths = SearchPaths()
+    search_paths.configure(roots=[tmp_path])
+    assert tmp_path / "lib" not in search_paths.for_directory(tmp_path)
+
+    search_paths.configure(
+        settings={"searchPaths": ["lib", "missing"], "venv": ".venv"}
+    )
+    paths = search_paths.for_directory(tmp_path)
+    assert paths[-3:] == [tmp_path / "lib", site_packages, tmp_path]
+    assert tmp_path / "missing" not in paths
+
+    # settings which don't mention the paths keep them
+    search_paths.configure(settings={})
+    search_paths.configure(settings={"debounce": {"min": 0.1}})
+    assert search_paths.for_directory(tmp_path) == paths
+    search_paths.configure(settings={"venv": None})
+    assert search_paths.for_directory(tmp_path)[-2:] == [tmp_path / "lib", tmp_path]
+
+
+def test_directory_outside_workspace(tmp_path):
+    search_paths = SearchPaths()
+    search_paths.configure(roots=[tmp_path / "workspace"])
+    assert search_paths.root_for(tmp_path) == tmp_path
+    assert search_paths.for_directory(tmp_path)[-1] == tmp_path
+    assert Path(".") in search_paths.for_directory(tmp_path)
@@ -0,0 +1,109 @@
+from lsprotocol.types import SemanticTokens, SemanticTokensDelta
+from pygls.workspace import Document
+
+from vyper_lsp.ast import AST
+from vyper_lsp.handlers.semantic_tokens import (
+    LEGEND,
+    SemanticTokensHandler,
+    encode,
+    token_edits,
+)
+
+
+def decode(data, source):
+    lines = source.splitlines()
+    tokens = []
+    line = character = 0
+    for i in range(0, len(data), 5):
+        delta_line, delta_character, length, type_, modifiers = data[i : i + 5]
+        line += delta_line
+        character = character + delta_character if delta_line == 0 else delta_character
+        text = lines[line][character : character + length]
+        modifier_names = [
+            name
+            for bit, name in enumerate(LEGEND.token_modifiers)
+            if modifiers >> bit & 1
+        ]
+        tokens.append((text, LEGEND.token_types[type_], modifier_names))
+    return tokens
+
+
+def test_semantic_tokens(example_documents):
+    source = example_documents["Foo.vy"]
+    ast = AST()
+    ast.build_ast(source)
+    tokens = decode(
+        SemanticTokensHandler(ast).semantic_tokens(Document("", source)).data, source
+    )
+
+    assert ("Roles", "enum", ["declaration"]) in tokens
+    assert ("ADMIN", "enumMember", []) in tokens
+    assert ("FEE", "variable", ["declaration", "readonly"]) in tokens
+    assert ("FEE", "variable", ["readonly"]) in tokens
+    assert ("bar", "function", []) in tokens
+    assert ("m", "variable", []) in tokens
+    assert ("Foo", "event", []) in tokens
+    assert ("Ownable", "interface", ["declaration"]) in tokens
+
+
+def test_semantic_tokens_delta():
+    ast = AST()
+    ast.build_ast("x: uint256\n\n@external\ndef foo():\n    self.x = 1\n")
+    handler = SemanticTokensHandler(ast)
+    doc = Document("", "")
+    full = handler.semantic_tokens(doc)
+
+    # unchanged: an empty delta
+    delta = handler.semantic_tokens_delta(doc, full.result_id)
+    assert isinstance(delta, SemanticTokensDelta)
+    assert delta.edits == [] and delta.result_id == full.result_id
+
+    ast.build_ast(
+        "x: uint256\n\n@external\ndef foo():\n    self.x = 1\n    self.x = 2\n"
+    )
+    delta = handler.semantic_tokens_delta(doc, full.result_id)
+    assert delta.result_id != full.result_id
+    (edit,) = delta.edits
+    new = (
+        full.data[: edit.start]
+        + edit.data
+        + full.data[edit.start + edit.delete_count :]
+    )
+    assert new == handler.semantic_tokens(doc).data
+
+    # a result the handler doesn't know of can only be answered in full
+    assert isinstance(handler.semantic_tokens_delta(doc, "stale"), SemanticTokens)
+
+
+def test_token_edits():
+    old = encode([(0, 0, 1, 0, 0), (1, 0, 1, 0, 0)])
+    new = encode([(0, 0, 1, 0, 0), (1, 0, 1, 0, 0), (2, 4, 3, 1, 0)])
+    (edit,) = token_edits(old, new)
+    assert edit.start == len(old) and edit.delete_count == 0
+    assert edit.data == [1, 4, 3, 1, 0]
+
+
+def test_attribute_after_staticcall():
+    # vyper's end offsets are off after a staticcall on the same line
+    source = """interface I:
+    def f() -> uint256: view
+
+x: uint256
+
+@internal
+def _g() -> uint256:
+    return 1
+
+@external
+def foo(i: I, y: uint256) -> uint256:
+    return staticcall i.f() + self._g() + self.x + y
+"""
+    ast = AST()
+    ast.build_ast(source)
+    tokens = decode(
+        SemanticTokensHandler(ast).semantic_tokens(Document("", source)).data, source
+    )
+
+    assert all(text for text, _, _ in tokens)
+    assert ("s", "variable", []) not in tokens
+    assert ("f", "method", []) in tokens
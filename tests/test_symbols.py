@@ -0,0 +1,81 @@
+from lsprotocol.types import SymbolKind
+from pygls.workspace import Document
+
+from vyper_lsp.handlers.symbols import SymbolHandler
+from vyper_lsp.index import SymbolIndex, symbols_from_source
+
+SRC = """
+struct Point:
+    x: uint256
+
+total_supply: public(uint256)
+
+@external
+@view
+def get_total_supply() -> uint256:
+    return self.total_supply
+"""
+
+
+def test_workspace_symbols():
+    index = SymbolIndex()
+    index.update(symbols_from_source(SRC, "/tmp/token.vy"))
+    handler = SymbolHandler(index)
+
+    symbols = handler.workspace_symbols("gettot")
+    assert [s.name for s in symbols] == ["get_total_supply"]
+    assert symbols[0].kind == SymbolKind.Function
+    assert symbols[0].location.uri == "file:///tmp/token.vy"
+    assert symbols[0].location.range.start.line == 8
+
+    # struct members are not workspace symbols
+    assert [s.name for s in handler.workspace_symbols("x")] == []
+    assert [s.kind for s in handler.workspace_symbols("point")] == [SymbolKind.Struct]
+
+
+def test_document_symbols_from_analysis():
+    index = SymbolIndex()
+    index.update(symbols_from_source(SRC, "/tmp/token.vy"))
+    handler = SymbolHandler(index)
+    doc = Document(uri="file:///tmp/token.vy", source=SRC)
+
+    outline = handler.document_symbols(doc)
+    assert [(s.name, s.kind) for s in outline] == [
+        ("Point", SymbolKind.Struct),
+        ("total_supply", SymbolKind.Variable),
+        ("get_total_supply", SymbolKind.Function),
+    ]
+    assert [c.name for c in outline[0].children] == ["x"]
+    assert outline[1].detail == "uint256"
+    assert outline[2].detail == "@external @view"
+    assert outline[2].selection_range.start.line == 8
+
+    # unchanged documents are served from cache
+    assert handler.document_symbols(doc) is outline
+
+
+def test_document_symbols_fallback():
+    index = SymbolIndex()
+    index.update(symbols_from_source(SRC, "/tmp/token.vy"))
+    handler = SymbolHandler(index)
+
+    # a half-typed function and a new flag, which don't compile
+    broken = (
+        SRC
+        + """
+flag Roles:
+    ADMIN
+
+@internal
+def _mint(to: address) -> uint256:
+    self.total_supply +=
+"""
+    )
+    doc = Document(uri="file:///tmp/token.vy", source=broken)
+    outline = handler.document_symbols(doc)
+
+    names = [s.name for s in outline]
+    assert names == ["Point", "total_supply", "get_total_supply", "Roles", "_mint"]
+    assert [c.name for c in outline[3].children] == ["ADMIN"]
+    assert outline[4].detail == "@internal nonpayable"
+    assert outline[4].selection_range.start.line == 15
@@ -1,22 +1,29 @@
 import copy
 import logging
-from typing import Optional, List
-from lsprotocol.types import Diagnostic, Position
+from typing import Mapping, Optional, List
+from lsprotocol.types import Diagnostic, Position, Range
 from pygls.workspace import Document
-from vyper.ast import VyperNode, nodes
+from vyper.ast import VyperNode, nodes, parse_to_ast
 from vyper.compiler import CompilerData
-from vyper.compiler.input_bundle import FilesystemInputBundle
 from vyper.compiler.phases import DEFAULT_CONTRACT_PATH, ModuleT
 from vyper.semantics.types import StructT
 from vyper.semantics.types.user import FlagT
 from vyper.exceptions import VyperException
-from vyper.cli.vyper_compile import get_search_paths
 import warnings
 import re
 
+from vyper_lsp.compilers import CompilerPool
+from vyper_lsp.imports import OverlayInputBundle
+from vyper_lsp.incremental import edited_function, reanalyze_function
+from vyper_lsp.index import FileSymbols, content_hash, symbols_from_module
+from vyper_lsp.positions import PositionMap
+from vyper_lsp.search_paths import SearchPaths
 from vyper_lsp.utils import (
     create_diagnostic_warning,
     diagnostic_from_exception,
+    path_from_uri,
+    range_from_node,
+    uri_from_path,
     working_directory_for_document,
     document_to_fileinput,
 )
@@ -28,6 +35,37 @@ pattern_text = r"(.+) will be deprecated in a future release, use (.+) instead\.
 deprecation_pattern = re.compile(pattern_text)
 
 
+def deprecation_diagnostics(lines: List[str], messages: List[str]) -> List[Diagnostic]:
+    replacements = {}
+    for message in messages:
+        m = deprecation_pattern.match(message)
+        if not m:
+            continue
+        deprecated = m.group(1)
+        replacement = m.group(2)
+        replacements[deprecated] = replacement
+
+    # Iterate over the lines and find all deprecated values
+    diagnostics = []
+    for i, line in enumerate(lines):
+        for deprecated, replacement in replacements.items():
+            for match in re.finditer(re.escape(deprecated), line):
+                character_start = match.start()
+                character_end = match.end()
+                diagnostic_message = (
+                    f"{deprecated} is deprecated. Please use {replacement} instead."
+                )
+                diagnostics.append(
+                    create_diagnostic_warning(
+                        line_num=i,
+                        character_start=character_start,
+                        character_end=character_end,
+                        message=diagnostic_message,
+                    )
+                )
+    return diagnostics
+
+
 class AST:
     ast_data = None
     ast_data_annotated = None
@@ -43,6 +81,34 @@ class AST:
     # Import Data
     imports = {}
 
+    # Index entry for the last successfully analyzed source
+    symbols: Optional[FileSymbols] = None
+
+    # The last successfully analyzed source, and what it was analyzed with
+    source: Optional[str] = None
+    search_paths: List = []
+    analyzed_overlay: Mapping[str, str] = {}
+
+    # Import search paths, shared by every document
+    search_path_cache = SearchPaths()
+
+    # Compilers for files pinned to other vyper versions
+    compiler_pool: Optional[CompilerPool] = None
+
+    # Sources of open documents by path, used instead of the files on disk
+    overlay: Mapping[str, str] = {}
+
+    # Incremented whenever a new analysis replaces the module data, so
+    # handlers can tell when results derived from it are stale
+    version = 0
+
+    # Set while the trees of the last analysis are dropped, see `release`
+    released = False
+
+    def __init__(self):
+        # edits made to the document since the analyzed source
+        self.positions = PositionMap()
+
     @classmethod
     def from_node(cls, node: VyperNode):
         ast = cls()
@@ -90,31 +156,135 @@ class AST:
         ]
         self.structs = {structt.name: structt for structt in structt_list}
 
-    def update_ast(self, doc: Document) -> List[Diagnostic]:
-        diagnostics = self.build_ast(doc)
+    def update_ast(
+        self, doc: Document, incremental: bool = False
+    ) -> List[Diagnostic]:
+        diagnostics = self.build_ast(doc, incremental)
         return diagnostics
 
-    def build_ast(self, doc: Document | str) -> List[Diagnostic]:
-        if isinstance(doc, str):
-            doc = Document(uri=str(DEFAULT_CONTRACT_PATH), source=doc)
+    def _other_overlays(self, path: str) -> dict:
+        return {p: source for p, source in self.overlay.items() if p != path}
+
+    def _analyze_module(self, doc: Document):
         uri_parent_path = working_directory_for_document(doc)
-        search_paths = get_search_paths([str(uri_parent_path)])
+        search_paths = self.search_path_cache.for_directory(uri_parent_path)
         fileinput = document_to_fileinput(doc)
         compiler_data = CompilerData(
-            fileinput, input_bundle=FilesystemInputBundle(search_paths)
+            fileinput, input_bundle=OverlayInputBundle(search_paths, self.overlay)
+        )
+        # unforunately we need this deep copy so the ast doesnt change
+        # out from under us when folding stuff happens
+        ast_data = copy.deepcopy(compiler_data.vyper_module)
+        ast_data_annotated = compiler_data.annotated_vyper_module
+        path = str(fileinput.resolved_path)
+        symbols = symbols_from_module(
+            ast_data_annotated, path, content_hash(doc.source), search_paths
+        )
+
+        # the last good analysis is only replaced by a complete one,
+        # requests on a broken document are answered from it
+        self.ast_data = ast_data
+        self.ast_data_annotated = ast_data_annotated
+        self._load_module_data()
+        self._load_import_data()
+        self.symbols = symbols
+        self.search_paths = search_paths
+        self.analyzed_overlay = self._other_overlays(path)
+
+    def _reanalyze_function(self, doc: Document) -> bool:
+        """
+        Re-check only the function body an edit was made in, against the
+        last analysis. Returns False if the edit is not confined to a
+        single function body, so the whole module needs checking.
+        """
+        module = self.ast_data_annotated
+        if module is None or module.is_interface or self.symbols is None:
+            return False
+        fileinput = document_to_fileinput(doc)
+        path = str(fileinput.resolved_path)
+        # the namespace is only current if the imported modules are too
+        if self.symbols.path != path:
+            return False
+        if self.analyzed_overlay != self._other_overlays(path):
+            return False
+
+        edited = edited_function(
+            module, self.source.splitlines(), doc.source.splitlines()
+        )
+        if edited is None:
+            return False
+        old_fn, delta = edited
+
+        new_module = parse_to_ast(
+            doc.source,
+            module_path=fileinput.path.as_posix(),
+            resolved_path=fileinput.resolved_path.as_posix(),
         )
+        new_fn = next(
+            (
+                fn
+                for fn in new_module.get_children(nodes.FunctionDef)
+                if fn.name == old_fn.name
+            ),
+            None,
+        )
+        if new_fn is None:
+            return False
+        ast_data = copy.deepcopy(new_module)
+
+        try:
+            reanalyze_function(module, old_fn, new_fn, delta)
+        except VyperException:
+            raise
+        except Exception as e:
+            logger.warning(f"could not re-check {old_fn.name} on its own: {e}")
+            return False
+
+        self.ast_data = ast_data
+        self.symbols = symbols_from_module(
+            module, path, content_hash(doc.source), self.search_paths
+        )
+        return True
+
+    def build_ast(
+        self, doc: Document | str, incremental: bool = False
+    ) -> List[Diagnostic]:
+        """
+        Analyze `doc`. With `incremental`, an edit confined to a single
+        function body only has that function checked again.
+        """
+        if isinstance(doc, str):
+            doc = Document(uri=str(DEFAULT_CONTRACT_PATH), source=doc)
+        else:
+            # the server keeps editing the document while it is checked,
+            # what is analyzed (and recorded as such) is this one text
+            doc = Document(uri=doc.uri, source=doc.source, version=doc.version)
+
+        worker = self.compiler_pool and self.compiler_pool.worker_for(doc.source)
+        if worker is not None:
+            # pinned to another vyper version, which can only report
+            # errors. the last analysis (if any) is kept for navigation
+            path = path_from_uri(doc.uri)
+            diagnostics, messages = self.compiler_pool.check(
+                worker,
+                str(path),
+                doc.source,
+                self.search_path_cache.for_directory(path.parent),
+            )
+            return diagnostics + deprecation_diagnostics(doc.lines, messages)
+
         diagnostics = []
-        replacements = {}
         warnings.simplefilter("always")
         with warnings.catch_warnings(record=True) as w:
             try:
-                # unforunately we need this deep copy so the ast doesnt change
-                # out from under us when folding stuff happens
-                self.ast_data = copy.deepcopy(compiler_data.vyper_module)
-                self.ast_data_annotated = compiler_data.annotated_vyper_module
-
-                self._load_module_data()
-                self._load_import_data()
+                if not (incremental and self._reanalyze_function(doc)):
+                    self._analyze_module(doc)
+                self.source = doc.source
+                # edits recorded while compiling are of a later version
+                # and still to be mapped
+                self.positions.reset(doc.version)
+                self.released = False
+                self.version += 1
 
             except VyperException as e:
                 # make message string include class name
@@ -127,34 +297,52 @@ class AST:
                             diagnostic_from_exception(a, message=message)
                         )
 
-            for warning in w:
-                m = deprecation_pattern.match(str(warning.message))
-                if not m:
-                    continue
-                deprecated = m.group(1)
-                replacement = m.group(2)
-                replacements[deprecated] = replacement
-
-        # Iterate over doc.lines and find all deprecated values
-        for i, line in enumerate(doc.lines):
-            for deprecated, replacement in replacements.items():
-                for match in re.finditer(re.escape(deprecated), line):
-                    character_start = match.start()
-                    character_end = match.end()
-                    diagnostic_message = (
-                        f"{deprecated} is deprecated. Please use {replacement} instead."
-                    )
-                    diagnostics.append(
-                        create_diagnostic_warning(
-                            line_num=i,
-                            character_start=character_start,
-                            character_end=character_end,
-                            message=diagnostic_message,
-                        )
-                    )
-
+        diagnostics += deprecation_diagnostics(
+            doc.lines, [str(warning.message) for warning in w]
+        )
         return diagnostics
 
+    def release(self):
+        """
+        Drop the trees of the last analysis and everything derived from
+        them, keeping its index entry. `restore` builds them again.
+        """
+        if self.ast_data is None or self.symbols is None:
+            return
+        self.ast_data = None
+        self.ast_data_annotated = None
+        self.functions = {}
+        self.variables = {}
+        self.flags = {}
+        self.structs = {}
+        self.imports = {}
+        self.released = True
+
+    def restore(self) -> bool:
+        """
+        Analyze the last analyzed source again, against the imported
+        modules it was analyzed with, to rebuild what `release` dropped.
+        Positions keep being mapped from that source. Returns False if
+        that source no longer analyzes, leaving no trees until the next
+        `build_ast`.
+        """
+        if not self.released:
+            return True
+        doc = Document(uri=uri_from_path(self.symbols.path), source=self.source)
+        self.overlay = dict(self.analyzed_overlay)
+        # not retried on every request, a failure stays one
+        self.released = False
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            try:
+                self._analyze_module(doc)
+            except VyperException as e:
+                # e.g. an imported module changed on disk since
+                logger.warning(f"could not restore {self.symbols.path}: {e}")
+                return False
+        self.version += 1
+        return True
+
     @property
     def best_ast(self):
         if self.ast_data_annotated:
@@ -341,7 +529,17 @@ class AST:
 
         return return_nodes
 
+    def node_range(self, node: VyperNode) -> Optional[Range]:
+        """
+        Range of `node` in the current document, or None if one of its
+        ends has been edited since it was analyzed.
+        """
+        return self.positions.from_analysis(range_from_node(node))
+
     def find_top_level_node_at_pos(self, pos: Position) -> Optional[VyperNode]:
+        # `pos` is in the current document, which may have been edited
+        # since it was analyzed
+        pos = self.positions.to_analysis(pos)
         nodes = self.get_top_level_nodes()
         for node in nodes:
             if node.lineno <= pos.line and pos.line <= node.end_lineno:
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from lsprotocol.types import Diagnostic, DiagnosticSeverity
+from pygls.workspace import Document
+
+from vyper_lsp.ast import AST
+from vyper_lsp.search_paths import SearchPaths
+from vyper_lsp.utils import get_installed_vyper_version, uri_from_path
+
+logger = logging.getLogger("vyper-lsp")
+
+# headless `vyper-lsp check`: the editor's diagnostics for a whole tree.
+#
+# files are spread over a pool of processes. each process keeps its
+# search paths (and vyper's own caches) across the files it checks, so
+# files are handed out in chunks rather than one by one.
+
+CHECKED_SUFFIXES = (".vy",)
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+_search_paths: Optional[SearchPaths] = None
+
+
+def collect_files(paths: Iterable[Path]) -> List[Path]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(
+                p for p in sorted(path.rglob("*")) if p.suffix in CHECKED_SUFFIXES
+            )
+        else:
+            files.append(path)
+    # a file given twice (e.g. directly and through its folder) is checked once
+    return list(dict.fromkeys(p.resolve() for p in files))
+
+
+def _init_process(roots: List[Path], extra_paths: List[str]):
+    global _search_paths
+    _search_paths = SearchPaths()
+    _search_paths.configure(roots, {"searchPaths": extra_paths})
+
+
+def check_file(path: Path) -> Tuple[str, List[dict]]:
+    """Diagnostics for `path`, as the language server reports them."""
+    try:
+        source = path.read_text()
+    except (OSError, UnicodeDecodeError) as e:
+        return str(path), [_error(f"could not read file: {e}")]
+
+    ast = AST()
+    if _search_paths is not None:
+        ast.search_path_cache = _search_paths
+    diagnostics = ast.build_ast(Document(uri=uri_from_path(path), source=source))
+    return str(path), [_to_json(d) for d in diagnostics]
+
+
+def _error(message: str) -> dict:
+    return {
+        "range": {
+            "start": {"line": 0, "character": 0},
+            "end": {"line": 0, "character": 0},
+        },
+        "severity": "error",
+        "message": message,
+    }
+
+
+def _to_json(diagnostic: Diagnostic) -> dict:
+    start, end = diagnostic.range.start, diagnostic.range.end
+    severity = "warning"
+    if diagnostic.severity in (None, DiagnosticSeverity.Error):
+        severity = "error"
+    return {
+        "range": {
+            "start": {"line": start.line, "character": start.character},
+            "end": {"line": end.line, "character": end.character},
+        },
+        "severity": severity,
+        "message": diagnostic.message,
+    }
+
+
+def check_files(
+    files: List[Path],
+    jobs: int = 1,
+    roots: Optional[List[Path]] = None,
+    extra_paths: Optional[List[str]] = None,
+) -> List[Tuple[str, List[dict]]]:
+    initargs = (roots or [Path.cwd()], extra_paths or [])
+    if jobs <= 1 or len(files) <= 1:
+        _init_process(*initargs)
+        return [check_file(path) for path in files]
+
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_process, initargs=initargs
+    ) as executor:
+        return list(executor.map(check_file, files, chunksize=chunksize))
+
+
+def to_sarif(results: List[Tuple[str, List[dict]]], base: Path) -> dict:
+    sarif_results = []
+    for path, diagnostics in results:
+        try:
+            uri = Path(path).relative_to(base).as_posix()
+        except ValueError:
+            uri = Path(path).as_uri()
+        for diagnostic in diagnostics:
+            start = diagnostic["range"]["start"]
+            end = diagnostic["range"]["end"]
+            sarif_results.append(
+                {
+                    "ruleId": f"vyper/{diagnostic['severity']}",
+                    "level": diagnostic["severity"],
+                    "message": {"text": diagnostic["message"]},
+                    "locations": [
+                        {
+                            "physicalLocation": {
+                                "artifactLocation": {"uri": uri},
+                                # sarif lines and columns are 1-based
+                                "region": {
+                                    "startLine": start["line"] + 1,
+                                    "startColumn": start["character"] + 1,
+                                    "endLine": end["line"] + 1,
+                                    "endColumn": end["character"] + 1,
+                                },
+                            }
+                        }
+                    ],
+                }
+            )
+    return {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": "vyper-lsp",
+                        "properties": {
+                            "vyperVersion": str(get_installed_vyper_version())
+                        },
+                    }
+                },
+                "results": sarif_results,
+            }
+        ],
+    }
+
+
+def run_check(args) -> int:
+    """Entry point of `vyper-lsp check`, returns the exit status."""
+    # only the results go to stdout
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.WARNING)
+
+    files = collect_files(Path(p) for p in args.paths)
+    results = check_files(
+        files,
+        jobs=args.jobs or os.cpu_count() or 1,
+        extra_paths=args.search_path,
+    )
+
+    if args.format == "sarif":
+        output = to_sarif(results, Path.cwd())
+    else:
+        output = [
+            {"path": path, "diagnostics": diagnostics} for path, diagnostics in results
+        ]
+    print(json.dumps(output, indent=2))
+
+    has_errors = any(
+        d["severity"] == "error" for _, diagnostics in results for d in diagnostics
+    )
+    return 1 if has_errors else 0
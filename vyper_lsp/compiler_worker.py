@@ -0,0 +1,87 @@
+"""
+Persistent compiler process for a vyper version other than the one the
+server runs with.
+
+Started with the interpreter that version is installed for, it reads one
+JSON request per line from stdin and answers each with one JSON line:
+
+    {"path": ..., "source": ..., "search_paths": [...]}
+    -> {"errors": [...], "warnings": [...]}
+
+Only vyper and the standard library are available here, and the
+interpreter may be old, so this file must not import from vyper_lsp.
+"""
+
+import json
+import sys
+import warnings
+from pathlib import Path
+
+import vyper
+from vyper.exceptions import VyperException
+
+try:
+    from vyper.compiler.input_bundle import FilesystemInputBundle
+except ImportError:
+    # vyper < 0.4, which has no module imports
+    FilesystemInputBundle = None
+
+
+def _location(e, message):
+    return {
+        "message": message,
+        "lineno": e.lineno,
+        "col_offset": e.col_offset,
+        "end_lineno": getattr(e, "end_lineno", None),
+        "end_col_offset": getattr(e, "end_col_offset", None),
+    }
+
+
+def _errors(e):
+    # the same diagnostics as the server reports for its own compiles
+    errors = []
+    message = "{}: {}".format(type(e).__name__, e)
+    if e.lineno is not None and e.col_offset is not None:
+        errors.append(_location(e, str(e)))
+    for a in getattr(e, "annotations", None) or []:
+        if getattr(a, "lineno", None) is not None:
+            errors.append(_location(a, message))
+    return errors
+
+
+def check(request):
+    source = request["source"]
+    errors = []
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        try:
+            if FilesystemInputBundle is not None:
+                search_paths = [Path(p) for p in request["search_paths"]]
+                vyper.compile_code(
+                    source,
+                    contract_path=Path(request["path"]),
+                    input_bundle=FilesystemInputBundle(search_paths),
+                    output_formats=["abi"],
+                )
+            else:
+                vyper.compile_code(source, output_formats=["abi"])
+        except VyperException as e:
+            errors = _errors(e)
+    return {"errors": errors, "warnings": [str(warning.message) for warning in w]}
+
+
+def main():
+    out = sys.stdout
+    # anything the compiler prints must not end up in the responses
+    sys.stdout = sys.stderr
+    for line in sys.stdin:
+        try:
+            response = check(json.loads(line))
+        except Exception as e:
+            response = {"crash": "{}: {}".format(type(e).__name__, e)}
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
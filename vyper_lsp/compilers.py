@@ -0,0 +1,226 @@
+import json
+import logging
+import queue
+import re
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lsprotocol.types import Diagnostic, DiagnosticSeverity, Position, Range
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+from vyper_lsp.utils import get_installed_vyper_version
+
+logger = logging.getLogger("vyper-lsp")
+
+PRAGMA_PATTERN = re.compile(
+    r"^[ \t]*#[ \t]*(?:pragma[ \t]+version|@version)[ \t]+(.+?)[ \t]*$", re.MULTILINE
+)
+
+WORKER_SOURCE = (Path(__file__).parent / "compiler_worker.py").read_text()
+
+# seconds a worker gets to check a file before it is considered hung
+CHECK_TIMEOUT = 10
+
+
+def pragma_version(source: str) -> Optional[str]:
+    match = PRAGMA_PATTERN.search(source)
+    return match.group(1) if match else None
+
+
+def version_spec(pragma: str) -> Optional[SpecifierSet]:
+    # the conversion vyper does for `# pragma version`
+    if re.match("[v0-9]", pragma):
+        pragma = "==" + pragma
+    pragma = re.sub("^\\^", "~=", pragma)
+    try:
+        return SpecifierSet(pragma)
+    except InvalidSpecifier:
+        return None
+
+
+def interpreter_for(path: Path) -> Path:
+    # a virtual environment, or an interpreter
+    if not path.is_dir():
+        return path
+    for candidate in (path / "bin" / "python", path / "Scripts" / "python.exe"):
+        if candidate.exists():
+            return candidate
+    return path / "bin" / "python"
+
+
+def installed_version(python: Path) -> Optional[Version]:
+    try:
+        result = subprocess.run(
+            [str(python), "-c", "import vyper; print(vyper.__version__)"],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        return Version(result.stdout.strip())
+    except (OSError, subprocess.SubprocessError, InvalidVersion) as e:
+        logger.warning(f"no usable vyper for {python}: {e}")
+        return None
+
+
+# a compiler process kept running for one vyper version, so checking a
+# file only costs the compile, not starting python and importing vyper
+class CompilerWorker:
+    def __init__(self, python: Path, version: Version):
+        self.python = python
+        self.version = version
+        self.timeout = CHECK_TIMEOUT
+        self._process: Optional[subprocess.Popen] = None
+        self._responses: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _start(self) -> subprocess.Popen:
+        # run from source, so the worker's directory (with modules named
+        # like the standard library's) is not on its path
+        return subprocess.Popen(
+            [str(self.python), "-c", WORKER_SOURCE],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+
+    def _spawn(self):
+        # responses are read on a thread of their own, so that waiting
+        # for one can time out. each process gets a new queue, nothing
+        # a killed worker still writes is mistaken for a response
+        self._process = self._start()
+        self._responses = queue.Queue()
+        threading.Thread(
+            target=_read_lines,
+            args=(self._process.stdout, self._responses),
+            daemon=True,
+        ).start()
+
+    def _kill(self):
+        self._process.kill()
+        self._process.wait()
+        self._process = None
+
+    def check(self, path: str, source: str, search_paths: List[Path]) -> dict:
+        request = {
+            "path": path,
+            "source": source,
+            "search_paths": [str(p) for p in search_paths],
+        }
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._spawn()
+            self._process.stdin.write(json.dumps(request) + "\n")
+            self._process.stdin.flush()
+            try:
+                response = self._responses.get(timeout=self.timeout)
+            except queue.Empty:
+                # the next check starts a fresh worker
+                self._kill()
+                raise RuntimeError(
+                    f"vyper {self.version} worker timed out on {path}"
+                ) from None
+        if not response:
+            raise RuntimeError(f"vyper {self.version} worker exited")
+        return json.loads(response)
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                try:
+                    self._process.wait(timeout=self.timeout)
+                    self._process = None
+                except subprocess.TimeoutExpired:
+                    self._kill()
+
+
+def _read_lines(stream, lines: "queue.Queue[str]"):
+    for line in stream:
+        lines.put(line)
+    # end of output, the process exited
+    lines.put("")
+
+
+def _diagnostic(error: dict) -> Diagnostic:
+    start = Position(line=error["lineno"] - 1, character=error["col_offset"])
+    end = start
+    if error.get("end_lineno") is not None and error.get("end_col_offset") is not None:
+        end = Position(line=error["end_lineno"] - 1, character=error["end_col_offset"])
+    return Diagnostic(
+        range=Range(start=start, end=end),
+        message=error["message"],
+        severity=DiagnosticSeverity.Error,
+    )
+
+
+# workers for the vyper versions installed for other interpreters, e.g.
+# of other virtual environments. files pinned by `# pragma version` to a
+# version the server's own vyper doesn't satisfy are checked by the
+# newest matching one.
+class CompilerPool:
+    def __init__(self):
+        self.workers: Dict[Version, CompilerWorker] = {}
+        self.interpreters: List[Path] = []
+        self._lock = threading.Lock()
+
+    def configure(self, interpreters: List[Path]):
+        """
+        Start over with the vyper versions installed for `interpreters`
+        (interpreters or virtual environments).
+        """
+        if interpreters == self.interpreters:
+            return
+        self.interpreters = list(interpreters)
+        workers = {}
+        for path in interpreters:
+            python = interpreter_for(path)
+            version = installed_version(python)
+            if version is not None and version not in workers:
+                workers[version] = CompilerWorker(python, version)
+        with self._lock:
+            old, self.workers = self.workers, workers
+        for worker in old.values():
+            worker.close()
+        logger.info(f"vyper compilers: {', '.join(map(str, workers)) or 'none'}")
+
+    def worker_for(self, source: str) -> Optional[CompilerWorker]:
+        """
+        The worker to check `source` with, or None if the server's own
+        vyper can (or no installed version matches).
+        """
+        pragma = pragma_version(source)
+        spec = pragma and version_spec(pragma)
+        if not spec:
+            return None
+        if spec.contains(get_installed_vyper_version(), prereleases=True):
+            return None
+        with self._lock:
+            matching = [v for v in self.workers if spec.contains(v, prereleases=True)]
+            return self.workers[max(matching)] if matching else None
+
+    def check(
+        self, worker: CompilerWorker, path: str, source: str, search_paths: List[Path]
+    ) -> Tuple[List[Diagnostic], List[str]]:
+        """Error diagnostics and warning messages for `source`."""
+        try:
+            response = worker.check(path, source, search_paths)
+        except (OSError, RuntimeError, ValueError) as e:
+            logger.warning(f"vyper {worker.version} worker failed: {e}")
+            return [], []
+        if "crash" in response:
+            logger.warning(
+                f"vyper {worker.version} failed on {path}: {response['crash']}"
+            )
+            return [], []
+        errors = [_diagnostic(error) for error in response["errors"]]
+        return errors, response["warnings"]
+
+    def close(self):
+        with self._lock:
+            workers, self.workers = self.workers, {}
+        for worker in workers.values():
+            worker.close()
@@ -1,19 +1,104 @@
 import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+
+def _average(previous: Optional[float], sample: float, weight: float) -> float:
+    return sample if previous is None else previous + weight * (sample - previous)
+
+
+# a debounce delay per document, adapted to how long checking it takes
+# and how fast the user types in it.
+#
+# a cheap check is worth starting right away, even if the next keystroke
+# makes it stale. an expensive one should wait for the user to pause for
+# longer than between keystrokes, and for longer the more it costs, so
+# checks don't queue up behind each other while typing
+class AdaptiveDelay:
+    # recent samples weigh this much more than older ones
+    WEIGHT = 0.3
+    # a pause in typing is this many times the usual interval
+    PAUSE = 1.5
+    # intervals longer than this are pauses, not typing
+    MAX_KEYSTROKE_INTERVAL = 2.0
+
+    def __init__(
+        self, minimum: float = 0.05, maximum: float = 2.0, default: float = 0.5
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.default = default
+        self._check_time: Dict[Any, float] = {}
+        self._keystroke_interval: Dict[Any, float] = {}
+        self._last_keystroke: Dict[Any, float] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, settings: Optional[Mapping[str, Any]]):
+        """Bounds from `{"min": seconds, "max": seconds}`."""
+        settings = settings or {}
+        self.minimum = float(settings.get("min", self.minimum))
+        self.maximum = max(float(settings.get("max", self.maximum)), self.minimum)
+
+    def typed(self, key, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._last_keystroke.get(key)
+            self._last_keystroke[key] = now
+            if last is not None and now - last <= self.MAX_KEYSTROKE_INTERVAL:
+                self._keystroke_interval[key] = _average(
+                    self._keystroke_interval.get(key), now - last, self.WEIGHT
+                )
+
+    def checked(self, key, duration: float):
+        with self._lock:
+            self._check_time[key] = _average(
+                self._check_time.get(key), duration, self.WEIGHT
+            )
+
+    def forget(self, key):
+        with self._lock:
+            self._check_time.pop(key, None)
+            self._keystroke_interval.pop(key, None)
+            self._last_keystroke.pop(key, None)
+
+    def delay(self, key) -> float:
+        with self._lock:
+            cost = self._check_time.get(key)
+            interval = self._keystroke_interval.get(key, 0.0)
+        if cost is None:
+            delay = self.default
+        else:
+            delay = min(cost, max(self.PAUSE * interval, cost / 2))
+        return min(max(delay, self.minimum), self.maximum)
 
 
 class Debouncer:
-    def __init__(self, wait):
+    def __init__(self, wait, key=None):
+        # seconds, or a function of the key returning them
         self.wait = wait
-        self.timer = None
+        # calls for different keys (e.g. different documents) are
+        # debounced independently of each other
+        self.key = key
+        self.timers = {}
         self.lock = threading.Lock()
 
+    def cancel(self, key=None):
+        with self.lock:
+            timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
     def debounce(self, func):
         def debounced(*args, **kwargs):
+            key = self.key(*args, **kwargs) if self.key is not None else None
             with self.lock:
-                if self.timer is not None:
-                    self.timer.cancel()  # Cancel the existing timer if there is one
+                timer = self.timers.get(key)
+                if timer is not None:
+                    timer.cancel()  # Cancel the existing timer if there is one
                 # Create a new timer that will call func with the latest arguments
-                self.timer = threading.Timer(self.wait, lambda: func(*args, **kwargs))
-                self.timer.start()
+                wait = self.wait(key) if callable(self.wait) else self.wait
+                timer = threading.Timer(wait, lambda: func(*args, **kwargs))
+                self.timers[key] = timer
+                timer.start()
 
         return debounced
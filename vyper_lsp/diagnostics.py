@@ -0,0 +1,96 @@
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from lsprotocol.types import (
+    Diagnostic,
+    DocumentDiagnosticReport,
+    RelatedFullDocumentDiagnosticReport,
+    RelatedUnchangedDocumentDiagnosticReport,
+    WorkspaceDocumentDiagnosticReport,
+    WorkspaceFullDocumentDiagnosticReport,
+    WorkspaceUnchangedDocumentDiagnosticReport,
+)
+from pygls.protocol import default_converter
+
+_converter = default_converter()
+
+
+def result_id(diagnostics: List[Diagnostic]) -> str:
+    """Identifies a set of diagnostics by its contents."""
+    data = json.dumps(_converter.unstructure(diagnostics), sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+# (result id, diagnostics)
+Report = Tuple[str, List[Diagnostic]]
+
+
+def document_report(
+    report: Report, previous_result_id: Optional[str]
+) -> DocumentDiagnosticReport:
+    """A pull response, without the diagnostics if the client has them."""
+    id_, diagnostics = report
+    if id_ == previous_result_id:
+        return RelatedUnchangedDocumentDiagnosticReport(result_id=id_)
+    return RelatedFullDocumentDiagnosticReport(items=diagnostics, result_id=id_)
+
+
+def workspace_report(
+    uri: str, version: Optional[int], report: Report, previous_result_id: Optional[str]
+) -> WorkspaceDocumentDiagnosticReport:
+    id_, diagnostics = report
+    if id_ == previous_result_id:
+        return WorkspaceUnchangedDocumentDiagnosticReport(
+            uri=uri, version=version, result_id=id_
+        )
+    return WorkspaceFullDocumentDiagnosticReport(
+        uri=uri, version=version, items=diagnostics, result_id=id_
+    )
+
+
+# the latest diagnostics of each open document, for pull requests and
+# to tell whether a check changed anything worth publishing
+class DiagnosticStore:
+    def __init__(self):
+        self._reports: Dict[str, Report] = {}
+        # the document version each report is of
+        self._versions: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+
+    def update(
+        self, uri: str, diagnostics: List[Diagnostic], version: Optional[int] = None
+    ) -> bool:
+        """
+        Record the diagnostics of `uri` (at `version`), returns whether
+        they changed.
+        """
+        report = (result_id(diagnostics), diagnostics)
+        with self._lock:
+            previous = self._reports.get(uri)
+            self._reports[uri] = report
+            self._versions[uri] = version
+        return previous is None or previous[0] != report[0]
+
+    def get(self, uri: str) -> Optional[Report]:
+        with self._lock:
+            return self._reports.get(uri)
+
+    def covers(self, uri: str, version: Optional[int]) -> bool:
+        """Whether the diagnostics of `uri` are of `version` already."""
+        with self._lock:
+            return (
+                version is not None
+                and uri in self._reports
+                and self._versions.get(uri) == version
+            )
+
+    def remove(self, uri: str):
+        with self._lock:
+            self._reports.pop(uri, None)
+            self._versions.pop(uri, None)
+
+    def reports(self) -> Dict[str, Report]:
+        with self._lock:
+            return dict(self._reports)
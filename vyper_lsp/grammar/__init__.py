@@ -0,0 +1,278 @@
+import functools
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from lark import Lark, Token, Tree
+from lark.exceptions import LarkError
+from lark.indenter import Indenter
+
+from vyper_lsp.index import Span, SymbolRecord, function_detail
+
+GRAMMAR_PATH = Path(__file__).parent / "grammar.lark"
+
+
+class PythonIndenter(Indenter):
+    NL_type = "_NEWLINE"
+    OPEN_PAREN_types = ["LPAR", "LSQB", "LBRACE"]
+    CLOSE_PAREN_types = ["RPAR", "RSQB", "RBRACE"]
+    INDENT_type = "_INDENT"
+    DEDENT_type = "_DEDENT"
+    tab_len = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _parser() -> Lark:
+    return Lark(
+        GRAMMAR_PATH.read_text(),
+        parser="lalr",
+        start="module",
+        postlex=PythonIndenter(),
+        propagate_positions=True,
+        # lark's default for lalr, only matching the terminals the parser
+        # accepts at each point. the basic lexer parses the same and is no
+        # faster on the many small chunks we parse
+        lexer="contextual",
+    )
+
+
+# a chunk is one top-level statement, together with any decorators
+# and indented or continuation lines which follow it
+Chunk = Tuple[int, str]
+
+_HEADER_END = re.compile(r"\)\s*(->[^:]*)?:|:\s*$", re.MULTILINE)
+
+
+def split_top_level(source: str) -> List[Chunk]:
+    chunks: List[Chunk] = []
+    start = None
+    lines: List[str] = []
+    decorators_only = False
+
+    for lineno, line in enumerate(source.splitlines()):
+        starts_statement = line[:1] not in ("", " ", "\t", "#", ")", "]", "}")
+        if starts_statement and not decorators_only:
+            if lines:
+                chunks.append((start, "\n".join(lines)))
+            start = lineno
+            lines = []
+        if starts_statement:
+            decorators_only = line.startswith("@")
+        if start is not None:
+            lines.append(line)
+
+    if lines:
+        chunks.append((start, "\n".join(lines)))
+    return chunks
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_statement(text: str) -> Optional[Tree]:
+    # parse trees only hold chunk-relative positions, which makes them
+    # safe to cache by text: editing one function re-parses only that
+    # function, wherever it moves to in the file
+    try:
+        return _parser().parse(text + "\n")
+    except LarkError:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_chunk(text: str) -> Optional[Tree]:
+    tree = parse_statement(text)
+    if tree is not None:
+        return tree
+
+    # incomplete body, an outline still only needs the header
+    match = _HEADER_END.search(text)
+    if match is None:
+        return None
+    header = text[: match.end()]
+    try:
+        return _parser().parse(header + "\n    pass\n")
+    except LarkError:
+        return None
+
+
+def _span(meta, text: str, line_offset: int) -> Span:
+    # blocks end where the dedent is, after any trailing blank lines
+    # and comments. the outline range should stop at the last statement
+    body = text[meta.start_pos : meta.end_pos].rstrip()
+    while body.rsplit("\n", 1)[-1].lstrip().startswith("#"):
+        body = body.rsplit("\n", 1)[0].rstrip()
+    end_pos = meta.start_pos + len(body)
+    end_line = text.count("\n", 0, end_pos)
+    end_column = end_pos - (text.rfind("\n", 0, end_pos) + 1)
+    return (
+        meta.line - 1 + line_offset,
+        meta.column - 1,
+        end_line + line_offset,
+        end_column,
+    )
+
+
+def _token_span(token: Token, line_offset: int) -> Span:
+    return (
+        token.line - 1 + line_offset,
+        token.column - 1,
+        token.end_line - 1 + line_offset,
+        token.end_column - 1,
+    )
+
+
+def _text(tree: Tree, text: str) -> str:
+    return " ".join(text[tree.meta.start_pos : tree.meta.end_pos].split())
+
+
+def _first_name(tree: Tree) -> Token:
+    return next(tree.scan_values(lambda v: isinstance(v, Token) and v.type == "NAME"))
+
+
+def _subtree(tree: Tree, data: str) -> Optional[Tree]:
+    return next((t for t in tree.iter_subtrees_topdown() if t.data == data), None)
+
+
+def _function_record(tree: Tree, text: str, offset: int, container=None):
+    sig = _subtree(tree, "function_sig")
+    name = _first_name(sig)
+    decorators = _subtree(tree, "decorators")
+    mutability = _subtree(tree, "mutability")
+    detail = function_detail(
+        [_text(d, text) for d in decorators.children] if decorators else [],
+        mutability and _text(mutability, text),
+    )
+    # the range starts at `def`, the same as vyper's FunctionDef nodes
+    span = _span(tree.meta, text, offset)
+    span = (sig.meta.line - 1 + offset, sig.meta.column - 1) + span[2:]
+    return SymbolRecord(
+        str(name),
+        "method" if container else "function",
+        span,
+        _token_span(name, offset),
+        container=container,
+        detail=detail,
+        signature=_text(sig, text).removeprefix("def "),
+    )
+
+
+_MODULE_DIRECTIVES = ("implements", "initializes", "uses", "exports")
+
+_TYPE_KINDS = {
+    "struct_def": ("struct", ("struct_member",)),
+    "event_def": ("event", ("event_member", "indexed_event_arg")),
+    "flag_def": ("flag", ("flag_member",)),
+    "enum_def": ("flag", ("enum_member",)),
+    "interface_def": ("interface", ("interface_function",)),
+}
+
+
+def _records_from_tree(tree: Tree, text: str, offset: int) -> List[SymbolRecord]:
+    records = []
+    for node in tree.children:
+        if not isinstance(node, Tree):
+            continue
+
+        if node.data == "function_def":
+            records.append(_function_record(node, text, offset))
+
+        elif node.data in ("variable_def", "constant_def"):
+            name = _first_name(node)
+            if name in _MODULE_DIRECTIVES:
+                # `implements: I` etc. also parse as variable declarations
+                continue
+            kind = "constant" if node.data == "constant_def" else "variable"
+            annotation = _subtree(node, "variable_annotation")
+            if annotation is not None and _text(annotation, text).startswith(
+                "immutable"
+            ):
+                kind = "immutable"
+            # like vyper, the detail is the type without its public() etc. wrappers
+            type_ = _subtree(node, "type")
+            records.append(
+                SymbolRecord(
+                    str(name),
+                    kind,
+                    _span(node.meta, text, offset),
+                    _token_span(name, offset),
+                    detail=type_ and _text(type_, text),
+                )
+            )
+
+        elif node.data in _TYPE_KINDS:
+            kind, member_rules = _TYPE_KINDS[node.data]
+            name = _first_name(node)
+            records.append(
+                SymbolRecord(
+                    str(name),
+                    kind,
+                    _span(node.meta, text, offset),
+                    _token_span(name, offset),
+                )
+            )
+            for member in node.find_pred(lambda t: t.data in member_rules):
+                if member.data == "interface_function":
+                    records.append(
+                        _function_record(member, text, offset, container=str(name))
+                    )
+                    continue
+                member_name = _first_name(member)
+                member_type = _subtree(member, "type")
+                member_detail = member_type and _text(member_type, text)
+                if member.data == "indexed_event_arg":
+                    member_detail = f"indexed({member_detail})"
+                records.append(
+                    SymbolRecord(
+                        str(member_name),
+                        "field" if kind in ("struct", "event") else "variant",
+                        _span(member.meta, text, offset),
+                        _token_span(member_name, offset),
+                        container=str(name),
+                        detail=member_detail,
+                    )
+                )
+    return records
+
+
+def outline_symbols(source: str) -> List[SymbolRecord]:
+    """
+    Declarations of a module which may not compile, using the lark grammar.
+
+    Top-level statements are parsed independently, so a syntax error only
+    loses the statement it occurs in (or just its body, for functions).
+    """
+    records = []
+    for offset, text in split_top_level(source):
+        tree = parse_chunk(text)
+        if tree is not None:
+            records.extend(_records_from_tree(tree, text, offset))
+    return records
+
+
+def syntax_spans(source: str) -> List[List[Tuple[str, Span]]]:
+    """
+    (rule, span) of the syntax elements of each top-level statement of a
+    module which may not compile. A statement which doesn't parse only
+    has its own extent, as a "statement".
+    """
+    statements = []
+    for offset, text in split_top_level(source):
+        tree = parse_statement(text)
+        if tree is None:
+            lines = text.rstrip().split("\n")
+            span = (offset, 0, offset + len(lines) - 1, len(lines[-1]))
+            statements.append([("statement", span)])
+            continue
+        elements = [
+            (subtree.data, _span(subtree.meta, text, offset))
+            for subtree in tree.iter_subtrees_topdown()
+            if subtree is not tree and not subtree.meta.empty
+        ]
+        elements += [
+            (token.type, _token_span(token, offset))
+            for token in tree.scan_values(
+                lambda v: isinstance(v, Token) and v.type == "NAME"
+            )
+        ]
+        if elements:
+            statements.append(elements)
+    return statements
@@ -0,0 +1,69 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+# which files import which, in both directions, so that a change to a
+# module can be propagated to exactly the modules that depend on it.
+#
+# edges come from the import records of the workspace index, i.e. from
+# the `import_info` vyper attaches to Import/ImportFrom nodes, or from
+# resolving the imports of files which have only been parsed.
+class ImportGraph:
+    def __init__(self):
+        self.imports: Dict[str, Set[str]] = {}
+        self.imported_by: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, path: str, imported_paths: Iterable[str]):
+        with self._lock:
+            self._remove_edges(path)
+            targets = set(imported_paths)
+            self.imports[path] = targets
+            for target in targets:
+                self.imported_by.setdefault(target, set()).add(path)
+
+    def remove(self, path: str):
+        with self._lock:
+            self._remove_edges(path)
+
+    def _remove_edges(self, path: str):
+        for target in self.imports.pop(path, ()):
+            importers = self.imported_by.get(target)
+            if importers is None:
+                continue
+            importers.discard(path)
+            if not importers:
+                del self.imported_by[target]
+
+    def dependents(self, *paths: str) -> List[str]:
+        """
+        Every file which imports one of `paths`, directly or transitively,
+        ordered so that each file comes after the files it imports.
+        """
+        with self._lock:
+            found: Set[str] = set()
+            queue = deque(paths)
+            while queue:
+                for importer in self.imported_by.get(queue.popleft(), ()):
+                    if importer not in found:
+                        found.add(importer)
+                        queue.append(importer)
+
+            # kahn's algorithm over the affected subgraph
+            pending = {p: len(self.imports.get(p, set()) & found) for p in found}
+            ready = deque(sorted(p for p, n in pending.items() if n == 0))
+            ordered = []
+            while ready:
+                current = ready.popleft()
+                ordered.append(current)
+                for importer in sorted(self.imported_by.get(current, ())):
+                    if importer in pending:
+                        pending[importer] -= 1
+                        if pending[importer] == 0:
+                            ready.append(importer)
+
+            # import cycles are compile errors, but the files still
+            # need to be rechecked to report them
+            ordered.extend(sorted(found - set(ordered)))
+            return ordered
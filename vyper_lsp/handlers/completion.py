@@ -1,10 +1,14 @@
-from typing import List
+import copy
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 from vyper.ast import nodes
 from lsprotocol.types import (
     CompletionItem,
     CompletionItemLabelDetails,
     CompletionList,
     CompletionParams,
+    CompletionTriggerKind,
 )
 from pygls.server import LanguageServer
 from pygls.workspace import Document
@@ -23,12 +27,72 @@ DECIMAL_TYPES = {"decimal"}
 
 BASE_TYPES = list({"bool", "address"} | INTEGER_TYPES | BYTES_M_TYPES | DECIMAL_TYPES)
 
+# offered first when nothing has been typed yet
+COMMON_TYPES = ["uint256", "address", "bool", "bytes32", "int256", "uint8", "decimal"]
+
 DECORATORS = ["payable", "nonpayable", "view", "pure", "external", "internal", "deploy"]
+DECORATOR_ITEMS = [CompletionItem(label=dec) for dec in DECORATORS]
+
+# upper bound on items per response, the client asks again as the user
+# types whenever a response was cut short (`is_incomplete`)
+MAX_COMPLETION_ITEMS = 50
+
+_PARTIAL_WORD = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*$")
+
+
+class RankedItems:
+    """Completion items with a sorted index of their labels."""
+
+    def __init__(self, items: List[CompletionItem]):
+        self.items = items
+        self._keys = sorted((item.label.lower(), i) for i, item in enumerate(items))
+
+    def top(self, prefix: str, limit: int) -> Tuple[List[CompletionItem], bool]:
+        """
+        Items whose label starts with `prefix` (ignoring case), matching
+        case first and shorter labels first, plus whether any were cut.
+        """
+        if not prefix:
+            return self.items[:limit], len(self.items) > limit
+
+        lower = prefix.lower()
+        matches = []
+        i = bisect_left(self._keys, (lower,))
+        while i < len(self._keys) and self._keys[i][0].startswith(lower):
+            matches.append(self.items[self._keys[i][1]])
+            i += 1
+        matches.sort(
+            key=lambda item: (
+                not item.label.startswith(prefix),
+                len(item.label),
+                item.label,
+            )
+        )
+        return matches[:limit], len(matches) > limit
 
 
 class CompletionHandler:
-    def __init__(self, ast: AST):
+    def __init__(self, ast: AST, uri: Optional[str] = None):
         self.ast = ast
+        # identifies the document in items sent for completionItem/resolve
+        self.uri = uri
+        # completion items derived from the analysis, rebuilt only
+        # once the analysis (and so `ast.version`) changes
+        self._cache: Dict[Hashable, List[CompletionItem]] = {}
+        self._ranked: Dict[int, RankedItems] = {}
+        self._cache_version = None
+
+    def _cached(
+        self, key: Hashable, build: Callable[[], List[CompletionItem]]
+    ) -> List[CompletionItem]:
+        if self._cache_version != self.ast.version:
+            self._cache.clear()
+            self._ranked.clear()
+            self._cache_version = self.ast.version
+        items = self._cache.get(key)
+        if items is None:
+            items = self._cache[key] = build()
+        return items
 
     def get_completions(
         self, ls: LanguageServer, params: CompletionParams
@@ -39,58 +103,57 @@ class CompletionHandler:
     def _dot_completions_for_module(
         self, element: str, top_level_node=None, line: str = ""
     ) -> List[CompletionItem]:
-        completions = []
         module = self.ast.imports.get(element)
         if not module:
-            return completions
-            
-        # Handle functions
-        if hasattr(module, "functions"):
-            for name, fn in module.functions.items():
-                doc_string = ""
-                if hasattr(fn, "ast_def") and getattr(fn.ast_def, "doc_string", False):
-                    doc_string = fn.ast_def.doc_string.value
+            return []
 
-                out = format_fn(fn)
+        show_external: bool = isinstance(
+            top_level_node, nodes.ExportsDecl
+        ) or line.startswith("exports:")
+        show_internal_and_deploy: bool = isinstance(top_level_node, nodes.FunctionDef)
 
-                # NOTE: this just gets ignored by most editors
-                # so we put the signature in the documentation string also
-                completion_item_label_details = CompletionItemLabelDetails(detail=out)
+        # module types are replaced along with the analysis, so the key
+        # can't outlive the module it was built for
+        key = ("module", element, id(module), show_external, show_internal_and_deploy)
+        return self._cached(
+            key,
+            lambda: self._module_items(
+                element, module, show_external, show_internal_and_deploy
+            ),
+        )
 
-                doc_string = f"{out}\n{doc_string}"
+    def _module_items(
+        self,
+        element: str,
+        module,
+        show_external: bool,
+        show_internal_and_deploy: bool,
+    ) -> List[CompletionItem]:
+        completions = []
 
-                show_external: bool = isinstance(
-                    top_level_node, nodes.ExportsDecl
-                ) or line.startswith("exports:")
-                show_internal_and_deploy: bool = isinstance(
-                    top_level_node, nodes.FunctionDef
-                )
+        # Handle functions
+        if hasattr(module, "functions"):
+            for name, fn in module.functions.items():
+                visible = (
+                    show_internal_and_deploy and (fn.is_internal or fn.is_deploy)
+                ) or (show_external and fn.is_external)
+                if not visible:
+                    continue
 
-                if show_internal_and_deploy and (fn.is_internal or fn.is_deploy):
-                    completions.append(
-                        CompletionItem(
-                            label=name,
-                            documentation=doc_string,
-                            label_details=completion_item_label_details,
-                        )
-                    )
-                elif show_external and fn.is_external:
-                    completions.append(
-                        CompletionItem(
-                            label=name,
-                            documentation=doc_string,
-                            label_details=completion_item_label_details,
-                        )
+                # signature and docs are filled in by `resolve_completion`,
+                # once the client shows the item
+                completions.append(
+                    CompletionItem(
+                        label=name,
+                        data={"uri": self.uri, "module": element, "name": name},
                     )
-                    
+                )
+
         # Handle module variables
         if hasattr(module, "variables"):
             for name, var in module.variables.items():
                 completions.append(
-                    CompletionItem(
-                        label=name,
-                        documentation=f"Variable: {name}"
-                    )
+                    CompletionItem(label=name, documentation=f"Variable: {name}")
                 )
 
         return completions
@@ -100,19 +163,17 @@ class CompletionHandler:
     ) -> List[CompletionItem]:
         completions = []
         if element == "self":
-            for fn in self.ast.get_internal_functions():
-                completions.append(CompletionItem(label=fn))
-            # TODO: This should exclude constants and immutables
-            for var in self.ast.get_state_variables():
-                completions.append(CompletionItem(label=var))
+            completions = self._cached("self", self._self_items)
         elif self.ast.imports and element in self.ast.imports.keys():
             completions = self._dot_completions_for_module(
                 element, top_level_node=top_level_node, line=line
             )
         elif element in self.ast.flags:
             members = self.ast.flags[element]._flag_members
-            for member in members.keys():
-                completions.append(CompletionItem(label=member))
+            completions = self._cached(
+                ("flag", element),
+                lambda: [CompletionItem(label=member) for member in members.keys()],
+            )
 
         if isinstance(top_level_node, nodes.FunctionDef):
             var_declarations = top_level_node.get_descendants(
@@ -123,24 +184,104 @@ class CompletionHandler:
                 type_name = vardecl.annotation.id
                 structt = self.ast.structs.get(type_name, None)
                 if structt:
-                    for member in structt.members:
-                        completions.append(CompletionItem(label=member))
+                    completions = completions + self._cached(
+                        ("struct", type_name),
+                        lambda: [
+                            CompletionItem(label=member) for member in structt.members
+                        ],
+                    )
 
         return completions
 
+    def resolve_completion(self, item: CompletionItem) -> CompletionItem:
+        data = item.data if isinstance(item.data, dict) else {}
+        module = self.ast.imports.get(data.get("module"))
+        fn = getattr(module, "functions", {}).get(data.get("name"))
+        if fn is None:
+            return item
+
+        doc_string = ""
+        if hasattr(fn, "ast_def") and getattr(fn.ast_def, "doc_string", False):
+            doc_string = fn.ast_def.doc_string.value
+
+        out = format_fn(fn)
+
+        # NOTE: this just gets ignored by most editors
+        # so we put the signature in the documentation string also
+        completion_item_label_details = CompletionItemLabelDetails(detail=out)
+
+        doc_string = f"{out}\n{doc_string}"
+
+        # cached items are shared between responses, never modify them
+        resolved = copy.copy(item)
+        resolved.documentation = doc_string
+        resolved.label_details = completion_item_label_details
+        return resolved
+
+    def _self_items(self) -> List[CompletionItem]:
+        items = [CompletionItem(label=fn) for fn in self.ast.get_internal_functions()]
+        # TODO: This should exclude constants and immutables
+        items.extend(
+            CompletionItem(label=var) for var in self.ast.get_state_variables()
+        )
+        return items
+
+    def _type_items(self, insert_space: bool) -> List[CompletionItem]:
+        base_types = COMMON_TYPES + sorted(set(BASE_TYPES) - set(COMMON_TYPES))
+        return [
+            CompletionItem(label=typ, insert_text=f" {typ}" if insert_space else None)
+            for typ in self.ast.get_user_defined_types() + base_types
+        ]
+
+    def _completion_list(
+        self, items: List[CompletionItem], prefix: str
+    ) -> CompletionList:
+        ranked = self._ranked.get(id(items))
+        if ranked is None or ranked.items is not items:
+            ranked = RankedItems(items)
+            # short lists are built per request, and cheap to index anyway
+            if len(items) > MAX_COMPLETION_ITEMS:
+                self._ranked[id(items)] = ranked
+        top, truncated = ranked.top(prefix, MAX_COMPLETION_ITEMS)
+        return CompletionList(is_incomplete=truncated, items=top)
+
+    def _completion_context(
+        self, document: Document, params: CompletionParams
+    ) -> Tuple[Optional[str], str, str]:
+        """
+        The trigger character the completion is for, the partial word
+        typed after it, and the (stripped) line before that word.
+        """
+        line = document.lines[params.position.line]
+        context = params.context
+        if context.trigger_kind == CompletionTriggerKind.TriggerCharacter:
+            return context.trigger_character, "", line.strip()
+
+        # invoked explicitly, or the client asking again while the user
+        # types on after an incomplete list
+        before = line[: params.position.character]
+        match = _PARTIAL_WORD.search(before)
+        prefix = match.group() if match else ""
+        before = before[: len(before) - len(prefix)]
+        trigger = None
+        if before.endswith((".", "@", ":")):
+            trigger = before[-1]
+        elif before.endswith(" ") and before.rstrip().endswith(":"):
+            trigger = " "
+        return trigger, prefix, before.strip()
+
     def _get_completions_in_doc(
         self, document: Document, params: CompletionParams
     ) -> CompletionList:
         items = []
-        current_line = document.lines[params.position.line].strip()
-        custom_types = self.ast.get_user_defined_types()
-
         no_completions = CompletionList(is_incomplete=False, items=[])
 
         if not params.context:
             return no_completions
 
-        if params.context.trigger_character == ".":
+        trigger, prefix, current_line = self._completion_context(document, params)
+
+        if trigger == ".":
             # get element before the dot
             # TODO: this could lead to bugs if we're not at EOL
             element = current_line.split(" ")[-1].split(".")[0]
@@ -153,20 +294,16 @@ class CompletionHandler:
                 element, top_level_node=surrounding_node, line=current_line
             )
             if len(dot_completions) > 0:
-                return CompletionList(is_incomplete=False, items=dot_completions)
+                return self._completion_list(dot_completions, prefix)
             else:
                 for attr in self.ast.get_attributes_for_symbol(element):
                     items.append(CompletionItem(label=attr))
-            completions = CompletionList(is_incomplete=False, items=items)
-            return completions
+            return self._completion_list(items, prefix)
 
-        if params.context.trigger_character == "@":
-            for dec in DECORATORS:
-                items.append(CompletionItem(label=dec))
-            completions = CompletionList(is_incomplete=False, items=items)
-            return completions
+        if trigger == "@":
+            return self._completion_list(DECORATOR_ITEMS, prefix)
 
-        if params.context.trigger_character == ":":
+        if trigger == ":":
             # return empty_completions if colon isn't for a type annotation
             object_declaration_keywords = [
                 "flag",
@@ -182,18 +319,12 @@ class CompletionHandler:
             ):
                 return no_completions
 
-            for typ in custom_types + BASE_TYPES:
-                items.append(CompletionItem(label=typ, insert_text=f" {typ}"))
-
-            completions = CompletionList(is_incomplete=False, items=items)
-            return completions
-
-        if params.context.trigger_character == " ":
-            if current_line[-1] == ":":
-                for typ in custom_types + BASE_TYPES:
-                    items.append(CompletionItem(label=typ))
+            items = self._cached(("types", True), lambda: self._type_items(True))
+            return self._completion_list(items, prefix)
 
-                completions = CompletionList(is_incomplete=False, items=items)
-                return completions
+        if trigger == " ":
+            if current_line[-1:] == ":":
+                items = self._cached(("types", False), lambda: self._type_items(False))
+                return self._completion_list(items, prefix)
 
         return CompletionList(is_incomplete=False, items=[])
@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from packaging.version import Version
 from lsprotocol.types import (
     Position,
@@ -24,6 +24,10 @@ logger = logging.getLogger("vyper-lsp")
 class HoverHandler:
     def __init__(self, ast: AST) -> None:
         self.ast = ast
+        # hover text (or None) by (word, expression) under the cursor,
+        # only valid for the analysis version it was computed from
+        self._cache: Dict[Tuple[str, str], Optional[str]] = {}
+        self._cache_version = None
 
     def _format_fn_signature(self, node: nodes.FunctionDef) -> str:
         pattern = r"def\s+(\w+)\((?:[^()]|\n)*\)(?:\s*->\s*[\w\[\], \n]+)?:"
@@ -52,6 +56,17 @@ class HoverHandler:
         word = get_word_at_cursor(og_line, pos.character)
         full_word = get_expression_at_cursor(og_line, pos.character)
 
+        # the result only depends on the symbol and the analysis, so
+        # hovering the same symbol anywhere in the document is a lookup
+        if self._cache_version != self.ast.version:
+            self._cache.clear()
+            self._cache_version = self.ast.version
+        key = (word, full_word)
+        if key not in self._cache:
+            self._cache[key] = self._hover_info_for(word, full_word)
+        return self._cache[key]
+
+    def _hover_info_for(self, word: str, full_word: str) -> Optional[str]:
         # Check for module references (e.g., "lib.function" or "lib.variable")
         if "." in full_word and not full_word.startswith("self."):
             parts = full_word.split(".")
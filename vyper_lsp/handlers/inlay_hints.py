@@ -0,0 +1,136 @@
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+from lsprotocol.types import InlayHint, InlayHintKind, Position, Range
+from vyper.ast import nodes
+from vyper.semantics.types.function import ContractFunctionT
+
+from vyper_lsp.ast import AST
+
+# hints are computed for blocks of this many lines at a time, those the
+# requested range touches
+BLOCK_LINES = 64
+
+# (line, character, label, kind), in the analyzed source
+Hint = Tuple[int, int, str, Optional[InlayHintKind]]
+
+
+def _parameter_names(call: nodes.Call) -> List[str]:
+    parent = call.get_ancestor()
+    if isinstance(parent, nodes.Log):
+        event_t = parent._metadata.get("type")
+        return list(getattr(event_t, "arguments", {}))
+    fn_t = call.func._metadata.get("type")
+    if isinstance(fn_t, ContractFunctionT):
+        return [arg.name for arg in fn_t.arguments]
+    return []
+
+
+def _is_named(arg: nodes.VyperNode, name: str) -> bool:
+    # `foo(amount)` and `foo(self.amount)` need no hint
+    if isinstance(arg, nodes.Name):
+        return arg.id == name
+    if isinstance(arg, nodes.Attribute):
+        return arg.attr == name
+    return False
+
+
+def _call_hints(call: nodes.Call) -> List[Hint]:
+    hints = []
+    for arg, name in zip(call.args, _parameter_names(call)):
+        if not _is_named(arg, name):
+            hints.append(
+                (arg.lineno - 1, arg.col_offset, f"{name}:", InlayHintKind.Parameter)
+            )
+    return hints
+
+
+def _constant_hint(node: nodes.VariableDecl) -> Optional[Hint]:
+    # the value of a constant computed from an expression
+    value = node.value
+    if isinstance(value, nodes.Constant) or not value.has_folded_value:
+        return None
+    folded = value.get_folded_value()
+    if not isinstance(folded, nodes.Constant):
+        return None
+    return (value.end_lineno - 1, value.end_col_offset, f"= {folded.value}", None)
+
+
+class InlayHintHandler:
+    def __init__(self, ast: AST):
+        self.ast = ast
+        # hints by block, for the analysis version they were computed from
+        self._blocks: Dict[int, List[Hint]] = {}
+        self._blocks_version = None
+        # top-level statements by start line
+        self._starts: List[int] = []
+        self._statements: List[nodes.VyperNode] = []
+
+    def _reset(self):
+        self._blocks.clear()
+        self._blocks_version = self.ast.version
+        module = self.ast.best_ast
+        statements = sorted(
+            module.body if module is not None else [], key=lambda n: n.lineno
+        )
+        self._statements = statements
+        self._starts = [node.lineno - 1 for node in statements]
+
+    def _block(self, block: int) -> List[Hint]:
+        hints = self._blocks.get(block)
+        if hints is not None:
+            return hints
+
+        first = block * BLOCK_LINES
+        last = first + BLOCK_LINES - 1
+        hints = []
+        # the statements overlapping the block: the one it starts in, and
+        # those starting within it
+        i = max(bisect.bisect_right(self._starts, first) - 1, 0)
+        j = bisect.bisect_right(self._starts, last)
+        for node in self._statements[i:j]:
+            if node.end_lineno - 1 < first:
+                continue
+            if isinstance(node, nodes.VariableDecl) and node.is_constant:
+                hints.append(_constant_hint(node))
+            for call in node.get_descendants(nodes.Call):
+                if call.lineno - 1 <= last and call.end_lineno - 1 >= first:
+                    hints.extend(_call_hints(call))
+        hints = [hint for hint in hints if hint and first <= hint[0] <= last]
+        self._blocks[block] = hints
+        return hints
+
+    def inlay_hints(self, range_: Range) -> List[InlayHint]:
+        if self._blocks_version != self.ast.version:
+            self._reset()
+
+        positions = self.ast.positions
+        start = positions.to_analysis(range_.start)
+        end = positions.to_analysis(range_.end)
+        first = (start.line, start.character)
+        last = (end.line, end.character)
+
+        hints = []
+        for block in range(start.line // BLOCK_LINES, end.line // BLOCK_LINES + 1):
+            for line, character, label, kind in self._block(block):
+                if not first <= (line, character) <= last:
+                    continue
+                position = Position(line=line, character=character)
+                if positions:
+                    # edits since the analysis may have moved the hint
+                    mapped = positions.from_analysis(
+                        Range(start=position, end=position)
+                    )
+                    if mapped is None:
+                        continue
+                    position = mapped.start
+                hints.append(
+                    InlayHint(
+                        position=position,
+                        label=label,
+                        kind=kind,
+                        padding_left=kind is None,
+                        padding_right=kind is not None,
+                    )
+                )
+        return hints
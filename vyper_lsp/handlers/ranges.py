@@ -0,0 +1,134 @@
+import bisect
+from typing import List, Optional, Tuple
+
+from lsprotocol.types import FoldingRange, Position, SelectionRange
+from pygls.workspace import Document
+from vyper.ast import nodes
+
+from vyper_lsp.ast import AST
+from vyper_lsp.grammar import syntax_spans
+from vyper_lsp.index import Span, content_hash, span_from_node
+from vyper_lsp.utils import range_from_span
+
+# (node type or grammar rule, span) of a syntax element
+Element = Tuple[str, Span]
+
+# elements which fold, from the analysis and from the grammar
+FOLDED = {
+    "FunctionDef",
+    "StructDef",
+    "EventDef",
+    "FlagDef",
+    "InterfaceDef",
+    "If",
+    "For",
+    "function_def",
+    "struct_def",
+    "event_def",
+    "flag_def",
+    "enum_def",
+    "interface_def",
+    "if_stmt",
+    "for_stmt",
+    # a statement the grammar can't parse
+    "statement",
+}
+
+
+def _contains(span: Span, line: int, character: int) -> bool:
+    return (span[0], span[1]) <= (line, character) <= (span[2], span[3])
+
+
+def statements_from_module(module: nodes.Module) -> List[List[Element]]:
+    statements = []
+    for node in module.body:
+        elements = [(type(node).__name__, span_from_node(node))]
+        elements += [
+            (type(child).__name__, span_from_node(child))
+            for child in node.get_descendants()
+            if child.end_lineno is not None
+        ]
+        statements.append(elements)
+    return statements
+
+
+# spans of a module's syntax, grouped by top-level statement, so that
+# finding what encloses a position only looks at one statement
+class SyntaxIndex:
+    def __init__(self, statements: List[List[Element]]):
+        extents = []
+        for elements in statements:
+            # decorators start before the function they belong to
+            start_line = min(span[0] for _, span in elements)
+            end = max(span[2:] for _, span in elements)
+            extents.append(((start_line, 0) + end, [span for _, span in elements]))
+        extents.sort()
+        self._extents = [extent for extent, _ in extents]
+        self._spans = [spans for _, spans in extents]
+        self._starts = [extent[:2] for extent in self._extents]
+
+        folds = {}
+        for elements in statements:
+            for kind, span in elements:
+                if kind in FOLDED and span[2] > span[0]:
+                    # one fold per start line, the outermost
+                    folds[span[0]] = max(folds.get(span[0], span[2]), span[2])
+        self.folding_ranges = [
+            FoldingRange(start_line=start, end_line=end)
+            for start, end in sorted(folds.items())
+        ]
+
+    def enclosing(self, line: int, character: int) -> List[Span]:
+        """Spans containing the position, outermost first."""
+        i = bisect.bisect_right(self._starts, (line, character)) - 1
+        if i < 0 or not _contains(self._extents[i], line, character):
+            return []
+        spans = {span for span in self._spans[i] if _contains(span, line, character)}
+        spans.add(self._extents[i])
+        return sorted(spans, key=lambda s: (s[0], s[1], -s[2], -s[3]))
+
+
+class RangeHandler:
+    def __init__(self, ast: AST):
+        self.ast = ast
+        self._index: Optional[SyntaxIndex] = None
+        self._index_key = None
+
+    def _syntax_index(self, doc: Document) -> SyntaxIndex:
+        # the analysis has the exact spans while it is of the current
+        # text. otherwise, e.g. while the code doesn't compile, the
+        # grammar's, which only re-parses the statements that changed
+        module = self.ast.best_ast
+        if module is not None and self.ast.source == doc.source:
+            key = ("analysis", self.ast.version)
+        else:
+            key = ("grammar", content_hash(doc.source))
+        if key != self._index_key:
+            if key[0] == "analysis":
+                statements = statements_from_module(module)
+            else:
+                statements = syntax_spans(doc.source)
+            self._index = SyntaxIndex(statements)
+            self._index_key = key
+        return self._index
+
+    def folding_ranges(self, doc: Document) -> List[FoldingRange]:
+        return self._syntax_index(doc).folding_ranges
+
+    def selection_ranges(
+        self, doc: Document, positions: List[Position]
+    ) -> List[SelectionRange]:
+        index = self._syntax_index(doc)
+        selections = []
+        for pos in positions:
+            selection = None
+            for span in index.enclosing(pos.line, pos.character):
+                selection = SelectionRange(
+                    range=range_from_span(span), parent=selection
+                )
+            if selection is None:
+                # nothing to expand to, the position itself
+                span = (pos.line, pos.character, pos.line, pos.character)
+                selection = SelectionRange(range=range_from_span(span))
+            selections.append(selection)
+        return selections
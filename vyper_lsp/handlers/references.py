@@ -0,0 +1,113 @@
+from typing import Iterator, List, Optional, Tuple
+
+from lsprotocol.types import Location, Position
+from pygls.workspace import Document
+
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import SymbolIndex, SymbolRecord
+from vyper_lsp.utils import (
+    get_dotted_name_at_cursor,
+    path_from_uri,
+    range_from_span,
+    uri_from_path,
+)
+
+# declarations referenced as `self.x` within their module, everything
+# else is referenced by its bare name
+SELF_QUALIFIED_KINDS = ("function", "variable")
+
+# locations per `$/progress` notification when streaming results
+REFERENCE_BATCH_SIZE = 100
+
+
+def _contains(span, pos: Position) -> bool:
+    start = (span[0], span[1])
+    end = (span[2], span[3])
+    return start <= (pos.line, pos.character) <= end
+
+
+# references to module-level declarations across the whole workspace,
+# answered from the reference records of the workspace index. other
+# names (locals, struct members, ...) are left to the document's
+# navigator.
+class ReferenceHandler:
+    def __init__(self, index: SymbolIndex, imports: ImportCache):
+        self.index = index
+        self.imports = imports
+
+    def resolve_target(
+        self, document: Document, pos: Position
+    ) -> Optional[Tuple[str, SymbolRecord]]:
+        path = str(path_from_uri(document.uri))
+        parts = get_dotted_name_at_cursor(document.lines[pos.line], pos.character)
+        if not parts:
+            return None
+
+        if parts[0] == "self":
+            if len(parts) != 2:
+                return None
+            record = self.imports.members(path).get(parts[1])
+            return (path, record) if record is not None else None
+
+        resolved = self.imports.resolve(self.imports.imports(path), parts)
+        if resolved is not None:
+            target_path, record = resolved
+            return (target_path, record) if record is not None else None
+
+        if len(parts) != 1:
+            return None
+        record = self.imports.members(path).get(parts[0])
+        if record is None:
+            return None
+        # a bare `foo` only refers to function `foo` on its declaration
+        if record.kind in SELF_QUALIFIED_KINDS and not _contains(record.selection, pos):
+            return None
+        return path, record
+
+    def iter_references(
+        self, path: str, record: SymbolRecord, include_declaration: bool = True
+    ) -> Iterator[Location]:
+        """
+        Locations referencing `record`, declared in `path`. Results in
+        the declaring file come first.
+        """
+        uri = uri_from_path(path)
+        if include_declaration:
+            yield Location(uri=uri, range=range_from_span(record.selection))
+
+        local_qualifier = "self" if record.kind in SELF_QUALIFIED_KINDS else None
+        declaring = self.index.get(path)
+        if declaring is not None:
+            for ref in declaring.references:
+                if ref.name == record.name and ref.qualifier == local_qualifier:
+                    yield Location(uri=uri, range=range_from_span(ref.span))
+
+        # other modules reference it through the alias they imported it as
+        for importer in sorted(self.index.graph.imported_by.get(path, ())):
+            file_symbols = self.index.get(importer)
+            if file_symbols is None:
+                continue
+            aliases = {i.alias for i in file_symbols.imports if i.path == path}
+            importer_uri = uri_from_path(importer)
+            for ref in file_symbols.references:
+                if ref.name == record.name and ref.qualifier in aliases:
+                    yield Location(uri=importer_uri, range=range_from_span(ref.span))
+
+    def find_references(
+        self, document: Document, pos: Position, include_declaration: bool = True
+    ) -> Optional[Iterator[Location]]:
+        target = self.resolve_target(document, pos)
+        if target is None:
+            return None
+        return self.iter_references(*target, include_declaration)
+
+
+def batched(locations: Iterator[Location], size: int) -> Iterator[List[Location]]:
+    batch = []
+    for location in locations:
+        batch.append(location)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
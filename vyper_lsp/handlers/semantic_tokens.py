@@ -0,0 +1,277 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from lsprotocol.types import (
+    Position,
+    Range,
+    SemanticTokenModifiers,
+    SemanticTokens,
+    SemanticTokensDelta,
+    SemanticTokensEdit,
+    SemanticTokensLegend,
+    SemanticTokenTypes,
+)
+from pygls.workspace import Document
+from vyper.ast import nodes
+from vyper.semantics.types.module import ModuleT
+
+from vyper_lsp.ast import AST
+
+TOKEN_TYPES = [
+    SemanticTokenTypes.Namespace,
+    SemanticTokenTypes.Interface,
+    SemanticTokenTypes.Struct,
+    SemanticTokenTypes.Enum,
+    SemanticTokenTypes.EnumMember,
+    SemanticTokenTypes.Event,
+    SemanticTokenTypes.Function,
+    SemanticTokenTypes.Method,
+    SemanticTokenTypes.Variable,
+]
+TOKEN_MODIFIERS = [SemanticTokenModifiers.Declaration, SemanticTokenModifiers.Readonly]
+
+LEGEND = SemanticTokensLegend(
+    token_types=[t.value for t in TOKEN_TYPES],
+    token_modifiers=[m.value for m in TOKEN_MODIFIERS],
+)
+
+_TYPE_INDEX = {t: i for i, t in enumerate(TOKEN_TYPES)}
+DECLARATION = 1 << TOKEN_MODIFIERS.index(SemanticTokenModifiers.Declaration)
+READONLY = 1 << TOKEN_MODIFIERS.index(SemanticTokenModifiers.Readonly)
+
+# (line, character, length, type index, modifier bits), in the analyzed source
+Token = Tuple[int, int, int, int, int]
+
+DECLARATION_KINDS = {
+    nodes.FunctionDef: SemanticTokenTypes.Function,
+    nodes.StructDef: SemanticTokenTypes.Struct,
+    nodes.EventDef: SemanticTokenTypes.Event,
+    nodes.FlagDef: SemanticTokenTypes.Enum,
+    nodes.InterfaceDef: SemanticTokenTypes.Interface,
+}
+
+
+def _token(
+    line: int, character: int, name: str, type_: SemanticTokenTypes, modifiers=0
+) -> Token:
+    return (line, character, len(name), _TYPE_INDEX[type_], modifiers)
+
+
+def _name_token(lines: List[str], node, type_, modifiers=0) -> Optional[Token]:
+    # definitions have no node for their name, find it after the keyword
+    line = node.lineno - 1
+    if line >= len(lines):
+        return None
+    pattern = rf"\b{re.escape(node.name)}\b"
+    match = re.compile(pattern).search(lines[line], node.col_offset)
+    if match is None:
+        return None
+    return _token(line, match.start(), node.name, type_, modifiers)
+
+
+def _attribute_token(
+    lines: List[str], node: nodes.Attribute, type_, modifiers=0
+) -> Optional[Token]:
+    # the member name ends the attribute expression, unless vyper got the
+    # end wrong (as it does after an extcall or staticcall on the line)
+    line = node.end_lineno - 1
+    character = node.end_col_offset - len(node.attr)
+    if line >= len(lines) or lines[line][character : node.end_col_offset] != node.attr:
+        return None
+    return _token(line, character, node.attr, type_, modifiers)
+
+
+def encode(tokens: List[Token]) -> List[int]:
+    """The relative encoding of (sorted) tokens the protocol expects."""
+    data = []
+    prev_line = prev_character = 0
+    for line, character, length, type_, modifiers in tokens:
+        delta_line = line - prev_line
+        delta_character = character - prev_character if delta_line == 0 else character
+        data += [delta_line, delta_character, length, type_, modifiers]
+        prev_line, prev_character = line, character
+    return data
+
+
+def token_edits(old: List[int], new: List[int]) -> List[SemanticTokensEdit]:
+    """A single edit replacing what differs between `old` and `new`."""
+    if old == new:
+        return []
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]
+    ):
+        suffix += 1
+    return [
+        SemanticTokensEdit(
+            start=prefix,
+            delete_count=len(old) - prefix - suffix,
+            data=new[prefix : len(new) - suffix],
+        )
+    ]
+
+
+class SemanticTokensHandler:
+    def __init__(self, ast: AST):
+        self.ast = ast
+        # tokens of the analysis they were collected from
+        self._tokens: List[Token] = []
+        self._tokens_version = None
+        # the last result sent, deltas are computed against it
+        self._result_id = 0
+        self._data: List[int] = []
+        self._data_key = None
+
+    def _names(self, module: nodes.Module) -> Dict[str, Tuple[str, int]]:
+        # module-level names which can be used unqualified
+        names = {}
+        for alias, imported in self.ast.imports.items():
+            if isinstance(imported, ModuleT):
+                names[alias] = (SemanticTokenTypes.Namespace, 0)
+            else:
+                names[alias] = (SemanticTokenTypes.Interface, 0)
+        for node in module.body:
+            kind = DECLARATION_KINDS.get(type(node))
+            if kind is not None and not isinstance(node, nodes.FunctionDef):
+                names[node.name] = (kind, 0)
+            elif isinstance(node, nodes.VariableDecl) and (
+                node.is_constant or node.is_immutable
+            ):
+                names[node.target.id] = (SemanticTokenTypes.Variable, READONLY)
+        return names
+
+    def _attribute(
+        self, lines: List[str], node: nodes.Attribute, names
+    ) -> Optional[Token]:
+        parent = node.get_ancestor()
+        is_called = isinstance(parent, nodes.Call) and parent.func is node
+        if is_called and isinstance(
+            parent.get_ancestor(), (nodes.ExtCall, nodes.StaticCall)
+        ):
+            return _attribute_token(lines, node, SemanticTokenTypes.Method)
+        if not isinstance(node.value, nodes.Name):
+            return None
+
+        qualifier = node.value.id
+        if qualifier == "self":
+            if node.attr in self.ast.functions:
+                return _attribute_token(lines, node, SemanticTokenTypes.Function)
+            if node.attr in self.ast.variables:
+                return _attribute_token(lines, node, SemanticTokenTypes.Variable)
+            return None
+        kind, _ = names.get(qualifier, (None, 0))
+        if kind == SemanticTokenTypes.Enum:
+            return _attribute_token(lines, node, SemanticTokenTypes.EnumMember)
+        if kind == SemanticTokenTypes.Namespace:
+            if is_called:
+                return _attribute_token(lines, node, SemanticTokenTypes.Function)
+            return _attribute_token(lines, node, SemanticTokenTypes.Variable)
+        return None
+
+    def _collect(self) -> List[Token]:
+        module = self.ast.best_ast
+        if module is None:
+            return []
+        lines = module.full_source_code.splitlines()
+        names = self._names(module)
+
+        tokens = []
+        for node in module.body:
+            kind = DECLARATION_KINDS.get(type(node))
+            if kind is not None:
+                tokens.append(_name_token(lines, node, kind, DECLARATION))
+            if isinstance(node, nodes.FlagDef):
+                for member in node.get_descendants(nodes.Name):
+                    tokens.append(
+                        _token(
+                            member.lineno - 1,
+                            member.col_offset,
+                            member.id,
+                            SemanticTokenTypes.EnumMember,
+                            DECLARATION,
+                        )
+                    )
+            elif isinstance(node, nodes.VariableDecl):
+                readonly = READONLY if node.is_constant or node.is_immutable else 0
+                target = node.target
+                tokens.append(
+                    _token(
+                        target.lineno - 1,
+                        target.col_offset,
+                        target.id,
+                        SemanticTokenTypes.Variable,
+                        DECLARATION | readonly,
+                    )
+                )
+
+        for node in module.get_descendants((nodes.Name, nodes.Attribute)):
+            if isinstance(node, nodes.Attribute):
+                tokens.append(self._attribute(lines, node, names))
+            elif node.id in names:
+                kind, modifiers = names[node.id]
+                tokens.append(
+                    _token(node.lineno - 1, node.col_offset, node.id, kind, modifiers)
+                )
+
+        # declarations come first and win over uses at the same position
+        unique = {}
+        for token in tokens:
+            if token is not None:
+                unique.setdefault(token[:2], token)
+        return sorted(unique.values())
+
+    def _current_tokens(self) -> List[Token]:
+        if self._tokens_version != self.ast.version:
+            self._tokens = self._collect()
+            self._tokens_version = self.ast.version
+        if not self.ast.positions:
+            return self._tokens
+        # edits made since the analysis move tokens, or invalidate them
+        tokens = []
+        for line, character, length, type_, modifiers in self._tokens:
+            range_ = self.ast.positions.from_analysis(
+                Range(
+                    start=Position(line=line, character=character),
+                    end=Position(line=line, character=character + length),
+                )
+            )
+            # a token whose text was edited has grown or shrunk
+            if (
+                range_ is not None
+                and range_.start.line == range_.end.line
+                and range_.end.character - range_.start.character == length
+            ):
+                start = range_.start
+                tokens.append((start.line, start.character, length, type_, modifiers))
+        return sorted(tokens)
+
+    def _encoded(self, doc: Document) -> List[int]:
+        key = (self.ast.version, doc.version)
+        if self._data_key != key:
+            data = encode(self._current_tokens())
+            if data != self._data:
+                self._result_id += 1
+            self._data = data
+            self._data_key = key
+        return self._data
+
+    def semantic_tokens(self, doc: Document) -> SemanticTokens:
+        data = self._encoded(doc)
+        return SemanticTokens(data=data, result_id=str(self._result_id))
+
+    def semantic_tokens_delta(
+        self, doc: Document, previous_result_id: str
+    ) -> SemanticTokens | SemanticTokensDelta:
+        previous_id, previous = str(self._result_id), self._data
+        data = self._encoded(doc)
+        if previous_result_id != previous_id:
+            # not the result we sent last, all we can send is everything
+            return SemanticTokens(data=data, result_id=str(self._result_id))
+        return SemanticTokensDelta(
+            edits=token_edits(previous, data), result_id=str(self._result_id)
+        )
@@ -1,8 +1,9 @@
+import copy
 import logging
 
 from pygls.workspace import Document
 from vyper.ast import FunctionDef
-from typing import Optional
+from typing import Dict, Optional
 
 from lsprotocol.types import (
     ParameterInformation,
@@ -10,90 +11,94 @@ from lsprotocol.types import (
     SignatureHelpParams,
     SignatureInformation,
 )
-from vyper_lsp import utils
 from vyper_lsp.ast import AST
-from vyper_lsp.utils import get_expression_at_cursor
+from vyper_lsp.utils import find_enclosing_call
 
 logger = logging.getLogger("vyper-lsp")
 
 
+def signature_information(fn) -> SignatureInformation:
+    """
+    Label and parameter ranges for a function type, e.g.
+    "foo(x: int128, y: int128 = 1) -> int128".
+    """
+    node = getattr(fn, "decl_node", None)
+    if isinstance(node, FunctionDef):
+        params = []
+        n_defaults = len(node.args.defaults)
+        n_args = len(node.args.args)
+        for i, arg in enumerate(node.args.args):
+            param = f"{arg.arg}: {arg.annotation.node_source_code}"
+            default_index = i - (n_args - n_defaults)
+            if default_index >= 0:
+                param += f" = {node.args.defaults[default_index].node_source_code}"
+            params.append(param)
+        returns = node.returns and node.returns.node_source_code
+    else:
+        # e.g. functions of json interfaces, which have no source
+        params = [f"{arg.name}: {arg.typ}" for arg in fn.arguments]
+        returns = fn.return_type and str(fn.return_type)
+
+    label = f"{fn.name}("
+    parameters = []
+    for i, param in enumerate(params):
+        if i > 0:
+            label += ", "
+        parameters.append(
+            ParameterInformation(label=(len(label), len(label) + len(param)))
+        )
+        label += param
+    label += ")"
+    if returns:
+        label += f" -> {returns}"
+
+    return SignatureInformation(label=label, parameters=parameters)
+
+
 class SignatureHandler:
     def __init__(self, ast: AST):
         self.ast = ast
+        # signature per function type, for this document's functions and
+        # those of its imports. function types are replaced along with the
+        # analysis, so the table is dropped whenever `ast.version` changes
+        self._signatures: Dict[object, SignatureInformation] = {}
+        self._signatures_version = None
 
-    def _handle_internal_fn_signature(
-        self, current_line: str, fn_name: str
-    ) -> Optional[SignatureHelp]:
-        node = self.ast.find_function_declaration_node_for_name(fn_name)
-        if not node:
+    def _find_function(self, qualifier: str, fn_name: str):
+        if qualifier == "self":
+            functions = self.ast.functions
+        elif qualifier in self.ast.imports:
+            functions = getattr(self.ast.imports[qualifier], "functions", {})
+        else:
             return None
+        return functions.get(fn_name)
 
-        fn_name = node.name
-        parameters = []
-
-        fn_label = node.node_source_code.split(":\n")[0].removeprefix("def ")
-
-        for arg in node.args.args:
-            start_index = fn_label.find(arg.arg)
-            end_index = start_index + len(arg.arg)
-            parameters.append(
-                ParameterInformation(label=(start_index, end_index), documentation=None)
-            )
-        active_parameter = current_line.split("(")[-1].count(",")
-        return SignatureHelp(
-            signatures=[
-                SignatureInformation(
-                    label=fn_label,
-                    parameters=parameters,
-                    documentation=None,
-                    active_parameter=active_parameter or 0,
-                )
-            ],
-            active_signature=0,
-        )
-
-    def _handle_imported_fn_signature(
-        self, current_line: str, module: str, fn_name: str
-    ) -> Optional[SignatureHelp]:
-        if module in self.ast.imports:
-            if fn := self.ast.imports[module].functions[fn_name]:
-                logger.info(f"getting signature for {fn_name}")
-                logger.info(fn.decl_node)
-                node: FunctionDef = fn.decl_node
-                label = node.node_source_code.split("def ")[1].split(":\n")[0]
-                parameters = []
-                for arg in node.args.args:
-                    parameters.append(
-                        ParameterInformation(label=arg.arg, documentation=None)
-                    )
-                active_parameter = current_line.split("(")[-1].count(",")
-                return SignatureHelp(
-                    signatures=[
-                        SignatureInformation(
-                            label=label,
-                            parameters=parameters,
-                            documentation=None,
-                            active_parameter=active_parameter or 0,
-                        )
-                    ],
-                    active_signature=0,
-                )
+    def _signature(self, fn) -> SignatureInformation:
+        if self._signatures_version != self.ast.version:
+            self._signatures.clear()
+            self._signatures_version = self.ast.version
+        signature = self._signatures.get(fn)
+        if signature is None:
+            signature = self._signatures[fn] = signature_information(fn)
+        return signature
 
     def signature_help(
         self, doc: Document, params: SignatureHelpParams
     ) -> Optional[SignatureHelp]:
-        # TODO: Implement checking external functions, module functions, and interfaces
-        current_line = doc.lines[params.position.line]
-        expression = get_expression_at_cursor(
-            current_line, params.position.character - 1
+        # TODO: Implement checking external functions and interfaces
+        call = find_enclosing_call(
+            doc.lines, params.position.line, params.position.character
         )
-        parsed = utils.parse_fncall_expression(expression)
-        if parsed is None:
+        if call is None:
             return None
-        module, fn_name = parsed
+        callee, active_parameter = call
 
-        # this returns for all external functions
-        if module == "self":
-            return self._handle_internal_fn_signature(current_line, fn_name)
-        else:
-            return self._handle_imported_fn_signature(current_line, module, fn_name)
+        qualifier, _, fn_name = callee.rpartition(".")
+        fn = self._find_function(qualifier, fn_name)
+        if fn is None:
+            return None
+
+        # the cached signature is shared, the active parameter isn't
+        signature = copy.copy(self._signature(fn))
+        signature.active_parameter = active_parameter
+        return SignatureHelp(signatures=[signature], active_signature=0)
@@ -0,0 +1,95 @@
+from typing import Dict, List, Tuple
+
+from lsprotocol.types import DocumentSymbol, Location, SymbolInformation, SymbolKind
+from pygls.workspace import Document
+
+from vyper_lsp.grammar import outline_symbols
+from vyper_lsp.index import SymbolIndex, SymbolRecord, content_hash
+from vyper_lsp.search import DEFAULT_LIMIT
+from vyper_lsp.utils import path_from_uri, range_from_span, uri_from_path
+
+SYMBOL_KINDS = {
+    "function": SymbolKind.Function,
+    "method": SymbolKind.Method,
+    "variable": SymbolKind.Variable,
+    "constant": SymbolKind.Constant,
+    "immutable": SymbolKind.Constant,
+    "struct": SymbolKind.Struct,
+    "field": SymbolKind.Field,
+    "flag": SymbolKind.Enum,
+    "variant": SymbolKind.EnumMember,
+    "event": SymbolKind.Event,
+    "interface": SymbolKind.Interface,
+}
+
+
+def build_outline(records: List[SymbolRecord]) -> List[DocumentSymbol]:
+    outline = []
+    containers: Dict[str, DocumentSymbol] = {}
+    for record in records:
+        # functions: decorators and mutability, declarations: their type
+        symbol = DocumentSymbol(
+            name=record.name,
+            kind=SYMBOL_KINDS[record.kind],
+            range=range_from_span(record.span),
+            selection_range=range_from_span(record.selection),
+            detail=record.detail,
+        )
+        parent = containers.get(record.container)
+        if parent is not None:
+            parent.children = (parent.children or []) + [symbol]
+        else:
+            outline.append(symbol)
+            containers[record.name] = symbol
+    return outline
+
+
+class SymbolHandler:
+    def __init__(self, index: SymbolIndex):
+        self.index = index
+        # path -> (content hash, outline), so repeated outline requests
+        # for an unchanged document don't rebuild anything
+        self._outlines: Dict[str, Tuple[str, List[DocumentSymbol]]] = {}
+
+    def forget(self, path: str):
+        self._outlines.pop(path, None)
+
+    def workspace_symbols(
+        self, query: str, limit: int = DEFAULT_LIMIT
+    ) -> List[SymbolInformation]:
+        return [
+            SymbolInformation(
+                name=record.name,
+                kind=SYMBOL_KINDS[record.kind],
+                location=Location(
+                    uri=uri_from_path(path), range=range_from_span(record.span)
+                ),
+                container_name=record.container,
+            )
+            for path, record in self.index.search.search(query, limit)
+        ]
+
+    def document_symbols(self, doc: Document) -> List[DocumentSymbol]:
+        path = str(path_from_uri(doc.uri))
+        source_hash = content_hash(doc.source)
+
+        cached = self._outlines.get(path)
+        if cached is not None and cached[0] == source_hash:
+            return cached[1]
+
+        # the last analysis is exact, use it whenever it is still current.
+        # otherwise parse the declarations with the lark grammar, which
+        # costs a few milliseconds per changed top-level statement and
+        # never invokes the compiler
+        entry = self.index.get(path)
+        if entry is not None and entry.content_hash == source_hash:
+            records = entry.symbols
+        else:
+            records = outline_symbols(doc.source)
+            if not records and entry is not None:
+                # nothing recognisable, the stale outline beats an empty one
+                records = entry.symbols
+
+        outline = build_outline(records)
+        self._outlines[path] = (source_hash, outline)
+        return outline
@@ -0,0 +1,98 @@
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from vyper.compiler.input_bundle import CompilerInput, FileInput, FilesystemInputBundle
+
+from vyper_lsp.index import FileSymbols, ImportRecord, SymbolIndex, SymbolRecord
+
+
+# input bundle which prefers the editor's contents of open documents
+# over what is on disk, so that importers are checked against unsaved
+# edits of the modules they import
+class OverlayInputBundle(FilesystemInputBundle):
+    def __init__(self, search_paths, overlay: Mapping[str, str]):
+        super().__init__(search_paths)
+        self.overlay = overlay
+
+    def _load_from_path(
+        self, resolved_path: Path, original_path: Path
+    ) -> CompilerInput:
+        source = self.overlay.get(str(resolved_path))
+        if source is None:
+            return super()._load_from_path(resolved_path, original_path)
+        source_id = self._generate_source_id(resolved_path)
+        return FileInput(source_id, original_path, resolved_path, source)
+
+
+# top-level members of imported modules, shared by every open document.
+#
+# tables are built from the workspace index, which already holds the
+# declarations of every module (recorded when it was compiled or
+# indexed), so resolving `lib.foo` never compiles `lib`. a table is
+# rebuilt only when the index entry for its module is replaced.
+class ImportCache:
+    def __init__(self, index: SymbolIndex):
+        self.index = index
+        self._members: Dict[str, Tuple[FileSymbols, Dict[str, SymbolRecord]]] = {}
+        self._lock = threading.Lock()
+
+    def file_symbols(self, path: str) -> Optional[FileSymbols]:
+        file_symbols = self.index.get(path)
+        if file_symbols is None and path.endswith((".vy", ".vyi")):
+            # not indexed yet, e.g. a module outside of the workspace
+            file_symbols = self.index.index_file(Path(path))
+        return file_symbols
+
+    def members(self, path: str) -> Dict[str, SymbolRecord]:
+        file_symbols = self.file_symbols(path)
+        if file_symbols is None:
+            return {}
+
+        with self._lock:
+            cached = self._members.get(path)
+            if cached is not None and cached[0] is file_symbols:
+                return cached[1]
+
+            table = {}
+            for record in file_symbols.symbols:
+                if record.container is None:
+                    table.setdefault(record.name, record)
+            self._members[path] = (file_symbols, table)
+            return table
+
+    def imports(self, path: str) -> List[ImportRecord]:
+        file_symbols = self.file_symbols(path)
+        return file_symbols.imports if file_symbols is not None else []
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._members.pop(path, None)
+
+    def resolve(
+        self, imports: List[ImportRecord], parts: List[str]
+    ) -> Optional[Tuple[str, Optional[SymbolRecord]]]:
+        """
+        Resolve a dotted name like `lib.foo` or `lib.sublib.Bar` through
+        the given import records, to (module path, member record). The
+        record is None if the name refers to a module itself.
+        """
+        path = None
+        for i, part in enumerate(parts):
+            alias = next((r for r in imports if r.alias == part), None)
+            if alias is not None:
+                if alias.path is None:
+                    return None
+                path = alias.path
+                # the next part is looked up in the imported module
+                imports = self.imports(path)
+                continue
+
+            if path is None or i != len(parts) - 1:
+                return None
+            record = self.members(path).get(part)
+            if record is None:
+                return None
+            return path, record
+
+        return (path, None) if path is not None else None
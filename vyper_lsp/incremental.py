@@ -0,0 +1,152 @@
+from typing import List, Optional, Tuple
+
+from vyper.ast import nodes
+from vyper.semantics.analysis.local import FunctionAnalyzer
+from vyper.semantics.analysis.utils import get_exact_type_from_node
+from vyper.semantics.namespace import Namespace, override_global_namespace
+from vyper.semantics.types.function import ContractFunctionT
+from vyper.exceptions import VyperException
+from vyper.utils import OrderedSet
+
+
+# re-analysis of a single function body against an already annotated
+# module. most edits are confined to one function, which doesn't change
+# the module's namespace, so there is no need to re-resolve imports and
+# re-check every other function.
+#
+# module-level checks depending on function bodies (call cycles,
+# `uses:` declarations, ...) are not redone, a full analysis (e.g. on
+# save) catches those.
+
+
+def changed_lines(old: List[str], new: List[str]) -> Tuple[int, int, int]:
+    """
+    The lines [start, old_end) of `old` were replaced by the lines
+    [start, new_end) of `new`.
+    """
+    start = 0
+    limit = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+def _is_code(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith("#")
+
+
+def edited_function(
+    module: nodes.Module, old: List[str], new: List[str]
+) -> Optional[Tuple[nodes.FunctionDef, int]]:
+    """
+    The function whose body contains every change between the `old`
+    and `new` lines of `module`'s source, and by how many lines the
+    change moved everything after it. None if the change touches
+    anything else, e.g. a signature or a top-level declaration.
+    """
+    start, old_end, new_end = changed_lines(old, new)
+    if start == old_end == new_end:
+        return None
+
+    top_level = module.body
+    for i, node in enumerate(top_level):
+        if not isinstance(node, nodes.FunctionDef):
+            continue
+        # 0-based, the body ends where the next top-level statement begins
+        body_start = node.body[0].lineno - 1
+        if i + 1 < len(top_level):
+            following = top_level[i + 1]
+            decorators = getattr(following, "decorator_list", None)
+            body_end = (decorators[0] if decorators else following).lineno - 1
+        else:
+            body_end = len(old)
+        if body_start <= start and old_end <= body_end:
+            break
+    else:
+        return None
+
+    # indented code stays within the function
+    for line in old[start:old_end] + new[start:new_end]:
+        if _is_code(line) and not line[0].isspace():
+            return None
+
+    return node, new_end - old_end
+
+
+def _shift(node: nodes.VyperNode, delta: int):
+    for n in [node] + node.get_descendants():
+        n.lineno += delta
+        n.end_lineno += delta
+
+
+def reanalyze_function(
+    module: nodes.Module,
+    old_fn: nodes.FunctionDef,
+    new_fn: nodes.FunctionDef,
+    delta: int,
+):
+    """
+    Check `new_fn`, the edited version of `old_fn`, against the namespace
+    of `module`, and replace `old_fn` with it. Raises a VyperException
+    (leaving `module` as it was) if the new body does not check.
+    """
+    func_t = old_fn._metadata["func_type"]
+    saved = (
+        func_t.ast_def,
+        func_t.called_functions,
+        func_t._variable_reads,
+        func_t._variable_writes,
+        func_t._analysed,
+    )
+
+    new_fn.set_parent(module)
+    new_fn._metadata["func_type"] = func_t
+    func_t.ast_def = new_fn
+    func_t.called_functions = OrderedSet()
+    func_t._variable_reads = OrderedSet()
+    func_t._variable_writes = OrderedSet()
+    func_t._analysed = False
+
+    # a fresh namespace holding the module's declarations (including its
+    # `self`), the function's scope is dropped again afterwards
+    namespace = Namespace()
+    try:
+        with override_global_namespace(namespace), namespace.enter_scope():
+            dict.update(namespace, module._metadata["namespace"])
+            for call in new_fn.get_descendants(nodes.Call):
+                try:
+                    call_t = get_exact_type_from_node(call.func)
+                except VyperException:
+                    continue
+                if isinstance(call_t, ContractFunctionT) and (
+                    call_t.is_internal or call_t.is_constructor
+                ):
+                    func_t.called_functions.add(call_t)
+            with namespace.enter_scope():
+                FunctionAnalyzer(module, new_fn, namespace).analyze()
+    except Exception:
+        (
+            func_t.ast_def,
+            func_t.called_functions,
+            func_t._variable_reads,
+            func_t._variable_writes,
+            func_t._analysed,
+        ) = saved
+        raise
+
+    # nodes compare by value, swap by identity
+    for children in (module.body, module._children):
+        index = next(i for i, node in enumerate(children) if node is old_fn)
+        children[index] = new_fn
+    module._cache_descendants = None
+
+    if delta:
+        index = next(i for i, node in enumerate(module.body) if node is new_fn)
+        for node in module.body[index + 1 :]:
+            _shift(node, delta)
+        module.end_lineno += delta
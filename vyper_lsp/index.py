@@ -0,0 +1,535 @@
+import hashlib
+import logging
+import os
+import sys
+import threading
+from pathlib import Path, PurePath
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from vyper.ast import nodes, parse_to_ast
+from vyper.exceptions import VyperException
+from vyper.semantics.namespace import get_namespace
+
+from vyper_lsp.graph import ImportGraph
+from vyper_lsp.search import SymbolSearch
+from vyper_lsp.store import IndexStore
+
+logger = logging.getLogger("vyper-lsp")
+
+INDEXED_SUFFIXES = (".vy", ".vyi")
+IMPORT_SUFFIXES = (".vy", ".vyi", ".json")
+
+# directories which never contain sources we want in the workspace index
+SKIPPED_DIRECTORIES = {"node_modules", "__pycache__", "venv", "build", "out"}
+
+# (start_line, start_character, end_line, end_character), 0-indexed like lsp
+Span = Tuple[int, int, int, int]
+
+
+def content_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def span_from_node(node: nodes.VyperNode) -> Span:
+    return (node.lineno - 1, node.col_offset, node.end_lineno - 1, node.end_col_offset)
+
+
+class SymbolRecord:
+    """A declaration: function, variable, type, or a member of one."""
+
+    __slots__ = (
+        "name",
+        "kind",
+        "span",
+        "selection",
+        "container",
+        "detail",
+        "signature",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        span: Span,
+        selection: Span,
+        container: Optional[str] = None,
+        detail: Optional[str] = None,
+        signature: Optional[str] = None,
+    ):
+        # names repeat across records and files, keep one copy of each
+        self.name = sys.intern(name)
+        self.kind = sys.intern(kind)
+        self.span = span
+        self.selection = selection
+        self.container = container and sys.intern(container)
+        self.detail = detail
+        self.signature = signature
+
+    def to_json(self) -> list:
+        return [
+            self.name,
+            self.kind,
+            self.span,
+            self.selection,
+            self.container,
+            self.detail,
+            self.signature,
+        ]
+
+    @classmethod
+    def from_json(cls, data: list) -> "SymbolRecord":
+        name, kind, span, selection, container, detail, signature = data
+        return cls(
+            name, kind, tuple(span), tuple(selection), container, detail, signature
+        )
+
+
+class ReferenceRecord:
+    """A use of `name`, optionally qualified (`self.name`, `lib.name`)."""
+
+    __slots__ = ("name", "qualifier", "span")
+
+    def __init__(self, name: str, qualifier: Optional[str], span: Span):
+        self.name = sys.intern(name)
+        self.qualifier = qualifier and sys.intern(qualifier)
+        self.span = span
+
+    def to_json(self) -> list:
+        return [self.name, self.qualifier, self.span]
+
+    @classmethod
+    def from_json(cls, data: list) -> "ReferenceRecord":
+        name, qualifier, span = data
+        return cls(name, qualifier, tuple(span))
+
+
+class ImportRecord:
+    """An import edge; `path` is the resolved file, or None if unresolved."""
+
+    __slots__ = ("alias", "module", "path")
+
+    def __init__(self, alias: str, module: str, path: Optional[str]):
+        self.alias = alias
+        self.module = module
+        self.path = path
+
+    def to_json(self) -> list:
+        return [self.alias, self.module, self.path]
+
+    @classmethod
+    def from_json(cls, data: list) -> "ImportRecord":
+        return cls(*data)
+
+
+class FileSymbols:
+    """Everything the workspace index knows about a single file."""
+
+    __slots__ = ("path", "content_hash", "symbols", "references", "imports")
+
+    def __init__(
+        self,
+        path: str,
+        content_hash: str,
+        symbols: List[SymbolRecord],
+        references: List[ReferenceRecord],
+        imports: List[ImportRecord],
+    ):
+        self.path = path
+        self.content_hash = content_hash
+        self.symbols = symbols
+        self.references = references
+        self.imports = imports
+
+    def to_json(self) -> dict:
+        return {
+            "symbols": [s.to_json() for s in self.symbols],
+            "references": [r.to_json() for r in self.references],
+            "imports": [i.to_json() for i in self.imports],
+        }
+
+    @classmethod
+    def from_json(cls, path: str, content_hash: str, data: dict) -> "FileSymbols":
+        return cls(
+            path,
+            content_hash,
+            [SymbolRecord.from_json(s) for s in data["symbols"]],
+            [ReferenceRecord.from_json(r) for r in data["references"]],
+            [ImportRecord.from_json(i) for i in data["imports"]],
+        )
+
+    @classmethod
+    def empty(cls, path: str, content_hash: str) -> "FileSymbols":
+        return cls(path, content_hash, [], [], [])
+
+
+def _name_selection(node: nodes.VyperNode, name: str, keyword: str = "") -> Span:
+    # nodes only carry the span of the whole declaration, find the name
+    # on its first line so editors can highlight just the identifier
+    line = node.node_source_code.split("\n", 1)[0]
+    offset = max(line.find(name, len(keyword)), 0)
+    start = node.col_offset + offset
+    return (node.lineno - 1, start, node.lineno - 1, start + len(name))
+
+
+def format_signature(node: nodes.FunctionDef) -> str:
+    args = []
+    n_defaults = len(node.args.defaults)
+    n_args = len(node.args.args)
+    for i, arg in enumerate(node.args.args):
+        arg_str = f"{arg.arg}: {arg.annotation.node_source_code}"
+        default_index = i - (n_args - n_defaults)
+        if default_index >= 0:
+            arg_str += f" = {node.args.defaults[default_index].node_source_code}"
+        args.append(arg_str)
+    out = f"{node.name}({', '.join(args)})"
+    if node.returns is not None:
+        out += f" -> {node.returns.node_source_code}"
+    return out
+
+
+MUTABILITIES = ("pure", "view", "nonpayable", "payable")
+
+
+def function_detail(decorators: List[str], mutability: Optional[str] = None) -> str:
+    """
+    Decorators as written, followed by the mutability if it is implicit,
+    e.g. "@external @view" or "@internal nonpayable".
+    """
+    if mutability is None and not any(
+        d.lstrip("@") in MUTABILITIES for d in decorators
+    ):
+        mutability = "nonpayable"
+    return " ".join(decorators + ([mutability] if mutability else []))
+
+
+def _function_record(node: nodes.FunctionDef, container=None) -> SymbolRecord:
+    decorators = [f"@{d.node_source_code}" for d in node.decorator_list]
+    mutability = None
+    if container is not None and isinstance(node.body[0], nodes.Expr):
+        # interface functions are declared as `def f(): view`
+        mutability = node.body[0].value.node_source_code
+    kind = "method" if container else "function"
+    return SymbolRecord(
+        node.name,
+        kind,
+        span_from_node(node),
+        _name_selection(node, node.name, "def"),
+        container=container,
+        detail=function_detail(decorators, mutability),
+        signature=format_signature(node),
+    )
+
+
+def _variable_kind(node: nodes.VariableDecl) -> str:
+    if node.is_constant:
+        return "constant"
+    if node.is_immutable:
+        return "immutable"
+    return "variable"
+
+
+def _member_records(node: nodes.VyperNode) -> List[SymbolRecord]:
+    records = []
+    for member in node.body:
+        if isinstance(member, nodes.AnnAssign):
+            target = member.target
+            records.append(
+                SymbolRecord(
+                    target.id,
+                    "field",
+                    span_from_node(member),
+                    span_from_node(target),
+                    container=node.name,
+                    detail=member.annotation.node_source_code,
+                )
+            )
+        elif isinstance(member, nodes.Expr) and isinstance(member.value, nodes.Name):
+            records.append(
+                SymbolRecord(
+                    member.value.id,
+                    "variant",
+                    span_from_node(member),
+                    span_from_node(member.value),
+                    container=node.name,
+                )
+            )
+        elif isinstance(member, nodes.FunctionDef):
+            records.append(_function_record(member, container=node.name))
+    return records
+
+
+def _declaration_records(module: nodes.Module) -> List[SymbolRecord]:
+    records = []
+    for node in module.body:
+        if isinstance(node, nodes.FunctionDef):
+            records.append(_function_record(node))
+        elif isinstance(node, nodes.VariableDecl):
+            records.append(
+                SymbolRecord(
+                    node.target.id,
+                    _variable_kind(node),
+                    span_from_node(node),
+                    span_from_node(node.target),
+                    detail=node.annotation.node_source_code,
+                )
+            )
+        elif isinstance(
+            node, (nodes.StructDef, nodes.FlagDef, nodes.EventDef, nodes.InterfaceDef)
+        ):
+            kind = {
+                nodes.StructDef: "struct",
+                nodes.FlagDef: "flag",
+                nodes.EventDef: "event",
+                nodes.InterfaceDef: "interface",
+            }[type(node)]
+            records.append(
+                SymbolRecord(
+                    node.name,
+                    kind,
+                    span_from_node(node),
+                    _name_selection(node, node.name, kind),
+                )
+            )
+            records.extend(_member_records(node))
+    return records
+
+
+_KEYWORDS = {
+    "self",
+    # annotations
+    "constant",
+    "public",
+    "immutable",
+    "transient",
+    "indexed",
+    # decorators
+    "deploy",
+    "external",
+    "internal",
+    "view",
+    "pure",
+    "payable",
+    "nonpayable",
+    "nonreentrant",
+}
+
+_builtin_names = None
+
+
+def _is_builtin_name(name: str) -> bool:
+    # builtin types, functions and environment variables are never
+    # interesting reference targets, skip them to keep entries small
+    global _builtin_names
+    if _builtin_names is None:
+        _builtin_names = set(get_namespace().keys()) | _KEYWORDS
+    return name in _builtin_names
+
+
+def _is_declaration_name(node: nodes.Name) -> bool:
+    parent = node.get_ancestor()
+    if isinstance(parent, (nodes.VariableDecl, nodes.AnnAssign)):
+        # module level declarations and struct/event members, locals
+        # are references to themselves only within their function
+        return parent.target is node and not isinstance(
+            parent.get_ancestor(), nodes.FunctionDef
+        )
+    if isinstance(parent, nodes.Expr):
+        # flag variants
+        return isinstance(parent.get_ancestor(), nodes.FlagDef)
+    return False
+
+
+def _reference_records(module: nodes.Module) -> List[ReferenceRecord]:
+    records = []
+    for node in module.get_descendants((nodes.Name, nodes.Attribute)):
+        if isinstance(node, nodes.Attribute):
+            value = node.value
+            if isinstance(value, nodes.Name) and (
+                value.id == "self" or not _is_builtin_name(value.id)
+            ):
+                records.append(
+                    ReferenceRecord(node.attr, value.id, span_from_node(node))
+                )
+            continue
+
+        if _is_builtin_name(node.id) or _is_declaration_name(node):
+            continue
+        records.append(ReferenceRecord(node.id, None, span_from_node(node)))
+    return records
+
+
+def _import_module_path(level: int, module: str) -> PurePath:
+    # mirrors how vyper maps import statements to (suffix-less) paths
+    base = ""
+    if level > 1:
+        base = "../" * (level - 1)
+    return PurePath(f"{base}{module.replace('.', '/')}")
+
+
+def resolve_import(
+    level: int, module: str, file_path: Path, search_paths: List[Path]
+) -> Optional[str]:
+    relative = _import_module_path(level, module)
+    if level > 0:
+        candidates = [file_path.parent]
+    else:
+        # the importing file's directory takes precedence, like in vyper
+        candidates = [file_path.parent] + list(reversed(search_paths))
+
+    for base in candidates:
+        for suffix in IMPORT_SUFFIXES:
+            candidate = Path(base) / relative.with_suffix(suffix)
+            if candidate.is_file():
+                return str(candidate.resolve())
+    return None
+
+
+def _import_records(
+    module: nodes.Module, file_path: Path, search_paths: List[Path]
+) -> List[ImportRecord]:
+    records = []
+    for node in module.get_children((nodes.Import, nodes.ImportFrom)):
+        alias = node.alias or node.name
+        level = getattr(node, "level", 0) or 0
+        qualified = node.name
+        if isinstance(node, nodes.ImportFrom) and node.module:
+            qualified = f"{node.module}.{node.name}"
+
+        resolved = None
+        import_info = node._metadata.get("import_info")
+        if import_info is not None:
+            resolved_path = Path(import_info.compiler_input.resolved_path)
+            if resolved_path.is_absolute():
+                resolved = str(resolved_path)
+        if resolved is None:
+            resolved = resolve_import(level, qualified, file_path, search_paths)
+
+        records.append(ImportRecord(alias, qualified, resolved))
+    return records
+
+
+def symbols_from_module(
+    module: nodes.Module,
+    path: str,
+    source_hash: str,
+    search_paths: Optional[List[Path]] = None,
+) -> FileSymbols:
+    return FileSymbols(
+        path,
+        source_hash,
+        _declaration_records(module),
+        _reference_records(module),
+        _import_records(module, Path(path), search_paths or []),
+    )
+
+
+def symbols_from_source(
+    source: str, path: str, search_paths: Optional[List[Path]] = None
+) -> FileSymbols:
+    source_hash = content_hash(source)
+    try:
+        module = parse_to_ast(
+            source,
+            module_path=path,
+            resolved_path=path,
+            is_interface=path.endswith(".vyi"),
+        )
+    except (VyperException, SyntaxError) as e:
+        # keep an (empty) entry anyway so unchanged broken files are not
+        # re-parsed on every startup
+        logger.debug(f"could not index {path}: {e}")
+        return FileSymbols.empty(path, source_hash)
+    return symbols_from_module(module, path, source_hash, search_paths)
+
+
+def iter_source_files(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if not d.startswith(".") and d not in SKIPPED_DIRECTORIES
+        ]
+        for filename in filenames:
+            if filename.endswith(INDEXED_SUFFIXES):
+                yield Path(dirpath) / filename
+
+
+# workspace-wide index of declarations, references and import edges,
+# backed by an optional on-disk store keyed by content hash and vyper
+# version so warm restarts only re-index files which changed.
+class SymbolIndex:
+    def __init__(self, store: Optional[IndexStore] = None, vyper_version: str = ""):
+        self.store = store
+        self.vyper_version = vyper_version
+        self.files: Dict[str, FileSymbols] = {}
+        self.search = SymbolSearch()
+        self.graph = ImportGraph()
+        self._lock = threading.RLock()
+
+    def get(self, path: str) -> Optional[FileSymbols]:
+        return self.files.get(path)
+
+    def update(self, file_symbols: FileSymbols):
+        with self._lock:
+            self.files[file_symbols.path] = file_symbols
+            # members are reachable through their container, only
+            # top-level declarations are searchable workspace symbols
+            self.search.replace(
+                file_symbols.path,
+                [s for s in file_symbols.symbols if s.container is None],
+            )
+            self.graph.update(
+                file_symbols.path,
+                [i.path for i in file_symbols.imports if i.path is not None],
+            )
+
+    def remove(self, path: str):
+        with self._lock:
+            self.files.pop(path, None)
+            self.search.remove(path)
+            self.graph.remove(path)
+        if self.store is not None:
+            self.store.remove(path)
+
+    def index_file(
+        self, path: Path, search_paths: Optional[List[Path]] = None
+    ) -> Optional[FileSymbols]:
+        try:
+            source = path.read_text()
+        except (OSError, UnicodeDecodeError) as e:
+            logger.debug(f"could not read {path}: {e}")
+            return None
+        return self.index_source(str(path), source, search_paths)
+
+    def index_source(
+        self, path: str, source: str, search_paths: Optional[List[Path]] = None
+    ) -> FileSymbols:
+        source_hash = content_hash(source)
+        current = self.files.get(path)
+        if current is not None and current.content_hash == source_hash:
+            return current
+
+        file_symbols = None
+        if self.store is not None:
+            data = self.store.get(path, source_hash, self.vyper_version)
+            if data is not None:
+                file_symbols = FileSymbols.from_json(path, source_hash, data)
+
+        if file_symbols is None:
+            file_symbols = symbols_from_source(source, path, search_paths)
+            if self.store is not None:
+                self.store.put(
+                    path, source_hash, self.vyper_version, file_symbols.to_json()
+                )
+
+        self.update(file_symbols)
+        return file_symbols
+
+    def index_folder(self, root: Path, search_paths: Optional[List[Path]] = None):
+        count = 0
+        for path in iter_source_files(root):
+            if self.index_file(path.resolve(), search_paths) is not None:
+                count += 1
+        logger.info(f"indexed {count} files under {root}")
+        return count
@@ -1,56 +1,162 @@
 import argparse
-from typing import Optional, List
+import asyncio
+import contextlib
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, List
 import logging
 from .logging import LanguageServerLogHandler
 from lsprotocol.types import (
+    COMPLETION_ITEM_RESOLVE,
+    INITIALIZE,
+    INITIALIZED,
+    PROGRESS,
+    SHUTDOWN,
     TEXT_DOCUMENT_COMPLETION,
     TEXT_DOCUMENT_DID_CHANGE,
+    TEXT_DOCUMENT_DID_CLOSE,
     TEXT_DOCUMENT_DID_OPEN,
     TEXT_DOCUMENT_DID_SAVE,
     TEXT_DOCUMENT_DECLARATION,
     TEXT_DOCUMENT_DEFINITION,
+    TEXT_DOCUMENT_DIAGNOSTIC,
+    TEXT_DOCUMENT_DOCUMENT_SYMBOL,
+    TEXT_DOCUMENT_FOLDING_RANGE,
     TEXT_DOCUMENT_IMPLEMENTATION,
+    TEXT_DOCUMENT_INLAY_HINT,
     TEXT_DOCUMENT_REFERENCES,
+    TEXT_DOCUMENT_SELECTION_RANGE,
+    TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL,
+    TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL_DELTA,
     TEXT_DOCUMENT_HOVER,
     TEXT_DOCUMENT_SIGNATURE_HELP,
+    WORKSPACE_DIAGNOSTIC,
+    WORKSPACE_DIAGNOSTIC_REFRESH,
+    WORKSPACE_DID_CHANGE_CONFIGURATION,
+    WORKSPACE_DID_CHANGE_WATCHED_FILES,
+    WORKSPACE_DID_CHANGE_WORKSPACE_FOLDERS,
+    WORKSPACE_SYMBOL,
+    CompletionItem,
     CompletionOptions,
     CompletionParams,
     CompletionList,
     DeclarationParams,
     ReferenceParams,
     DefinitionParams,
+    Diagnostic,
+    DiagnosticOptions,
+    DocumentDiagnosticParams,
+    DocumentDiagnosticReport,
+    DocumentSymbol,
+    DocumentSymbolParams,
+    FoldingRange,
+    FoldingRangeParams,
     HoverParams,
     Hover,
     SignatureHelpOptions,
     SignatureHelpParams,
+    SelectionRange,
+    SelectionRangeParams,
+    SemanticTokens,
+    SemanticTokensDelta,
+    SemanticTokensDeltaParams,
+    SemanticTokensParams,
     Location,
+    DidChangeConfigurationParams,
     DidChangeTextDocumentParams,
+    DidChangeWatchedFilesParams,
+    DidChangeWatchedFilesRegistrationOptions,
+    DidCloseTextDocumentParams,
     DidOpenTextDocumentParams,
+    DidChangeWorkspaceFoldersParams,
     DidSaveTextDocumentParams,
+    FileChangeType,
+    FileSystemWatcher,
+    InitializeParams,
+    InitializedParams,
+    InlayHint,
+    InlayHintParams,
+    ProgressParams,
+    Registration,
+    RegistrationParams,
+    SymbolInformation,
+    TextDocumentContentChangeEvent_Type1,
+    WorkspaceDiagnosticParams,
+    WorkspaceDiagnosticReport,
+    WorkspaceSymbolParams,
 )
 from packaging.version import Version
 from pygls.server import LanguageServer
-from vyper_lsp.handlers.signatures import SignatureHandler
-from vyper_lsp.handlers.completion import CompletionHandler
-from vyper_lsp.handlers.hover import HoverHandler
-from vyper_lsp.debounce import Debouncer
+from pygls.workspace import Document
+from vyper_lsp.handlers.references import (
+    REFERENCE_BATCH_SIZE,
+    ReferenceHandler,
+    batched,
+)
+from vyper_lsp.handlers.semantic_tokens import LEGEND
+from vyper_lsp.handlers.symbols import SymbolHandler
+from vyper_lsp.check import run_check
+from vyper_lsp.compilers import CompilerPool
+from vyper_lsp.debounce import AdaptiveDelay, Debouncer
+from vyper_lsp.diagnostics import DiagnosticStore, document_report, workspace_report
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import INDEXED_SUFFIXES, SymbolIndex
+from vyper_lsp.memory import TRACE_FRAMES, format_size, memory_report
+from vyper_lsp.store import IndexStore, default_store_path
+
+from vyper_lsp.search_paths import SearchPaths
+from vyper_lsp.session import DocumentSession
+from vyper_lsp.utils import get_installed_vyper_version, path_from_uri
 
-from vyper_lsp.navigation import ASTNavigator
-from vyper_lsp.utils import get_installed_vyper_version
 
+server = LanguageServer("vyper", "v0.0.1")
 
-from .ast import AST
+index = SymbolIndex(vyper_version=str(get_installed_vyper_version()))
+import_cache = ImportCache(index)
+symbol_handler = SymbolHandler(index)
+reference_handler = ReferenceHandler(index, import_cache)
+search_paths = SearchPaths()
+compiler_pool = CompilerPool()
+
+sessions: Dict[str, DocumentSession] = {}
+diagnostic_store = DiagnosticStore()
+
+# documents worked on most recently (last), whose analyzed trees are
+# kept. the others keep only their index entry, their trees are rebuilt
+# when a request needs them again
+MAX_ANALYZED_DOCUMENTS = 4
+analyzed_documents: "OrderedDict[str, None]" = OrderedDict()
+# also held while a document is closed, and while the results of a check
+# are recorded, so that a check finishing late doesn't bring them back
+analyzed_documents_lock = threading.Lock()
+
+# one compile at a time, vyper's warning capture is process-global
+compile_lock = threading.Lock()
+
+# how long to wait after an edit before checking, per document
+check_delays = AdaptiveDelay()
+debouncer = Debouncer(
+    wait=check_delays.delay, key=lambda ls, params: params.text_document.uri
+)
 
-ast = AST()
+# files changed on disk, path -> latest change, waiting to be processed
+watched_changes: Dict[str, FileChangeType] = {}
+watched_changes_lock = threading.Lock()
+# tools like `git checkout` produce bursts of notifications
+watched_debouncer = Debouncer(wait=0.2)
 
-server = LanguageServer("vyper", "v0.0.1")
-navigator = ASTNavigator(ast)
+# custom request writing a memory report, see `memory_report_request`
+MEMORY_REPORT = "vyper/memoryReport"
 
-completer = CompletionHandler(ast)
-signature_handler = SignatureHandler(ast)
-hover_handler = HoverHandler(ast)
+WATCHED_GLOBS = ["**/*.vy", "**/*.vyi", "**/*.json"]
 
-debouncer = Debouncer(wait=0.5)
+# the settings under "vyper", see the README
+SETTINGS = {"searchPaths", "venv", "compilers", "debounce"}
 
 logger = logging.getLogger("vyper-lsp")
 
@@ -64,6 +170,158 @@ def _check_minimum_vyper_version():
         )
 
 
+def get_session(uri: str) -> DocumentSession:
+    session = sessions.get(uri)
+    if session is None:
+        session = sessions.setdefault(
+            uri, DocumentSession(uri, import_cache, search_paths, compiler_pool)
+        )
+    return session
+
+
+def _mark_analyzed(uri: str) -> List[DocumentSession]:
+    # with analyzed_documents_lock held, returns the sessions to release
+    analyzed_documents[uri] = None
+    analyzed_documents.move_to_end(uri)
+    released = []
+    while len(analyzed_documents) > MAX_ANALYZED_DOCUMENTS:
+        session = sessions.get(analyzed_documents.popitem(last=False)[0])
+        if session is not None:
+            released.append(session)
+    return released
+
+
+def _release(session: DocumentSession):
+    # not while the document is being checked or restored
+    with compile_lock:
+        session.release()
+
+
+def _keep_analyzed(uri: str):
+    with analyzed_documents_lock:
+        released = _mark_analyzed(uri)
+    # called on the event loop, which mustn't wait for a compile
+    for session in released:
+        server.thread_pool_executor.submit(_release, session)
+
+
+def _restore(uri: str, session: DocumentSession):
+    with compile_lock:
+        restored = session.ast.restore()
+    if not restored:
+        # the current text is all there is to analyze
+        _validate(server, uri, _open_documents(server), focus=True)
+
+
+async def focused_session(uri: str) -> DocumentSession:
+    """
+    The session of a document a request is made for, with its trees.
+    Restoring them is a full analysis, which runs off the event loop.
+    """
+    session = get_session(uri)
+    if session.ast.released:
+        await asyncio.get_running_loop().run_in_executor(
+            server.thread_pool_executor, _restore, uri, session
+        )
+    _keep_analyzed(uri)
+    return session
+
+
+def _current_location(location: Location) -> Optional[Location]:
+    # index spans of open documents are those of their last good analysis,
+    # the edits made since may have moved them
+    session = sessions.get(location.uri)
+    if session is None:
+        return location
+    range_ = session.ast.positions.from_analysis(location.range)
+    return Location(uri=location.uri, range=range_) if range_ else None
+
+
+def _open_documents(ls: LanguageServer) -> Dict[str, str]:
+    # path -> uri of every open document
+    return {str(path_from_uri(uri)): uri for uri in ls.workspace.text_documents.keys()}
+
+
+def _pulls_diagnostics(ls: LanguageServer) -> bool:
+    capabilities = ls.client_capabilities.text_document
+    return capabilities is not None and capabilities.diagnostic is not None
+
+
+def _diagnostics_changed(ls: LanguageServer, uri: str, diagnostics: List[Diagnostic]):
+    if not _pulls_diagnostics(ls):
+        ls.publish_diagnostics(uri, diagnostics)
+        return
+    # the client pulls, let it know there is something new to pull
+    capabilities = ls.client_capabilities.workspace
+    if (
+        capabilities
+        and capabilities.diagnostics
+        and capabilities.diagnostics.refresh_support
+    ):
+        ls.lsp.send_request(WORKSPACE_DIAGNOSTIC_REFRESH)
+
+
+def _validate(
+    ls: LanguageServer,
+    uri: str,
+    open_documents: Dict[str, str],
+    incremental: bool = False,
+    focus: bool = False,
+    unless_checked: bool = False,
+) -> bool:
+    """
+    Check an open document, returns whether it was. With
+    `unless_checked`, a version already checked (e.g. by a check which
+    was running at the time) isn't checked again.
+    """
+    if uri not in ls.workspace.text_documents:
+        # closed while waiting for the check
+        return False
+    live_doc = ls.workspace.get_text_document(uri)
+    text_doc = Document(
+        uri=live_doc.uri, source=live_doc.source, version=live_doc.version
+    )
+    session = get_session(uri)
+    ast = session.ast
+    # files pinned to another vyper version are checked by its worker,
+    # in another process, which leaves the others free to be checked
+    pinned = compiler_pool.worker_for(text_doc.source) is not None
+    released = []
+    with contextlib.nullcontext() if pinned else compile_lock:
+        if unless_checked and diagnostic_store.covers(uri, text_doc.version):
+            return False
+        ast.overlay = {
+            path: ls.workspace.get_text_document(doc_uri).source
+            for path, doc_uri in open_documents.items()
+        }
+        started = time.perf_counter()
+        ast_diagnostics = ast.update_ast(text_doc, incremental)
+        check_delays.checked(uri, time.perf_counter() - started)
+        if ast.symbols is not None:
+            index.update(ast.symbols)
+
+        # recorded before another check of the document can start
+        with analyzed_documents_lock:
+            if (
+                uri not in ls.workspace.text_documents
+                or sessions.get(uri) is not session
+            ):
+                # closed while being checked, nothing to record
+                if sessions.get(uri) is session:
+                    sessions.pop(uri)
+                return True
+            if diagnostic_store.update(uri, ast_diagnostics, text_doc.version):
+                _diagnostics_changed(ls, uri, ast_diagnostics)
+            if focus:
+                released = _mark_analyzed(uri)
+            elif uri not in analyzed_documents:
+                # e.g. a dependent rechecked for its diagnostics
+                released = [session]
+    for released_session in released:
+        _release(released_session)
+    return True
+
+
 @debouncer.debounce
 def validate_doc(
     ls: LanguageServer,
@@ -72,9 +330,177 @@ def validate_doc(
     | DidSaveTextDocumentParams,
 ):
     logger.info("validating doc")
-    text_doc = ls.workspace.get_text_document(params.text_document.uri)
-    ast_diagnostics = ast.update_ast(text_doc)
-    ls.publish_diagnostics(params.text_document.uri, ast_diagnostics)
+    uri = params.text_document.uri
+    open_documents = _open_documents(ls)
+    # edits within a function body only need that function rechecked,
+    # opening and saving check the whole module
+    incremental = isinstance(params, DidChangeTextDocumentParams)
+    _validate(ls, uri, open_documents, incremental, focus=True)
+    _validate_dependents(ls, [str(path_from_uri(uri))], open_documents)
+
+
+def _validate_dependents(
+    ls: LanguageServer, paths: List[str], open_documents: Dict[str, str]
+):
+    # modules importing these (transitively) may have new errors, or
+    # lost old ones. recheck the open ones, imported modules first
+    for path in index.graph.dependents(*paths):
+        dependent_uri = open_documents.get(path)
+        if dependent_uri is None or path in paths:
+            continue
+        # a pending check of the dependent would do the same work again
+        debouncer.cancel(dependent_uri)
+        logger.info(f"revalidating dependent {path}")
+        _validate(ls, dependent_uri, open_documents)
+
+
+def _workspace_roots(ls: LanguageServer) -> List[Path]:
+    roots = [path_from_uri(folder.uri) for folder in ls.workspace.folders.values()]
+    if not roots and ls.workspace.root_path:
+        roots = [Path(ls.workspace.root_path)]
+    return roots
+
+
+def _index_workspace(roots: List[Path]):
+    for root in roots:
+        index.index_folder(root, search_paths.for_directory(root))
+
+
+def _vyper_settings(options) -> Optional[dict]:
+    # settings may or may not be namespaced by the client. anything else,
+    # e.g. the empty settings some clients send at startup, isn't ours
+    if not isinstance(options, dict):
+        return None
+    if "vyper" in options:
+        settings = options["vyper"]
+        return settings if isinstance(settings, dict) else None
+    return options if SETTINGS.intersection(options) else None
+
+
+def _register_file_watchers(ls: LanguageServer):
+    capabilities = ls.client_capabilities.workspace
+    watched_files = capabilities and capabilities.did_change_watched_files
+    if not (watched_files and watched_files.dynamic_registration):
+        logger.info("client cannot watch files, changes on disk will be missed")
+        return
+    ls.register_capability(
+        RegistrationParams(
+            registrations=[
+                Registration(
+                    id="vyper-lsp-watched-files",
+                    method=WORKSPACE_DID_CHANGE_WATCHED_FILES,
+                    register_options=DidChangeWatchedFilesRegistrationOptions(
+                        watchers=[
+                            FileSystemWatcher(glob_pattern=glob)
+                            for glob in WATCHED_GLOBS
+                        ]
+                    ),
+                )
+            ]
+        )
+    )
+
+
+def _configure_compilers(ls: LanguageServer, settings: dict):
+    roots = _workspace_roots(ls)
+    base = roots[0] if roots else Path.cwd()
+    interpreters = [
+        base / Path(p).expanduser() for p in settings.get("compilers") or []
+    ]
+    # discovery runs each interpreter once, don't hold up the client
+    threading.Thread(
+        target=compiler_pool.configure, args=(interpreters,), daemon=True
+    ).start()
+
+
+def _configure(ls: LanguageServer, settings: dict):
+    # only what the settings mention, the rest stays as configured
+    if "debounce" in settings:
+        check_delays.configure(settings["debounce"])
+    if "compilers" in settings:
+        _configure_compilers(ls, settings)
+
+
+@server.feature(INITIALIZE)
+def initialize(ls: LanguageServer, params: InitializeParams):
+    settings = _vyper_settings(params.initialization_options)
+    search_paths.configure(_workspace_roots(ls), settings)
+    if settings is not None:
+        _configure(ls, settings)
+
+
+@server.feature(WORKSPACE_DID_CHANGE_CONFIGURATION)
+def did_change_configuration(ls: LanguageServer, params: DidChangeConfigurationParams):
+    settings = _vyper_settings(params.settings)
+    if settings is None:
+        return
+    search_paths.configure(settings=settings)
+    _configure(ls, settings)
+    # imports may resolve differently now
+    threading.Thread(target=_revalidate_open_documents, args=(ls,), daemon=True).start()
+
+
+@server.feature(WORKSPACE_DID_CHANGE_WORKSPACE_FOLDERS)
+def did_change_workspace_folders(
+    ls: LanguageServer, params: DidChangeWorkspaceFoldersParams
+):
+    search_paths.configure(roots=_workspace_roots(ls))
+    added = [path_from_uri(folder.uri) for folder in params.event.added]
+    threading.Thread(target=_index_workspace, args=(added,), daemon=True).start()
+
+
+def _revalidate_open_documents(ls: LanguageServer):
+    open_documents = _open_documents(ls)
+    for uri in open_documents.values():
+        debouncer.cancel(uri)
+        _validate(ls, uri, open_documents)
+
+
+@server.feature(SHUTDOWN)
+def shutdown(ls: LanguageServer, *args):
+    compiler_pool.close()
+
+
+@server.feature(INITIALIZED)
+def initialized(ls: LanguageServer, params: InitializedParams):
+    if index.store is None:
+        try:
+            index.store = IndexStore(default_store_path())
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"persistent index disabled: {e}")
+
+    roots = _workspace_roots(ls)
+    threading.Thread(target=_index_workspace, args=(roots,), daemon=True).start()
+    _register_file_watchers(ls)
+
+
+@server.feature(WORKSPACE_DID_CHANGE_WATCHED_FILES)
+def did_change_watched_files(ls: LanguageServer, params: DidChangeWatchedFilesParams):
+    with watched_changes_lock:
+        for change in params.changes:
+            watched_changes[str(path_from_uri(change.uri))] = change.type
+    process_watched_changes(ls)
+
+
+@watched_debouncer.debounce
+def process_watched_changes(ls: LanguageServer):
+    with watched_changes_lock:
+        changes = dict(watched_changes)
+        watched_changes.clear()
+
+    open_documents = _open_documents(ls)
+    for path, change_type in changes.items():
+        # open documents are owned by the editor, not the disk
+        if path in open_documents:
+            continue
+        import_cache.invalidate(path)
+        if change_type == FileChangeType.Deleted:
+            index.remove(path)
+        elif path.endswith(INDEXED_SUFFIXES):
+            # unchanged contents (e.g. a touched file) are a cache hit
+            index.index_file(Path(path), search_paths.for_file(Path(path)))
+
+    _validate_dependents(ls, list(changes), open_documents)
 
 
 @server.feature(TEXT_DOCUMENT_DID_OPEN)
@@ -87,6 +513,15 @@ async def did_open(ls: LanguageServer, params: DidOpenTextDocumentParams):
 
 @server.feature(TEXT_DOCUMENT_DID_CHANGE)
 async def did_change(ls: LanguageServer, params: DidChangeTextDocumentParams):
+    check_delays.typed(params.text_document.uri)
+    positions = get_session(params.text_document.uri).ast.positions
+    version = params.text_document.version
+    for change in params.content_changes:
+        if isinstance(change, TextDocumentContentChangeEvent_Type1):
+            positions.record(version, change.range, change.text)
+        else:
+            # the whole text was replaced, nothing to map positions by
+            positions.reset()
     validate_doc(ls, params)
 
 
@@ -95,18 +530,95 @@ async def did_save(ls: LanguageServer, params: DidSaveTextDocumentParams):
     validate_doc(ls, params)
 
 
+@server.feature(TEXT_DOCUMENT_DID_CLOSE)
+def did_close(ls: LanguageServer, params: DidCloseTextDocumentParams):
+    uri = params.text_document.uri
+    debouncer.cancel(uri)
+    # the analyzed trees go, the index keeps the file's symbols for
+    # workspace-wide features
+    with analyzed_documents_lock:
+        session = sessions.pop(uri, None)
+        analyzed_documents.pop(uri, None)
+        diagnostic_store.remove(uri)
+        ls.publish_diagnostics(uri, [])
+    symbol_handler.forget(str(path_from_uri(uri)))
+    check_delays.forget(uri)
+    if session is not None:
+        logger.info(f"closed {uri}, released {format_size(session.retained_size())}")
+
+
+@server.feature(
+    TEXT_DOCUMENT_DIAGNOSTIC,
+    DiagnosticOptions(inter_file_dependencies=True, workspace_diagnostics=True),
+)
+# checking may take a while, not on the event loop
+@server.thread()
+def document_diagnostic(
+    ls: LanguageServer, params: DocumentDiagnosticParams
+) -> DocumentDiagnosticReport:
+    uri = params.text_document.uri
+    report = diagnostic_store.get(uri)
+    if report is None:
+        # not checked yet, e.g. pulled right after opening. the pending
+        # check would do the same as this one, unless it is running
+        # already, in which case its result is waited for
+        debouncer.cancel(uri)
+        open_documents = _open_documents(ls)
+        if _validate(ls, uri, open_documents, focus=True, unless_checked=True):
+            _validate_dependents(ls, [str(path_from_uri(uri))], open_documents)
+        report = diagnostic_store.get(uri) or ("", [])
+    return document_report(report, params.previous_result_id)
+
+
+@server.feature(WORKSPACE_DIAGNOSTIC)
+def workspace_diagnostic(
+    ls: LanguageServer, params: WorkspaceDiagnosticParams
+) -> WorkspaceDiagnosticReport:
+    # closed files are only indexed, never checked, so these are the
+    # open documents'
+    previous = {p.uri: p.value for p in params.previous_result_ids}
+    items = []
+    for uri, report in diagnostic_store.reports().items():
+        document = ls.workspace.text_documents.get(uri)
+        if document is not None:
+            items.append(
+                workspace_report(uri, document.version, report, previous.get(uri))
+            )
+    return WorkspaceDiagnosticReport(items=items)
+
+
 @server.feature(
-    TEXT_DOCUMENT_COMPLETION, CompletionOptions(trigger_characters=[":", ".", "@"])
+    TEXT_DOCUMENT_COMPLETION,
+    CompletionOptions(trigger_characters=[":", ".", "@"], resolve_provider=True),
 )
-def completions(ls, params: CompletionParams) -> CompletionList:
+async def completions(ls, params: CompletionParams) -> CompletionList:
+    session = await focused_session(params.text_document.uri)
+    completer = session.completer
     return completer.get_completions(ls, params)
 
 
+@server.feature(COMPLETION_ITEM_RESOLVE)
+async def completion_item_resolve(
+    ls: LanguageServer, item: CompletionItem
+) -> CompletionItem:
+    data = item.data if isinstance(item.data, dict) else {}
+    uri = data.get("uri")
+    if uri not in sessions:
+        return item
+    session = await focused_session(uri)
+    return session.completer.resolve_completion(item)
+
+
 @server.feature(TEXT_DOCUMENT_DECLARATION)
-def go_to_declaration(
+async def go_to_declaration(
     ls: LanguageServer, params: DeclarationParams
 ) -> Optional[Location]:
     document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    navigator = session.navigator
+    location = navigator.find_imported_declaration(document, params.position)
+    if location:
+        return _current_location(location)
     range = navigator.find_declaration(document, params.position)
     if range:
         return Location(uri=params.text_document.uri, range=range)
@@ -115,28 +627,56 @@ def go_to_declaration(
 
 
 @server.feature(TEXT_DOCUMENT_DEFINITION)
-def go_to_definition(
+async def go_to_definition(
     ls: LanguageServer, params: DefinitionParams
 ) -> Optional[Location]:
     # TODO: Look for assignment nodes to find definition
     document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    navigator = session.navigator
+    location = navigator.find_imported_declaration(document, params.position)
+    if location:
+        return _current_location(location)
     range_ = navigator.find_declaration(document, params.position)
     if range_:
         return Location(uri=params.text_document.uri, range=range_)
 
 
 @server.feature(TEXT_DOCUMENT_REFERENCES)
-def find_references(ls: LanguageServer, params: ReferenceParams) -> List[Location]:
+async def find_references(
+    ls: LanguageServer, params: ReferenceParams
+) -> List[Location]:
     document = ls.workspace.get_text_document(params.text_document.uri)
-    return [
-        Location(uri=params.text_document.uri, range=range_)
-        for range_ in navigator.find_references(document, params.position)
-    ]
+    locations = reference_handler.find_references(
+        document, params.position, params.context.include_declaration
+    )
+    if locations is None:
+        # not a module-level declaration, look within the document
+        session = await focused_session(params.text_document.uri)
+        navigator = session.navigator
+        return [
+            Location(uri=params.text_document.uri, range=range_)
+            for range_ in navigator.find_references(document, params.position)
+        ]
+
+    locations = filter(None, map(_current_location, locations))
+    if params.partial_result_token is None:
+        return list(locations)
+
+    # stream large result sets, the editor can show the first batch
+    # (the current document's references) right away
+    for batch in batched(locations, REFERENCE_BATCH_SIZE):
+        ls.send_notification(
+            PROGRESS, ProgressParams(token=params.partial_result_token, value=batch)
+        )
+    return []
 
 
 @server.feature(TEXT_DOCUMENT_HOVER)
-def hover(ls: LanguageServer, params: HoverParams):
+async def hover(ls: LanguageServer, params: HoverParams):
     document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    hover_handler = session.hover_handler
     hover_info = hover_handler.hover_info(document, params.position)
     if hover_info:
         return Hover(contents=hover_info, range=None)
@@ -146,19 +686,105 @@ def hover(ls: LanguageServer, params: HoverParams):
     TEXT_DOCUMENT_SIGNATURE_HELP,
     SignatureHelpOptions(trigger_characters=["("], retrigger_characters=[",", " "]),
 )
-def signature_help(ls: LanguageServer, params: SignatureHelpParams):
+async def signature_help(ls: LanguageServer, params: SignatureHelpParams):
     document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    signature_handler = session.signature_handler
     signature_info = signature_handler.signature_help(document, params)
     if signature_info:
         return signature_info
 
 
 @server.feature(TEXT_DOCUMENT_IMPLEMENTATION)
-def implementation(ls: LanguageServer, params: DefinitionParams):
+async def implementation(ls: LanguageServer, params: DefinitionParams):
     document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    navigator = session.navigator
+    location = navigator.find_imported_declaration(document, params.position)
+    if location:
+        return _current_location(location)
     range_ = navigator.find_implementation(document, params.position)
     if range_:
-        return Location(uri=params.text_document.uri, range=range)
+        return Location(uri=params.text_document.uri, range=range_)
+
+
+@server.feature(TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL, LEGEND)
+async def semantic_tokens_full(
+    ls: LanguageServer, params: SemanticTokensParams
+) -> SemanticTokens:
+    document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    handler = session.semantic_tokens_handler
+    return handler.semantic_tokens(document)
+
+
+@server.feature(TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL_DELTA, LEGEND)
+async def semantic_tokens_full_delta(
+    ls: LanguageServer, params: SemanticTokensDeltaParams
+) -> SemanticTokens | SemanticTokensDelta:
+    document = ls.workspace.get_text_document(params.text_document.uri)
+    session = await focused_session(params.text_document.uri)
+    handler = session.semantic_tokens_handler
+    return handler.semantic_tokens_delta(document, params.previous_result_id)
+
+
+# folding and selection work on any text, so these don't restore the
+# trees of a released document
+@server.feature(TEXT_DOCUMENT_FOLDING_RANGE)
+def folding_range(ls: LanguageServer, params: FoldingRangeParams) -> List[FoldingRange]:
+    document = ls.workspace.get_text_document(params.text_document.uri)
+    range_handler = get_session(params.text_document.uri).range_handler
+    return range_handler.folding_ranges(document)
+
+
+@server.feature(TEXT_DOCUMENT_SELECTION_RANGE)
+def selection_range(
+    ls: LanguageServer, params: SelectionRangeParams
+) -> List[SelectionRange]:
+    document = ls.workspace.get_text_document(params.text_document.uri)
+    range_handler = get_session(params.text_document.uri).range_handler
+    return range_handler.selection_ranges(document, params.positions)
+
+
+@server.feature(TEXT_DOCUMENT_INLAY_HINT)
+async def inlay_hint(ls: LanguageServer, params: InlayHintParams) -> List[InlayHint]:
+    session = await focused_session(params.text_document.uri)
+    inlay_hint_handler = session.inlay_hint_handler
+    return inlay_hint_handler.inlay_hints(params.range)
+
+
+@server.feature(TEXT_DOCUMENT_DOCUMENT_SYMBOL)
+def document_symbol(
+    ls: LanguageServer, params: DocumentSymbolParams
+) -> List[DocumentSymbol]:
+    document = ls.workspace.get_text_document(params.text_document.uri)
+    return symbol_handler.document_symbols(document)
+
+
+@server.feature(WORKSPACE_SYMBOL)
+def workspace_symbol(
+    ls: LanguageServer, params: WorkspaceSymbolParams
+) -> List[SymbolInformation]:
+    return symbol_handler.workspace_symbols(params.query)
+
+
+@server.feature(MEMORY_REPORT)
+def memory_report_request(ls: LanguageServer, params=None) -> str:
+    """
+    Write a memory report (see `memory.memory_report`) to `params.path`,
+    or a new temporary file, and return where it was written.
+    """
+    path = getattr(params, "path", None)
+    documents = {uri: session.memory_usage() for uri, session in sessions.items()}
+    shared = {
+        "workspace index": index,
+        "import tables": import_cache,
+        "outlines": symbol_handler,
+        "search paths": search_paths,
+    }
+    report = memory_report(documents, shared, Path(path) if path else None)
+    logger.info(f"memory report written to {report}")
+    return str(report)
 
 
 def main():
@@ -172,9 +798,41 @@ def main():
         metavar=("HOST", "PORT"),
         help="Use TCP protocol with specified host and port",
     )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace allocations from startup, for vyper/memoryReport",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    check_parser = subparsers.add_parser(
+        "check", help="Report the server's diagnostics for files and folders"
+    )
+    check_parser.add_argument("paths", nargs="+", help="Files or folders to check")
+    check_parser.add_argument(
+        "--format", choices=["json", "sarif"], default="json", help="Output format"
+    )
+    check_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Number of processes (defaults to the number of CPUs)",
+    )
+    check_parser.add_argument(
+        "--search-path",
+        action="append",
+        default=[],
+        help="Extra import search path (may be given multiple times)",
+    )
 
     args = parser.parse_args()
 
+    if args.command == "check":
+        sys.exit(run_check(args))
+
+    if args.trace_memory:
+        tracemalloc.start(TRACE_FRAMES)
+
     if args.tcp:
         host, port = args.tcp
         server.start_tcp(host=host, port=int(port))
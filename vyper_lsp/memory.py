@@ -0,0 +1,111 @@
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import BuiltinFunctionType, FunctionType, ModuleType
+from typing import Dict, Iterable, List, Mapping, Optional
+
+# frames kept per traced allocation, see `--trace-memory`
+TRACE_FRAMES = 10
+
+# allocation sites listed in a report
+TOP_SITES = 25
+
+# shared by everything, never retained on behalf of a single object
+SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType)
+
+
+def retained_size(*roots, exclude: Iterable = ()) -> int:
+    """
+    Approximate number of bytes reachable from `roots`. Classes, modules
+    and functions are not counted, nor is anything only reachable
+    through the objects in `exclude` (e.g. caches shared by all
+    documents).
+    """
+    seen = {id(obj) for obj in exclude}
+    stack = list(roots)
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _allocation_sites(limit: int) -> List[str]:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+        return [
+            "allocation tracing started now, request another report to see "
+            "what is allocated from here on (or start the server with "
+            "--trace-memory)"
+        ]
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+    )
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"traced: {format_size(current)} (peak {format_size(peak)})"]
+    for stat in snapshot.statistics("lineno")[:limit]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{format_size(stat.size):>10}  {stat.count:>8} blocks  "
+            f"{frame.filename}:{frame.lineno}"
+        )
+    return lines
+
+
+def memory_report(
+    documents: Mapping[str, Dict[str, int]],
+    shared: Mapping[str, object],
+    path: Optional[Path] = None,
+    limit: int = TOP_SITES,
+) -> Path:
+    """
+    Write a report of the allocation sites and of the memory held per
+    document (`documents`, uri -> sizes by part) and by the structures
+    shared by all of them (`shared`, name -> object) to `path`, by
+    default a new file in the temporary directory. Returns the path.
+    """
+    if path is None:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = (
+            Path(tempfile.gettempdir()) / f"vyper-lsp-memory-{os.getpid()}-{stamp}.txt"
+        )
+
+    lines = [f"vyper-lsp memory report, pid {os.getpid()}, {time.ctime()}", ""]
+    lines.append("documents (approximate retained size):")
+    for uri, sizes in sorted(
+        documents.items(), key=lambda item: -item[1].get("total", 0)
+    ):
+        parts = ", ".join(f"{part} {format_size(size)}" for part, size in sizes.items())
+        lines.append(f"  {uri}: {parts}")
+    if not documents:
+        lines.append("  none open")
+
+    lines += ["", "shared (approximate retained size):"]
+    for name, obj in shared.items():
+        lines.append(f"  {name}: {format_size(retained_size(obj))}")
+
+    lines += ["", "top allocation sites:"]
+    lines += [f"  {line}" for line in _allocation_sites(limit)]
+
+    path.write_text("\n".join(lines) + "\n")
+    return path
@@ -1,15 +1,20 @@
 import logging
 import re
-from lsprotocol.types import Position, Range
+from lsprotocol.types import Location, Position, Range
 from typing import List, Optional
 
 from pygls.workspace import Document
 from vyper.ast import FlagDef, FunctionDef, VyperNode
 from vyper_lsp.ast import AST
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.index import ImportRecord
 from vyper_lsp.utils import (
+    get_dotted_name_at_cursor,
     get_expression_at_cursor,
     get_word_at_cursor,
-    range_from_node,
+    path_from_uri,
+    range_from_span,
+    uri_from_path,
 )
 
 ENUM_VARIANT_PATTERN = re.compile(r"([a-zA-Z_][a-zA-Z0-9_]*)\.([a-zA-Z_][a-zA-Z0-9_]*)")
@@ -20,15 +25,17 @@ logger = logging.getLogger("vyper-lsp")
 # this class should abstract away all the AST stuff
 # and just provide a simple interface for navigation
 #
-# the navigator should mainly return Ranges
+# the navigator should mainly return Ranges, except for
+# lookups which leave the current document
 class ASTNavigator:
-    def __init__(self, ast: AST):
+    def __init__(self, ast: AST, imports: Optional[ImportCache] = None):
         self.ast = ast
+        self.imports = imports
 
     def _find_state_variable_declaration(self, word: str) -> Optional[Range]:
         node = self.ast.find_state_variable_declaration_node_for_name(word)
         if node:
-            return range_from_node(node)
+            return self.ast.node_range(node)
 
         return None
 
@@ -37,21 +44,21 @@ class ASTNavigator:
     ) -> Optional[Range]:
         decl_node = AST.from_node(node).find_node_declaring_symbol(symbol)
         if decl_node:
-            return range_from_node(decl_node)
+            return self.ast.node_range(decl_node)
 
         return None
 
     def _find_function_declaration(self, word: str) -> Optional[Range]:
         node = self.ast.find_function_declaration_node_for_name(word)
         if node:
-            return range_from_node(node)
+            return self.ast.node_range(node)
 
         return None
 
     def find_type_declaration(self, word: str) -> Optional[Range]:
         node = self.ast.find_type_declaration_node_for_name(word)
         if node:
-            return range_from_node(node)
+            return self.ast.node_range(node)
 
         return None
 
@@ -81,7 +88,9 @@ class ASTNavigator:
         top_level_node = self.ast.find_top_level_node_at_pos(pos)
 
         def finalize(refs):
-            return [range_from_node(ref) for ref in refs]
+            ranges = [self.ast.node_range(ref) for ref in refs]
+            # references on edited lines no longer exist as analyzed
+            return [range_ for range_ in ranges if range_ is not None]
 
         if word in self.ast.get_enums():
             return finalize(self.ast.find_nodes_referencing_enum(word))
@@ -165,15 +174,8 @@ class ASTNavigator:
                 return None
             return self._find_function_declaration(word)
 
-        # Check for module function calls (e.g., "lib.increment_counter")
-        if "." in expression:
-            parts = expression.split(".")
-            if len(parts) == 2:
-                module_name, function_name = parts
-                if module_name in self.ast.imports:
-                    # TODO: Navigate to the actual function definition in the imported module
-                    # For now, we don't have the AST of the imported file readily available
-                    pass
+        # module members (e.g. "lib.increment_counter") are handled
+        # by `find_imported_declaration`
 
         # TODO: this should check that we implement this interface before
         # trying to find an implementation for the given function
@@ -182,3 +184,38 @@ class ASTNavigator:
             return self._find_function_declaration(word)
 
         return None
+
+    def _document_imports(self, document: Document) -> List[ImportRecord]:
+        path = str(path_from_uri(document.uri))
+        symbols = self.ast.symbols
+        if symbols is not None and symbols.path == path:
+            return symbols.imports
+        return self.imports.imports(path)
+
+    def find_imported_declaration(
+        self, document: Document, pos: Position
+    ) -> Optional[Location]:
+        """
+        Declaration of an imported module, or of a member of one,
+        e.g. `lib.increment_counter`. Returns None for anything else.
+        """
+        if self.imports is None:
+            return None
+
+        parts = get_dotted_name_at_cursor(document.lines[pos.line], pos.character)
+        if not parts or parts[0] == "self":
+            return None
+
+        resolved = self.imports.resolve(self._document_imports(document), parts)
+        if resolved is None:
+            return None
+
+        path, record = resolved
+        if record is not None:
+            range_ = range_from_span(record.span)
+        else:
+            # the module itself
+            range_ = Range(
+                start=Position(line=0, character=0), end=Position(line=0, character=0)
+            )
+        return Location(uri=uri_from_path(path), range=range_)
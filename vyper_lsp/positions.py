@@ -0,0 +1,102 @@
+import threading
+from typing import List, Optional, Tuple
+
+from lsprotocol.types import Position, Range
+
+Point = Tuple[int, int]
+
+
+class _Edit:
+    __slots__ = ("version", "start", "old_end", "new_end")
+
+    def __init__(self, version: Optional[int], start: Point, old_end: Point, text: str):
+        self.version = version
+        self.start = start
+        self.old_end = old_end
+        lines = text.split("\n")
+        if len(lines) == 1:
+            self.new_end = (start[0], start[1] + len(text))
+        else:
+            self.new_end = (start[0] + len(lines) - 1, len(lines[-1]))
+
+
+def _shift(point: Point, start: Point, end: Point, new_end: Point, clamp: bool):
+    # map `point` across replacing [start, end) with text ending at `new_end`
+    if point < start:
+        return point
+    if point >= end:
+        if point[0] == end[0]:
+            return (new_end[0], new_end[1] + point[1] - end[1])
+        return (point[0] + new_end[0] - end[0], point[1])
+    # inside the replaced text, there is no corresponding position
+    return start if clamp else None
+
+
+def _within(point: Point, edit: _Edit) -> bool:
+    # strictly inside the replaced text, neither end of it
+    return edit.start < point < edit.old_end
+
+
+# maps positions between the source the last successful analysis was run
+# on and the current document, using the didChange edits made since.
+# this lets requests be answered from the last good analysis while the
+# document doesn't compile, e.g. because of a half-typed line.
+class PositionMap:
+    def __init__(self):
+        self._edits: List[_Edit] = []
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._edits)
+
+    def record(self, version: Optional[int], range_: Range, text: str):
+        start = (range_.start.line, range_.start.character)
+        end = (range_.end.line, range_.end.character)
+        with self._lock:
+            self._edits.append(_Edit(version, start, end, text))
+
+    def reset(self, version: Optional[int] = None):
+        """
+        Forget the edits made up to (and including) `version`, i.e. the
+        ones already contained in a new analysis. Forgets all edits if
+        `version` is None.
+        """
+        with self._lock:
+            if version is None:
+                self._edits = []
+            else:
+                self._edits = [
+                    e for e in self._edits if e.version is None or e.version > version
+                ]
+
+    def to_analysis(self, pos: Position) -> Position:
+        """
+        Position in the analyzed source for a position in the current
+        document. Positions in edited text map to the start of the edit.
+        """
+        point = (pos.line, pos.character)
+        with self._lock:
+            edits = list(self._edits)
+        for edit in reversed(edits):
+            point = _shift(point, edit.start, edit.new_end, edit.old_end, True)
+        return Position(line=point[0], character=point[1])
+
+    def from_analysis(self, range_: Range) -> Optional[Range]:
+        """
+        Range in the current document for a range in the analyzed source,
+        or None if text at one of its ends has been edited since. Edits
+        within the range make it grow or shrink.
+        """
+        start = (range_.start.line, range_.start.character)
+        end = (range_.end.line, range_.end.character)
+        with self._lock:
+            edits = list(self._edits)
+        for edit in edits:
+            if _within(start, edit) or _within(end, edit):
+                return None
+            start = _shift(start, edit.start, edit.old_end, edit.new_end, True)
+            end = _shift(end, edit.start, edit.old_end, edit.new_end, True)
+        return Range(
+            start=Position(line=start[0], character=start[1]),
+            end=Position(line=end[0], character=end[1]),
+        )
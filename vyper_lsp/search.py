@@ -0,0 +1,189 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from vyper_lsp.index import SymbolRecord
+
+DEFAULT_LIMIT = 100
+
+_WORD_BOUNDARY = re.compile(r"_+|(?<=[a-z0-9])(?=[A-Z])")
+
+# match tiers, lower ranks first
+EXACT = 0
+PREFIX = 1
+WORD_PREFIX = 2
+SUBSTRING = 3
+SUBSEQUENCE = 4
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _word_initials(name: str) -> Set[str]:
+    return {word[0].lower() for word in _WORD_BOUNDARY.split(name) if word}
+
+
+def _subsequence_gaps(query: str, text: str) -> Optional[int]:
+    # number of skipped characters between matched query characters,
+    # or None if `query` is not a subsequence of `text`
+    gaps = 0
+    pos = -1
+    for char in query:
+        found = text.find(char, pos + 1)
+        if found == -1:
+            return None
+        if pos != -1:
+            gaps += found - pos - 1
+        pos = found
+    return gaps
+
+
+def _score(query: str, name: str, lower: str) -> Optional[Tuple[int, int]]:
+    if lower == query:
+        return (EXACT, 0)
+    if lower.startswith(query):
+        return (PREFIX, 0)
+    index = lower.find(query)
+    if index != -1:
+        if lower[index - 1] == "_" or name[index].isupper():
+            return (WORD_PREFIX, index)
+        return (SUBSTRING, index)
+    gaps = _subsequence_gaps(query, lower)
+    if gaps is not None:
+        return (SUBSEQUENCE, gaps)
+    return None
+
+
+# in-memory search structure over the workspace index for
+# `workspace/symbol`. queries never touch files or the compiler:
+# candidates come from a sorted name list (prefixes), a trigram
+# index (substrings, found by scanning the names for queries shorter
+# than a trigram) and a word-initial index (fuzzy subsequences).
+class SymbolSearch:
+    def __init__(self):
+        self._entries: Dict[int, Tuple[str, str, "SymbolRecord"]] = {}
+        self._ids_by_path: Dict[str, List[int]] = {}
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._initials: Dict[str, Set[int]] = {}
+        self._sorted: List[Tuple[str, int]] = []
+        self._sorted_dirty = False
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def replace(self, path: str, records: Iterable["SymbolRecord"]):
+        with self._lock:
+            self._remove(path)
+            ids = []
+            for record in records:
+                entry_id = self._next_id
+                self._next_id += 1
+                lower = record.name.lower()
+                self._entries[entry_id] = (lower, path, record)
+                for trigram in _trigrams(lower):
+                    self._trigrams.setdefault(trigram, set()).add(entry_id)
+                for initial in _word_initials(record.name):
+                    self._initials.setdefault(initial, set()).add(entry_id)
+                ids.append(entry_id)
+            self._ids_by_path[path] = ids
+            self._sorted_dirty = True
+
+    def remove(self, path: str):
+        with self._lock:
+            self._remove(path)
+
+    def _remove(self, path: str):
+        ids = self._ids_by_path.pop(path, None)
+        if not ids:
+            return
+        for entry_id in ids:
+            lower, _, record = self._entries.pop(entry_id)
+            for trigram in _trigrams(lower):
+                bucket = self._trigrams[trigram]
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._trigrams[trigram]
+            for initial in _word_initials(record.name):
+                bucket = self._initials[initial]
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._initials[initial]
+        self._sorted_dirty = True
+
+    def _sorted_names(self) -> List[Tuple[str, int]]:
+        # rebuilt lazily, so bulk indexing doesn't pay for it per file
+        if self._sorted_dirty:
+            self._sorted = sorted((v[0], k) for k, v in self._entries.items())
+            self._sorted_dirty = False
+        return self._sorted
+
+    def _prefix_matches(self, query: str) -> List[tuple]:
+        # prefix hits are contiguous in the sorted list and never need
+        # the generic scoring below
+        ranked = []
+        sorted_names = self._sorted_names()
+        i = bisect_left(sorted_names, (query,))
+        while i < len(sorted_names) and sorted_names[i][0].startswith(query):
+            lower, entry_id = sorted_names[i]
+            score = (EXACT, 0) if lower == query else (PREFIX, 0)
+            ranked.append((score, len(lower), lower, entry_id))
+            i += 1
+        return ranked
+
+    def _substring_candidates(self, query: str) -> Set[int]:
+        trigrams = _trigrams(query)
+        if not trigrams:
+            # too short for trigrams, and cheap to look for in every name
+            return {
+                entry_id
+                for entry_id, (lower, _, _) in self._entries.items()
+                if query in lower
+            }
+        buckets = sorted((self._trigrams.get(t, set()) for t in trigrams), key=len)
+        return set.intersection(*buckets)
+
+    def _fuzzy_candidates(self, query: str) -> Set[int]:
+        # fuzzy matches have to start on a word boundary, like most
+        # editor fuzzy finders, which keeps this bucket small
+        return self._initials.get(query[0], set())
+
+    def _rank(self, query: str, candidates: Set[int]) -> List[tuple]:
+        ranked = []
+        for entry_id in candidates:
+            lower, path, record = self._entries[entry_id]
+            score = _score(query, record.name, lower)
+            if score is not None:
+                ranked.append((score, len(lower), lower, entry_id))
+        return ranked
+
+    def search(
+        self, query: str, limit: int = DEFAULT_LIMIT
+    ) -> List[Tuple[str, "SymbolRecord"]]:
+        query = query.strip().lower()
+        with self._lock:
+            if not query:
+                return [
+                    self._entries[entry_id][1:]
+                    for _, entry_id in self._sorted_names()[:limit]
+                ]
+
+            ranked = self._prefix_matches(query)
+            seen = {entry[-1] for entry in ranked}
+
+            # each candidate source only produces matches in a worse tier
+            # than the previous ones, so stop once we have enough results
+            for source in (self._substring_candidates, self._fuzzy_candidates):
+                if len(ranked) >= limit:
+                    break
+                candidates = source(query) - seen
+                seen |= candidates
+                ranked.extend(self._rank(query, candidates))
+
+            best = heapq.nsmallest(limit, ranked)
+            return [self._entries[entry_id][1:] for *_, entry_id in best]
@@ -0,0 +1,94 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from vyper.cli.vyper_compile import get_search_paths
+
+logger = logging.getLogger("vyper-lsp")
+
+
+def _site_packages(venv: Path) -> List[Path]:
+    # posix and windows layouts
+    found = sorted(venv.glob("lib/python*/site-packages"))
+    found += [p for p in [venv / "Lib" / "site-packages"] if p.is_dir()]
+    return found
+
+
+# import search paths, resolved once per directory.
+#
+# discovering them (sys.path, resolving and checking directories) only
+# depends on the workspace layout and configuration, never on the
+# document being edited, so it is cached until either changes.
+#
+# configuration (initialization options or `workspace/didChangeConfiguration`
+# settings under "vyper"):
+#   searchPaths: extra library roots, relative to the workspace folder
+#   venv: a virtual environment whose site-packages are searched
+class SearchPaths:
+    def __init__(self):
+        self.roots: List[Path] = []
+        self.extra_paths: List[str] = []
+        self.venv: Optional[str] = None
+        self._cache: Dict[Path, List[Path]] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        roots: Optional[List[Path]] = None,
+        settings: Optional[Mapping[str, Any]] = None,
+    ):
+        """
+        Update the workspace folders and/or the settings present in
+        `settings`, dropping all resolved search paths.
+        """
+        with self._lock:
+            if roots is not None:
+                self.roots = list(roots)
+            settings = settings or {}
+            if "searchPaths" in settings:
+                self.extra_paths = [str(p) for p in settings["searchPaths"] or []]
+            if "venv" in settings:
+                self.venv = settings["venv"]
+            self._cache.clear()
+
+    def root_for(self, directory: Path) -> Path:
+        """The innermost workspace folder containing `directory`."""
+        roots = [root for root in self.roots if directory.is_relative_to(root)]
+        return max(roots, key=lambda p: len(p.parts)) if roots else directory
+
+    def _configured(self, root: Path) -> List[Path]:
+        paths = [root / p for p in self.extra_paths]
+        if self.venv:
+            paths += _site_packages(root / self.venv)
+        existing = [p for p in paths if p.is_dir()]
+        for p in paths:
+            if p not in existing:
+                logger.warning(f"search path {p} does not exist")
+        return existing
+
+    def for_directory(self, directory: Path) -> List[Path]:
+        """
+        Search paths for modules in `directory`: the system path, the
+        configured paths, its workspace folder and the directory itself,
+        in increasing precedence.
+        """
+        with self._lock:
+            cached = self._cache.get(directory)
+            if cached is not None:
+                return cached
+
+            root = self.root_for(directory)
+            paths = self._configured(root) + [root]
+            if directory != root:
+                paths.append(directory)
+            try:
+                search_paths = get_search_paths([str(p) for p in paths])
+            except FileNotFoundError:
+                # e.g. an unsaved document in a deleted directory
+                search_paths = get_search_paths()
+            self._cache[directory] = search_paths
+            return search_paths
+
+    def for_file(self, path: Path) -> List[Path]:
+        return self.for_directory(path.parent)
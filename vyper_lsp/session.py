@@ -0,0 +1,84 @@
+from typing import Dict, Optional
+
+from vyper_lsp.ast import AST
+from vyper_lsp.compilers import CompilerPool
+from vyper_lsp.handlers.completion import CompletionHandler
+from vyper_lsp.handlers.hover import HoverHandler
+from vyper_lsp.handlers.inlay_hints import InlayHintHandler
+from vyper_lsp.handlers.ranges import RangeHandler
+from vyper_lsp.handlers.semantic_tokens import SemanticTokensHandler
+from vyper_lsp.handlers.signatures import SignatureHandler
+from vyper_lsp.imports import ImportCache
+from vyper_lsp.memory import retained_size
+from vyper_lsp.navigation import ASTNavigator
+from vyper_lsp.search_paths import SearchPaths
+
+
+# analysis results and request handlers of a single open document, so
+# that checking one document never replaces the state another document's
+# requests are answered from
+class DocumentSession:
+    def __init__(
+        self,
+        uri: str,
+        imports: Optional[ImportCache] = None,
+        search_paths: Optional[SearchPaths] = None,
+        compiler_pool: Optional[CompilerPool] = None,
+    ):
+        self.uri = uri
+        self.ast = AST()
+        if search_paths is not None:
+            self.ast.search_path_cache = search_paths
+        self.ast.compiler_pool = compiler_pool
+        self.navigator = ASTNavigator(self.ast, imports)
+        self._create_handlers()
+
+    def _create_handlers(self):
+        self.completer = CompletionHandler(self.ast, self.uri)
+        self.signature_handler = SignatureHandler(self.ast)
+        self.hover_handler = HoverHandler(self.ast)
+        self.semantic_tokens_handler = SemanticTokensHandler(self.ast)
+        self.range_handler = RangeHandler(self.ast)
+        self.inlay_hint_handler = InlayHintHandler(self.ast)
+
+    def release(self):
+        """
+        Drop the analyzed trees and the handler caches built from them,
+        for a document not worked on for a while.
+        """
+        self.ast.release()
+        if self.ast.released:
+            self._create_handlers()
+
+    def _shared(self) -> list:
+        # the caches and compilers shared with other documents
+        return [
+            self.navigator.imports,
+            self.ast.search_path_cache,
+            self.ast.compiler_pool,
+        ]
+
+    def retained_size(self) -> int:
+        """Approximate bytes held by this document alone."""
+        return retained_size(self, exclude=self._shared())
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by each part of this document's state."""
+        shared = self._shared()
+        handlers = [
+            self.completer,
+            self.hover_handler,
+            self.signature_handler,
+            self.semantic_tokens_handler,
+            self.range_handler,
+            self.inlay_hint_handler,
+        ]
+        return {
+            "trees": retained_size(
+                self.ast.ast_data, self.ast.ast_data_annotated, exclude=shared
+            ),
+            "index entry": retained_size(self.ast.symbols),
+            # excluding the trees, which some cache keys refer to
+            "caches": retained_size(*handlers, exclude=shared + [self.ast]),
+            "total": self.retained_size(),
+        }
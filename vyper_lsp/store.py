@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("vyper-lsp")
+
+# bump this whenever the shape of the stored index entries changes, so
+# entries written by an older server are ignored instead of misread
+INDEX_FORMAT_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    vyper_version TEXT NOT NULL,
+    data TEXT NOT NULL
+)
+"""
+
+
+def default_store_path() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "vyper-lsp" / f"index-v{INDEX_FORMAT_VERSION}.sqlite"
+
+
+# on-disk cache of index entries, so a restarted server only needs to
+# re-index files whose contents (or the installed vyper) changed.
+#
+# entries are opaque json blobs to the store; `vyper_lsp.index` owns
+# their shape.
+class IndexStore:
+    def __init__(self, path: Path | str = ":memory:"):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # indexing happens off the main thread, guard the connection ourselves
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def get(self, path: str, content_hash: str, vyper_version: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM files"
+                " WHERE path = ? AND content_hash = ? AND vyper_version = ?",
+                (path, content_hash, vyper_version),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            logger.warning(f"discarding corrupt index entry for {path}")
+            return None
+
+    def put(self, path: str, content_hash: str, vyper_version: str, data: dict):
+        blob = json.dumps(data, separators=(",", ":"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files"
+                " (path, content_hash, vyper_version, data) VALUES (?, ?, ?, ?)",
+                (path, content_hash, vyper_version, blob),
+            )
+
+    def remove(self, path: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
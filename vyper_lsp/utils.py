@@ -3,9 +3,10 @@ import string
 import re
 from pathlib import Path
 from importlib.metadata import version
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from lsprotocol.types import Diagnostic, DiagnosticSeverity, Position, Range
 from packaging.version import Version
+from pygls.uris import from_fs_path, to_fs_path
 from pygls.workspace import Document
 from vyper.ast import VyperNode
 from vyper.exceptions import VyperException
@@ -125,6 +126,81 @@ def get_expression_at_cursor(sentence: str, cursor_index: int) -> str:
     return word
 
 
+_DOTTED_NAME = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)*")
+
+
+def get_dotted_name_at_cursor(sentence: str, cursor_index: int) -> List[str]:
+    # parts of a dotted name up to and including the one under the cursor,
+    # e.g. ["lib", "foo"] with the cursor anywhere on `foo` in `lib.foo.bar`
+    for match in _DOTTED_NAME.finditer(sentence):
+        if match.start() <= cursor_index <= match.end():
+            name = match.group()
+            end = name.find(".", cursor_index - match.start())
+            return name[: end if end != -1 else len(name)].split(".")
+    return []
+
+
+# how far back to look for the start of a call spanning several lines
+CALL_SCAN_LINES = 20
+
+_CALLEE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)*\s*$")
+_OPENING_BRACKETS = "([{"
+_CLOSING_BRACKETS = ")]}"
+
+
+def _code_only(line: str) -> str:
+    # blank out string literals and drop comments, so brackets and
+    # commas inside them are ignored. same length as `line` up to a comment
+    out = []
+    quote = None
+    for char in line:
+        if quote is not None:
+            out.append(" ")
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+            out.append(" ")
+        elif char == "#":
+            break
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def find_enclosing_call(
+    lines: List[str], line: int, character: int
+) -> Optional[Tuple[str, int]]:
+    """
+    The callee (e.g. "self.foo") of the innermost call enclosing the
+    position, and the index of the argument the position is in.
+    """
+    depth = 0
+    commas = 0
+    for lineno in range(line, max(line - CALL_SCAN_LINES, -1), -1):
+        text = lines[lineno] if lineno < len(lines) else ""
+        if lineno == line:
+            text = text[:character]
+        text = _code_only(text)
+        for i in range(len(text) - 1, -1, -1):
+            char = text[i]
+            if char in _CLOSING_BRACKETS:
+                depth += 1
+            elif char in _OPENING_BRACKETS:
+                if depth > 0:
+                    depth -= 1
+                    continue
+                callee = _CALLEE.search(text, 0, i) if char == "(" else None
+                if callee is not None:
+                    return callee.group().rstrip(), commas
+                # inside a list, tuple etc. which is itself an argument,
+                # the enclosing call's arguments are counted from here
+                commas = 0
+            elif char == "," and depth == 0:
+                commas += 1
+    return None
+
+
 def extract_enum_name(line: str):
     m = re.match(r"enum\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*:", line)
     if m:
@@ -139,6 +215,14 @@ def range_from_node(node: VyperNode) -> Range:
     )
 
 
+def range_from_span(span: Tuple[int, int, int, int]) -> Range:
+    start_line, start_character, end_line, end_character = span
+    return Range(
+        start=Position(line=start_line, character=start_character),
+        end=Position(line=end_line, character=end_character),
+    )
+
+
 def range_from_exception(node: VyperException) -> Range:
     if getattr(node, "end_lineno", None) is None:
         return Range(
@@ -181,13 +265,23 @@ def diagnostic_from_exception(node: VyperException, message=None) -> Diagnostic:
     )
 
 
+def path_from_uri(uri: str) -> Path:
+    if uri.startswith("file://"):
+        return Path(to_fs_path(uri))
+    return Path(uri)
+
+
+def uri_from_path(path: Path | str) -> str:
+    return from_fs_path(str(path))
+
+
 def document_to_fileinput(doc: Document) -> FileInput:
-    path = Path(doc.uri.replace("file://", ""))
+    path = path_from_uri(doc.uri)
     return FileInput(0, path, path, doc.source)
 
 
 def working_directory_for_document(doc: Document) -> Path:
-    return Path(doc.uri.replace("file://", "")).parent
+    return path_from_uri(doc.uri).parent
 
 
 def escape_underscores(expression: str) -> str: